@@ -0,0 +1,94 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""
+Micro-benchmark of file candidate generation: CPU time and memory per candidate of FileGenerator, against the former
+generation of one descriptor copy per candidate.
+
+    PYTHONPATH=. python benchmarks/generator.py [--directories N] [--kept N]
+"""
+
+import time
+import tracemalloc
+
+import click
+
+from tachyon import loaders
+from tachyon.generator import FileGenerator
+from tachyon.scancontext import ScanContext
+
+
+def copied_files(generator, context):
+    """ Candidates as they were: a copy of the descriptor with the joined url and flags, for every path and suffix """
+    for path in context.valid_paths[1:]:
+        for file in context.files:
+            if file.get('no_suffix'):
+                suffixes, flags = [""], {"no_suffix": True}
+            elif file.get('executable'):
+                suffixes, flags = generator.executables_suffixes, {"executable": True}
+            else:
+                suffixes, flags = generator.file_suffixes, {}
+            for suffix in suffixes:
+                candidate = file.copy()
+                candidate.update(url=generator._join_path(path["url"], file["url"] + suffix), is_file=True, **flags)
+                yield candidate
+
+
+def create_context(directories):
+    context = ScanContext("http://example.com")
+    context.files = loaders.load_wordlist_resource("files")
+    context.valid_paths = [{"url": "/"}] + [{"url": "/directory%d" % i} for i in range(directories)]
+    return context
+
+
+def cpu_time(generate):
+    """ Time per candidate to generate them all without keeping them """
+    start = time.perf_counter()
+    count = sum(1 for _ in generate())
+    return (time.perf_counter() - start) / count, count
+
+
+def memory(generate, kept):
+    """ Bytes allocated per candidate for the first `kept` candidates, the url string included """
+    candidates = generate()
+    tracemalloc.start()
+    try:
+        sample = [candidate for candidate, _ in zip(candidates, range(kept))]
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (size - sample.__sizeof__()) / len(sample)
+
+
+@click.command()
+@click.option("--directories", type=int, default=300)
+@click.option("--kept", type=int, default=100000)
+def main(directories, kept):
+    implementations = [
+        ("copies", lambda context: lambda: copied_files(FileGenerator(context), context)),
+        ("candidates", lambda context: lambda: FileGenerator(context).generate_files(skip_root=True)),
+    ]
+    for name, implementation in implementations:
+        per_candidate, count = cpu_time(implementation(create_context(directories)))
+        size = memory(implementation(create_context(directories)), kept)
+        click.echo("%-10s %8d candidates: %.2f us, %4.0f bytes per candidate" % (
+            name, count, per_candidate * 1e6, size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""
+Startup benchmark: measures how long the entry point takes to import and to print its help.
+
+    python benchmarks/startup.py [--runs N] [--top N]
+
+The import breakdown comes from `python -X importtime`, the slowest modules are listed by cumulative time.
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+
+import click
+
+
+HEAVY_MODULES = ["asyncio", "aiohttp", "hammertime", "numpy", "simhash", "marshmallow_har"]
+
+
+def import_times(module):
+    """ Parse the -X importtime report as (cumulative us, self us, module) tuples """
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", "import %s" % module],
+                             stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    times = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_time, cumulative, name = line[len("import time:"):].split("|")
+        if self_time.strip().isdigit():
+            times.append((int(cumulative), int(self_time), name.rstrip()))
+    return times
+
+
+def wall_time(args, runs):
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, stdout=subprocess.DEVNULL, check=True)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+@click.command()
+@click.option("--runs", type=int, default=5)
+@click.option("--top", type=int, default=15)
+def main(runs, top):
+    times = import_times("tachyon.__main__")
+    total = next(cumulative for cumulative, _, name in times if name.strip() == "tachyon.__main__")
+    loaded = {name.strip() for _, _, name in times}
+
+    click.echo("import tachyon.__main__: %.1f ms" % (total / 1000))
+    click.echo("heavy modules imported: %s" % (", ".join(m for m in HEAVY_MODULES if m in loaded) or "none"))
+    click.echo("")
+    click.echo("%10s | %10s | module" % ("cumul. us", "self us"))
+    for cumulative, self_time, name in sorted(times, reverse=True)[:top]:
+        click.echo("%10d | %10d | %s" % (cumulative, self_time, name))
+    click.echo("")
+    click.echo("python -m tachyon -h: %.1f ms (median of %d)" % (wall_time(["-m", "tachyon", "-h"], runs) * 1000, runs))
+
+
+if __name__ == "__main__":
+    main()
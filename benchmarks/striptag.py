@@ -0,0 +1,125 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""
+Micro-benchmark of the tag stripping applied to every response: the former chain of one StripTag per tag, a single
+expression alternating all tags and StripTag('input', 'script').
+
+    PYTHONPATH=. python benchmarks/striptag.py [--size-kb N] [--runs N]
+"""
+
+import asyncio
+import re
+import timeit
+
+import click
+
+from tachyon.heuristics import StripTag
+
+
+class ChainedStripTag:
+    """ StripTag as it was: one substitution over the whole body per tag, the body is always reassigned """
+
+    def __init__(self, tag_name):
+        tag_name = tag_name.encode('utf-8')
+        self.replacement = b'<%s>' % tag_name
+        self.rule = re.compile(b'<%s\\s[^>]+>' % tag_name)
+
+    async def after_response(self, entry):
+        entry.response.raw = self.rule.sub(self.replacement, entry.response.raw)
+
+
+class AlternationStripTag:
+    """ Every tag in one pass of a single expression """
+
+    def __init__(self, *tag_names):
+        self.rule = re.compile(b'<(%s)\\s[^>]+>' % b'|'.join(tag_name.encode('utf-8') for tag_name in tag_names))
+
+    async def after_response(self, entry):
+        entry.response.raw = self.rule.sub(lambda match: b'<%s>' % match[1], entry.response.raw)
+
+
+class Response:
+
+    def __init__(self, raw):
+        self.raw = raw
+
+
+class Entry:
+
+    def __init__(self, raw):
+        self.response = Response(raw)
+
+
+def html_with_tags(size):
+    block = (b'<div class="row"><label>Name</label><input type="text" name="name" value="%d">'
+             b'<script type="text/javascript">var token = "abcdef";</script><p>Lorem ipsum dolor sit amet</p></div>\n')
+    body = bytearray(b"<html><body>")
+    while len(body) < size:
+        body += block % len(body)
+    return bytes(body + b"</body></html>")
+
+
+def html_without_tags(size):
+    block = b'<div class="row"><p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p><a href="/">x</a></div>\n'
+    return b"<html><body>" + block * (size // len(block)) + b"</body></html>"
+
+
+def strip(loop, heuristics, body):
+    entry = Entry(body)
+
+    async def after_response():
+        for heuristic in heuristics:
+            await heuristic.after_response(entry)
+
+    loop.run_until_complete(after_response())
+    return entry.response.raw
+
+
+def measure(loop, heuristics, body, runs):
+    """ Best average time per body over 5 repetitions """
+    return min(timeit.repeat(lambda: strip(loop, heuristics, body), number=runs, repeat=5)) / runs
+
+
+@click.command()
+@click.option("--size-kb", type=int, default=1024)
+@click.option("--runs", type=int, default=50)
+def main(size_kb, runs):
+    chain = [ChainedStripTag("input"), ChainedStripTag("script")]
+    alternation = [AlternationStripTag("input", "script")]
+    fused = [StripTag("input", "script")]
+    loop = asyncio.new_event_loop()
+
+    try:
+        for name, body in [("with tags", html_with_tags(size_kb * 1024)),
+                           ("without tags", html_without_tags(size_kb * 1024)),
+                           ("small 404", html_without_tags(2048))]:
+            if not strip(loop, chain, body) == strip(loop, alternation, body) == strip(loop, fused, body):
+                raise click.ClickException("All implementations should produce the same body")
+
+            chain_time = measure(loop, chain, body, runs)
+            alternation_time = measure(loop, alternation, body, runs)
+            fused_time = measure(loop, fused, body, runs)
+            click.echo("%-12s %7d bytes: chain %7.3f ms, alternation %7.3f ms, fused %7.3f ms" % (
+                name, len(body), chain_time * 1000, alternation_time * 1000, fused_time * 1000))
+    finally:
+        loop.close()
+
+
+if __name__ == "__main__":
+    main()
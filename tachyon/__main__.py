@@ -17,69 +17,91 @@
 # Place, Suite 330, Boston, MA  02111-1307  USA
 
 
-import asyncio
+# Only light modules are imported here so `tachyon -h` and option errors don't pay for asyncio, aiohttp, hammertime
+# and numpy. Those are imported by the functions that need them.
+import os
 from urllib.parse import urlparse
 
 import click
-import tachyon.database as database
+import tachyon.dbutils as dbutils
 import tachyon.loaders as loaders
 import tachyon.textutils as textutils
-from hammertime.http import Entry
-from hammertime.rules import RejectStatusCode
-from hammertime.rules.deadhostdetection import OfflineHostException
-from hammertime.rules.redirects import RejectRedirection
-from hammertime.rules.simhash import Simhash
-from hammertime.ruleset import RejectRequest, StopRequest
+from tachyon.checkpoint import Checkpoint, CheckpointMismatch
 from tachyon.directoryfetcher import DirectoryFetcher
 from tachyon.filefetcher import FileFetcher
 
 import tachyon.conf as conf
-from tachyon.config import configure_hammertime, set_cookies, default_user_agent, custom_event_loop
 from tachyon.generator import PathGenerator, FileGenerator
 from tachyon.plugins import host, file
 from tachyon.result import ResultAccumulator
+from tachyon.scancontext import ScanContext
+from tachyon.wordlist import WordlistIndex
 
 
-def load_target_paths():
-    """ Load the target paths in the database """
+def load_target_paths(context, wordlist=None):
+    """ Load the target paths in the scan context, `wordlist` is an already loaded one to reuse """
     textutils.output_info('Loading target paths')
-    database.paths += loaders.load_json_resource('paths')
+    paths = wordlist.copy() if wordlist is not None else loaders.load_wordlist_resource('paths')
+    # Plugins then only add the paths missing from the wordlist, looked up in its own index
+    context.paths_index = WordlistIndex(paths, (path["url"] for path in context.paths))
+    paths.extend(context.paths)
+    context.paths = paths
 
 
-def load_target_files():
-    """ Load the target files in the database """
+def load_target_files(context, wordlist=None):
+    """ Load the target files in the scan context, `wordlist` is an already loaded one to reuse """
     textutils.output_info('Loading target files')
-    database.files += loaders.load_json_resource('files')
+    files = wordlist.copy() if wordlist is not None else loaders.load_wordlist_resource('files')
+    context.files_index = WordlistIndex(files, (file["url"] for file in context.files))
+    files.extend(context.files)
+    context.files = files
 
 
-async def get_session_cookies(hammertime):
+async def get_session_cookies(hammertime, context):
+    from hammertime.ruleset import RejectRequest
+
     try:
         """ Fetch the root path in a single request so aiohttp will use the returned cookies in all future requests. """
         textutils.output_info('Fetching session cookie')
         path = '/'
-        await hammertime.request(conf.base_url + path)
+        await hammertime.request(context.base_url + path)
     except RejectRequest:
         textutils.output_info('Request for website root failed.')
 
 
-async def test_paths_exists(hammertime, *, recursive=False, depth_limit=2, accumulator):
+async def test_paths_exists(hammertime, context, *, recursive=False, depth_limit=2, accumulator):
     """
     Test for path existence using http codes and computed 404
     Turn off output for now, it would be irrelevant at this point.
     """
 
     check_closed(hammertime)
+    checkpoint = context.checkpoint
 
-    path_generator = PathGenerator()
-    fetcher = DirectoryFetcher(conf.base_url, hammertime, accumulator=accumulator)
+    path_generator = PathGenerator(context)
+    fetcher = DirectoryFetcher(context, hammertime, accumulator=accumulator, window_size=conf.request_window)
 
-    # Inject pre-crawled paths if present; they are stored in database.valid_paths so we must set `use_valid_paths` for
+    # Inject pre-crawled paths if present; they are stored in context.valid_paths so we must set `use_valid_paths` for
     # this call regardless of the recursion settings.
     crawler_paths = []
     # Skip this if only the root path is present...
-    if len(database.valid_paths) > 1:
+    if len(context.valid_paths) > 1:
         crawler_paths = path_generator.generate_paths(use_valid_paths=True)
 
+    # Paths found before the scan was resumed come after the pre-crawled ones, as they did in the interrupted run
+    context.valid_paths.extend(checkpoint.valid_paths)
+    if "paths" in checkpoint.phases:
+        textutils.output_info('Paths already probed before the scan was resumed')
+    else:
+        await fetch_paths(fetcher, path_generator, crawler_paths, checkpoint,
+                          recursive=recursive, depth_limit=depth_limit)
+        checkpoint.complete_phase("paths")
+
+    count = len(context.valid_paths) - 1  # Removing one as it is the root path
+    textutils.output_info('Found %d valid paths' % count)
+
+
+async def fetch_paths(fetcher, path_generator, crawler_paths, checkpoint, *, recursive, depth_limit):
     paths_to_fetch = path_generator.generate_paths(use_valid_paths=False)
 
     if len(paths_to_fetch) > 0:
@@ -92,26 +114,59 @@ async def test_paths_exists(hammertime, *, recursive=False, depth_limit=2, accum
 
     if recursive:
         recursion_depth = 0
+        if checkpoint.levels:
+            # Expand the interrupted level again, its paths already requested are skipped by the fetcher
+            recursion_depth, path_generator.frontier_start = checkpoint.levels[-1]
+            recursion_depth -= 1
         while recursion_depth < depth_limit:
             recursion_depth += 1
-            paths_to_fetch = path_generator.generate_paths(use_valid_paths=True)
+            checkpoint.start_level(recursion_depth, path_generator.frontier_start)
+            paths_to_fetch = path_generator.generate_paths(use_valid_paths=True, depth=recursion_depth)
+            textutils.output_info(format_level_stats(path_generator.level_stats[-1]))
+            if len(paths_to_fetch) == 0:
+                break
             await fetcher.fetch_paths(paths_to_fetch)
 
-    count = len(database.valid_paths) - 1  # Removing one as it is the root path
-    textutils.output_info('Found %d valid paths' % count)
-
 
-async def load_execute_host_plugins(hammertime):
-    """ Import and run host plugins """
+async def load_execute_host_plugins(hammertime, context):
+    """ Import and run host plugins, returns what each of them added """
     count = len(host.__all__)
     if count == 0:
-        return
+        return []
 
     textutils.output_info('Executing %d host plugins' % count)
-    for plugin_name in host.__all__:
-        plugin = __import__("tachyon.plugins.host." + plugin_name, fromlist=[plugin_name])
-        if hasattr(plugin, 'execute'):
-            await plugin.execute(hammertime)
+    plugins = [__import__("tachyon.plugins.host." + name, fromlist=[name]) for name in host.__all__]
+    return await execute_host_plugins([plugin for plugin in plugins if hasattr(plugin, 'execute')], hammertime,
+                                      context)
+
+
+async def execute_host_plugins(plugins, hammertime, context):
+    """
+    Run the plugins concurrently, the phase lasts as long as the slowest one. What each plugin adds is collected
+    separately and merged in plugin order once all are done, so the scan context does not depend on completion order.
+    What each plugin added is reported once merged, without the entries an earlier plugin already added.
+    """
+    import asyncio
+
+    async def run(plugin):
+        with dbutils.collect_additions(context) as additions:
+            await plugin.execute(hammertime, context)
+        return additions
+
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(run(plugin)) for plugin in plugins]
+    except ExceptionGroup as errors:
+        # A failing plugin cancels the others, callers expect the original exception (ex: OfflineHostException)
+        raise errors.exceptions[0]
+
+    additions = [task.result() for task in tasks]
+    for plugin, plugin_additions in zip(plugins, additions):
+        dbutils.merge_additions(context, plugin_additions)
+        name = getattr(plugin, "__name__", "Host").rpartition(".")[2]
+        textutils.output_info(" - %s Plugin: added %d paths and %d files" % (
+            name, len(plugin_additions.paths), len(plugin_additions.files)))
+    return additions
 
 
 def load_execute_file_plugins():
@@ -127,21 +182,28 @@ def load_execute_file_plugins():
             plugin.execute()
 
 
-async def test_file_exists(hammertime, accumulator, skip_root=False):
+async def test_file_exists(hammertime, context, accumulator, skip_root=False):
     """ Test for file existence using http codes and computed 404 """
+    from hammertime.rules import RejectStatusCode
 
     check_closed(hammertime)
+    checkpoint = context.checkpoint
+    phase = "files" if skip_root else "root_files"
+
+    fetcher = FileFetcher(context, hammertime, accumulator=accumulator, window_size=conf.request_window)
+    generator = FileGenerator(context)
+    if phase in checkpoint.phases:
+        textutils.output_info('Files already probed before the scan was resumed')
+        files_to_fetch = ()
+    else:
+        files_to_fetch = generator.generate_files(skip_root=skip_root)
+        count = generator.count_files(skip_root=skip_root)
+        textutils.output_info('Probing up to %d files' % count)
 
-    fetcher = FileFetcher(conf.base_url, hammertime, accumulator=accumulator)
-    generator = FileGenerator()
-    files_to_fetch = generator.generate_files(skip_root=skip_root)
-
-    count = len(files_to_fetch)
-
-    textutils.output_info('Probing %d files' % count)
-    if len(database.valid_paths) > 0:
+    if len(context.valid_paths) > 0:
         hammertime.heuristics.add(RejectStatusCode({401, 403}))
         await fetcher.fetch_files(files_to_fetch)
+    checkpoint.complete_phase(phase)
 
 
 def format_stats(stats):
@@ -149,6 +211,22 @@ def format_stats(stats):
     return message.format(stats.requested, stats.completed, stats.duration, stats.retries, stats.rate)
 
 
+def format_output_stats(writer):
+    message = "Output: queue depth: %d; max depth: %d; %d lines in %d writes; %d dropped"
+    return message % (writer.depth, writer.max_depth, writer.lines, writer.writes, writer.dropped)
+
+
+def format_dedup_stats(context):
+    message = "Deduplication: Paths: {} unique, {} duplicates; Files: {} unique names, {} duplicates, in {} paths"
+    return message.format(context.path_cache.misses, context.path_cache.hits,
+                          context.file_names.misses, context.file_names.hits, len(context.file_directories))
+
+
+def format_level_stats(stats):
+    message = "Recursion depth %d: %d paths generated from %d new directories in %.3f s"
+    return message % (stats.depth, stats.generated, stats.directories, stats.duration)
+
+
 def check_closed(hammertime):
     if hammertime.is_closed or getattr(hammertime, "_interrupted", False):
         raise KeyboardInterrupt()
@@ -163,16 +241,31 @@ async def drain(hammertime):
             pass  # Just drain the pre-probe queries from the queue
 
 
-async def scan(hammertime, *, accumulator,
+async def scan(hammertime, context, *, accumulator,
                cookies=None, directories_only=False, files_only=False, plugins_only=False,
                **kwargs):
+    """
+    With the checkpoint of the `context` restored from an interrupted scan, its results are output again, then the
+    completed phases are skipped and the interrupted one only requests the candidates that were not done yet.
+    """
+    from hammertime.http import Entry
+    from tachyon.config import set_cookies
+
+    checkpoint = context.checkpoint
+    accumulator.restore(checkpoint.results)
 
     if cookies is not None:
         set_cookies(hammertime, cookies)
     else:
-        await get_session_cookies(hammertime)
+        await get_session_cookies(hammertime, context)
 
-    await load_execute_host_plugins(hammertime)
+    if "plugins" in checkpoint.phases:
+        textutils.output_info('Host plugins already executed before the scan was resumed')
+        dbutils.merge_additions(context, checkpoint)
+    else:
+        additions = await load_execute_host_plugins(hammertime, context)
+        checkpoint.complete_phase("plugins", paths=[path for added in additions for path in added.paths],
+                                  files=[file for added in additions for file in added.files])
 
     await drain(hammertime)
 
@@ -180,22 +273,22 @@ async def scan(hammertime, *, accumulator,
         if not directories_only:
             textutils.output_info('Generating file targets for target root')
             load_execute_file_plugins()
-            await test_file_exists(hammertime, accumulator=accumulator)
+            await test_file_exists(hammertime, context, accumulator=accumulator)
 
         if not files_only:
-            await test_paths_exists(hammertime, accumulator=accumulator, **kwargs)
+            await test_paths_exists(hammertime, context, accumulator=accumulator, **kwargs)
 
             if not directories_only:
                 textutils.output_info('Generating file targets')
                 load_execute_file_plugins()
-                await test_file_exists(hammertime, accumulator=accumulator, skip_root=True)
+                await test_file_exists(hammertime, context, accumulator=accumulator, skip_root=True)
 
     check_closed(hammertime)
 
     validator = ReFetch(hammertime)
-    if await validator.is_valid(Entry.create(conf.base_url + "/")):
+    if await validator.is_valid(Entry.create(context.base_url + "/")):
         textutils.output_info("Re-validating prior results.")
-        await accumulator.revalidate(validator)
+        await accumulator.revalidate(validator, concurrency=conf.revalidation_concurrency)
     else:
         textutils.output_error("Re-validation aborted. Target no longer appears to be up.")
 
@@ -205,13 +298,15 @@ async def scan(hammertime, *, accumulator,
 class ReFetch:
     def __init__(self, hammertime):
         self.hammertime = hammertime
+        self.bad_behavior = None
 
     async def is_valid(self, entry):
+        from hammertime.rules.redirects import RejectRedirection
+
         value = getattr(entry.result, 'error_simhash', None)
         if value is not None:
             # Revalidate the responses with the known bad behavior signatures.
-            current = Simhash(value)
-            if any(current.distance(Simhash(k)) < 5 for k in self.hammertime.kb.bad_behavior_response):
+            if self._bad_behavior_index().near(value):
                 return False
 
         try:
@@ -223,6 +318,14 @@ class ReFetch:
         except Exception:
             return False
 
+    def _bad_behavior_index(self):
+        from tachyon.simhashindex import SimhashIndex
+
+        if self.bad_behavior is None:
+            self.bad_behavior = SimhashIndex(threshold=5)
+        self.bad_behavior.sync(self.hammertime.kb.bad_behavior_response)
+        return self.bad_behavior
+
 
 @click.command(context_settings=dict(help_option_names=['-h', '--help']))
 @click.option("-a", "--allow-download", is_flag=True)
@@ -231,91 +334,186 @@ class ReFetch:
 @click.option("-s", "--directories-only", is_flag=True)
 @click.option("-f", "--files-only", is_flag=True)
 @click.option("-j", "--json-output", is_flag=True)
+@click.option("--ndjson-output", is_flag=True)
 @click.option("-m", "--max-retry-count", type=int, default=3)
 @click.option("-z", "--plugins-only", is_flag=True)
 @click.option("-x", "--plugin-settings", multiple=True)
 @click.option("-p", "--proxy", default="")
 @click.option("-r", "--recursive", is_flag=True)
-@click.option("-u", "--user-agent", default=default_user_agent)
+@click.option("-u", "--user-agent", default=conf.default_user_agent)
 @click.option("-v", "--vhost", type=str, default=None)
 @click.option("-C", "--confirmation-factor", type=int, default=1)
 @click.option("--concurrency", type=int, default=0)
+@click.option("--request-window", type=int, default=1000)
+@click.option("--revalidation-concurrency", type=int, default=10)
 @click.option("--har-output-dir", default=None)
+@click.option("--har-compress", is_flag=True)
+@click.option("--kb-store-dir", default=None)
+@click.option("--kb-ttl", type=int, default=conf.kb_ttl)
+@click.option("--checkpoint", "checkpoint_file", default=None)
+@click.option("--resume", is_flag=True)
 @click.option("-P", "--pre-crawled-path", multiple=True, default=None)
-@click.argument("target_host")
-def main(*, target_host, cookie_file, json_output, max_retry_count, plugin_settings, proxy, user_agent, vhost,
-         depth_limit, directories_only, files_only, plugins_only, recursive, allow_download, confirmation_factor,
-         concurrency, har_output_dir, pre_crawled_path):
-
-    output_manager = textutils.init_log(json_output)
+@click.option("-T", "--targets-file", default=None)
+@click.option("--global-concurrency", type=int, default=100)
+@click.option("--parallel-hosts", type=int, default=4)
+@click.argument("target_host", required=False)
+def main(*, target_host, cookie_file, json_output, ndjson_output, max_retry_count, plugin_settings, proxy, user_agent,
+         vhost, depth_limit, directories_only, files_only, plugins_only, recursive, allow_download, confirmation_factor,
+         concurrency, request_window, revalidation_concurrency, har_output_dir, har_compress, kb_store_dir, kb_ttl,
+         checkpoint_file, resume, pre_crawled_path, targets_file, global_concurrency, parallel_hosts):
+    import asyncio
+    from collections import defaultdict
+    from hammertime.config import custom_event_loop
+    from hammertime.rules.deadhostdetection import OfflineHostException
+    from hammertime.ruleset import StopRequest
+    from tachyon.config import configure_hammertime, create_session
+
+    output_manager = textutils.init_log(json_output, ndjson_output)
     output_manager.output_header()
 
-    # Ensure the host is of the right format and set it in config
-    parsed_url = urlparse(target_host)
-    if not parsed_url.scheme:
-        parsed_url = urlparse("http://%s" % target_host)
-
-    if not parsed_url:
-        output_manager.output_error("Invald URL provided.")
+    if targets_file is not None:
+        targets = loaders.load_target_list(targets_file)
+    elif target_host is not None:
+        targets = [target_host]
+    else:
+        output_manager.output_error("A target host or a --targets-file is required.")
         return
 
-    # Set conf values
-    conf.target_host = parsed_url.netloc
-    conf.base_url = "%s://%s" % (parsed_url.scheme, parsed_url.netloc)
-    conf.pre_crawled_paths = pre_crawled_path or []
+    # Ensure the hosts are of the right format
+    parsed_urls = []
+    for target in targets:
+        # "host:port" would otherwise be parsed as a "host" scheme
+        parsed_url = urlparse(target if "://" in target else "http://%s" % target)
 
-    accumulator = ResultAccumulator(output_manager=output_manager)
+        if not parsed_url:
+            output_manager.output_error("Invald URL provided.")
+            return
+        parsed_urls.append(parsed_url)
 
-    output_manager.output_info('Starting Discovery on ' + conf.base_url)
+    if resume and checkpoint_file is None:
+        output_manager.output_error("--resume requires the --checkpoint file of the interrupted scan.")
+        return
+    if checkpoint_file is not None and len(parsed_urls) > 1:
+        output_manager.output_error("--checkpoint can only be used with a single target.")
+        return
 
-    conf.allow_download = allow_download
+    # Set conf values
+    conf.request_window = request_window
+    conf.revalidation_concurrency = max(1, revalidation_concurrency)
+    if har_output_dir is not None:
+        conf.blob_store_dir = har_output_dir.rstrip("/") + "/blobs"
+    settings = defaultdict(list)
     for option in plugin_settings:
         plugin, value = option.split(':', 1)
-        conf.plugin_settings[plugin].append(value)
+        settings[plugin].append(value)
 
     loop = custom_event_loop()
 
-    async def async_main():
-        hammertime = None
+    # Scans in progress (scan context: hammertime), for the statistics printed on input
+    running = {}
+
+    async def scan_target(parsed_url, *, session, wordlists, kb_store):
+        if len(parsed_urls) > 1:
+            # Scans run concurrently, their messages are told apart by the target
+            textutils.set_target(parsed_url.netloc)
+        context = ScanContext.from_url(parsed_url, plugin_settings=settings, allow_download=allow_download)
+        context.checkpoint = Checkpoint(checkpoint_file, target=context.base_url, vhost=vhost, resume=resume,
+                                        flush_interval=conf.checkpoint_interval)
+        accumulator = ResultAccumulator(output_manager=output_manager, spill_threshold=conf.result_spill_threshold,
+                                        context=context)
+        textutils.output_info('Starting Discovery on ' + context.base_url)
+
+        target_har_dir = har_output_dir
+        if har_output_dir is not None and len(parsed_urls) > 1:
+            target_har_dir = os.path.join(har_output_dir, parsed_url.netloc.replace(":", "_"))
+            os.makedirs(target_har_dir, exist_ok=True)
+
         try:
             root_path = conf.path_template.copy()
             root_path['url'] = '/'
-            database.valid_paths.append(root_path)
-            for crawled_path in conf.pre_crawled_paths:
+            context.valid_paths.append(root_path)
+            for crawled_path in pre_crawled_path or []:
                 new_path = conf.path_template.copy()
                 new_path['url'] = crawled_path
-                database.valid_paths.append(new_path)
-            load_target_paths()
-            load_target_files()
-            conf.cookies = loaders.load_cookie_file(cookie_file)
-            conf.user_agent = user_agent
-            conf.proxy_url = proxy
-            conf.forge_vhost = vhost
+                context.valid_paths.append(new_path)
+            load_target_paths(context, wordlists.get("paths"))
+            load_target_files(context, wordlists.get("files"))
 
-            async with configure_hammertime(cookies=conf.cookies, proxy=conf.proxy_url, retry_count=max_retry_count,
+            async with configure_hammertime(context, cookies=conf.cookies, proxy=conf.proxy_url,
+                                            retry_count=max_retry_count,
                                             user_agent=conf.user_agent, vhost=conf.forge_vhost,
                                             confirmation_factor=confirmation_factor,
                                             concurrency=concurrency,
-                                            har_output_dir=har_output_dir) as hammertime:
+                                            har_output_dir=target_har_dir,
+                                            har_compress=har_compress,
+                                            kb_store=kb_store,
+                                            session=session) as hammertime:
                 try:
-                    t = loop.create_task(stat_on_input(hammertime))
-                    await scan(hammertime, accumulator=accumulator,
+                    running[context] = hammertime
+                    await scan(hammertime, context, accumulator=accumulator,
                                cookies=conf.cookies, directories_only=directories_only,
                                files_only=files_only, plugins_only=plugins_only, depth_limit=depth_limit,
                                recursive=recursive)
                 finally:
-                    t.cancel()
+                    running.pop(context, None)
                     textutils.output_info(format_stats(hammertime.stats))
+                    textutils.output_info(format_dedup_stats(context))
+                    textutils.output_info(format_output_stats(output_manager.writer))
+
+            textutils.output_info('Scan completed')
+        except (OfflineHostException, StopRequest):
+            textutils.output_error("Target host seems to be offline.")
+        finally:
+            context.checkpoint.close()
+            accumulator.candidates.close()
 
-            output_manager.output_info('Scan completed')
+    async def async_main():
+        session = None
+        wordlists = {}
+        stats_task = loop.create_task(stat_on_input(running))
+        try:
+            conf.cookies = loaders.load_cookie_file(cookie_file)
+            conf.user_agent = user_agent
+            conf.proxy_url = proxy
+            conf.forge_vhost = vhost
+            kb_store = None
+            if kb_store_dir is not None:
+                from tachyon.kbstore import KnowledgeBaseStore
+                kb_store = KnowledgeBaseStore(kb_store_dir, ttl=kb_ttl)
+
+            # Loaded once for all targets, each one gets its own list of additions on top of them
+            wordlists["paths"] = loaders.load_wordlist_resource('paths')
+            wordlists["files"] = loaders.load_wordlist_resource('files')
+            if len(parsed_urls) > 1:
+                session = create_session(loop, conf.cookies, limit=global_concurrency, limit_per_host=concurrency)
+
+            # Each scan has its own context, up to --parallel-hosts of them run at once
+            semaphore = asyncio.Semaphore(max(1, parallel_hosts))
+
+            async def scan_when_ready(parsed_url):
+                async with semaphore:
+                    await scan_target(parsed_url, session=session, wordlists=wordlists, kb_store=kb_store)
+
+            try:
+                async with asyncio.TaskGroup() as group:
+                    for parsed_url in parsed_urls:
+                        group.create_task(scan_when_ready(parsed_url))
+            except ExceptionGroup as errors:
+                # The other scans are cancelled, the error is reported as it would be for a single target
+                raise errors.exceptions[0]
 
         except (KeyboardInterrupt, asyncio.CancelledError):
             output_manager.output_error('Keyboard Interrupt Received')
-        except (OfflineHostException, StopRequest):
-            output_manager.output_error("Target host seems to be offline.")
+        except CheckpointMismatch as e:
+            output_manager.output_error(str(e))
         except ImportError as e:
             output_manager.output_error("Additional module is required for the requested options: %s" % e)
         finally:
+            stats_task.cancel()
+            for loaded in wordlists.values():
+                loaded.close()
+            if session is not None:
+                await session.close()
             output_manager.flush()
 
     try:
@@ -325,10 +523,12 @@ def main(*, target_host, cookie_file, json_output, max_retry_count, plugin_setti
     except (KeyboardInterrupt, asyncio.CancelledError):
         output_manager.output_error('Keyboard Interrupt Received')
     finally:
-        output_manager.flush()
+        output_manager.close()
 
 
-async def stat_on_input(hammertime):
+async def stat_on_input(running):
+    """ Print the statistics of the scans in `running` (scan context: hammertime) when a line is entered """
+    import asyncio
     import sys
     from datetime import datetime, timedelta
 
@@ -342,12 +542,16 @@ async def stat_on_input(hammertime):
     await loop.connect_read_pipe(lambda: reader_protocol, sys.stdin)
 
     expiry = datetime.now()
-    while not hammertime.is_closed:
+    while not reader.at_eof():
         await reader.readline()
 
         # Throttle stats printing
         if expiry < datetime.now():
-            textutils.output_info(format_stats(hammertime.stats))
+            for context, hammertime in list(running.items()):
+                stats = format_stats(hammertime.stats)
+                textutils.output_info(stats if len(running) == 1 else "%s %s" % (context.base_url, stats))
+            if textutils.output_manager.writer is not None:
+                textutils.output_info(format_output_stats(textutils.output_manager.writer))
             expiry = datetime.now() + timedelta(seconds=2)
 
         if sys.stdin.seekable():
@@ -0,0 +1,119 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from os.path import join
+
+
+class BlobStore:
+    """
+    Content addressed storage: each distinct body is written once, in `directory`/ab/abcdef..., named after its
+    SHA-256. Identical bodies, such as a login page or an error template seen many times, share the same blob.
+    Safe to use from several threads, a key returned by put() always refers to a blob already on disk.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.keys = set()
+        self.writing = {}
+        self.lock = threading.Lock()
+        self.stored = 0
+        self.deduplicated = 0
+        self.bytes_written = 0
+        self.bytes_saved = 0
+
+    def put(self, content):
+        """ Returns the key of the blob holding `content` (str is stored utf-8 encoded) """
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        key = hashlib.sha256(content).hexdigest()
+
+        while True:
+            with self.lock:
+                if key in self.keys:
+                    self.deduplicated += 1
+                    self.bytes_saved += len(content)
+                    return key
+                writing = self.writing.get(key)
+                if writing is None:
+                    writing = self.writing[key] = threading.Event()
+                    break
+            # Another thread is storing the same blob: it only becomes known once on disk, retry when it is done
+            writing.wait()
+
+        try:
+            exists = os.path.exists(self.path(key))
+            if not exists:
+                self._write(key, content)
+            with self.lock:
+                self.keys.add(key)
+                if exists:
+                    self.deduplicated += 1
+                    self.bytes_saved += len(content)
+                else:
+                    self.stored += 1
+                    self.bytes_written += len(content)
+        finally:
+            with self.lock:
+                del self.writing[key]
+            writing.set()
+        return key
+
+    def path(self, key):
+        return join(self.directory, key[:2], key)
+
+    def get(self, key):
+        with open(self.path(key), "rb") as fp:
+            return fp.read()
+
+    def link(self, key, target):
+        """ Make the blob available at `target`, as a hard link when the filesystem allows it """
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        if os.path.exists(target):
+            os.remove(target)
+        try:
+            os.link(self.path(key), target)
+        except OSError:
+            shutil.copyfile(self.path(key), target)
+
+    def _write(self, key, content):
+        directory = os.path.dirname(self.path(key))
+        os.makedirs(directory, exist_ok=True)
+        # Written aside then renamed, a blob is never seen partially written, even if two threads store it at once
+        descriptor, temporary = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(descriptor, "wb") as fp:
+                fp.write(content)
+            os.replace(temporary, self.path(key))
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+
+_stores = {}
+
+
+def get_store(directory):
+    """ One store per directory, so every writer of the scan shares the same known keys """
+    if directory not in _stores:
+        _stores[directory] = BlobStore(directory)
+    return _stores[directory]
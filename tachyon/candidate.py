@@ -0,0 +1,54 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+
+class Candidate:
+    """
+    A generated URL along with the descriptor (from paths.json, files.json or a plugin) it was created from.
+    Descriptors are shared between all their candidates rather than copied. Lookups other than "url" are forwarded to
+    the descriptor, so a candidate can be used wherever a descriptor dict is expected.
+    """
+
+    __slots__ = ("url", "descriptor", "suffix")
+
+    def __init__(self, url, descriptor, suffix=None):
+        self.url = url
+        self.descriptor = descriptor.descriptor if isinstance(descriptor, Candidate) else descriptor
+        # Index of the suffix in the generator's suffix list, if any
+        self.suffix = suffix
+
+    def __getitem__(self, key):
+        if key == "url":
+            return self.url
+        return self.descriptor[key]
+
+    def __contains__(self, key):
+        return key == "url" or key in self.descriptor
+
+    def get(self, key, default=None):
+        if key == "url":
+            return self.url
+        return self.descriptor.get(key, default)
+
+    def to_dict(self):
+        data = dict(self.descriptor)
+        data["url"] = self.url
+        return data
+
+    def __repr__(self):
+        return "Candidate(%r, %r)" % (self.url, self.descriptor)
@@ -0,0 +1,153 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+
+import os
+import pickle
+import time
+
+from tachyon.urlindex import UrlIndex
+
+
+FORMAT_VERSION = 1
+
+
+class CheckpointMismatch(Exception):
+    pass
+
+
+class Checkpoint:
+    """
+    Append-only journal of the progress of a scan: completed phases, plugin additions, valid paths, results and the
+    candidates already requested. Events are buffered and appended as one pickled batch at most every
+    `flush_interval` seconds, and whenever a phase completes. After a crash, at most the last interval is requested
+    again.
+
+    Reading an existing journal back (`resume=True`) restores its state, new events are appended after it. A truncated
+    last batch, as left by a kill, is ignored. Without a `path`, nothing is written and nothing is considered done.
+    """
+
+    def __init__(self, path=None, *, target=None, vhost=None, resume=False, flush_interval=5.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.phases = set()
+        self.paths = []
+        self.files = []
+        self.valid_paths = []
+        self.results = []
+        self.levels = []
+        self.done = {"path": UrlIndex(), "file": UrlIndex()}
+        self.pending = []
+        self.last_flush = time.monotonic()
+        self.fp = None
+
+        if path is None:
+            return
+
+        if resume and os.path.exists(path):
+            header = self._read(path)
+            if header is not None and header != (FORMAT_VERSION, target, vhost):
+                raise CheckpointMismatch("%s is not a checkpoint of this scan of %s" % (path, target))
+            self.fp = open(path, "ab")
+        else:
+            self.fp = open(path, "wb")
+        if self.fp.tell() == 0:
+            self._append(("scan", FORMAT_VERSION, target, vhost))
+            self.flush()
+
+    def is_done(self, kind, url):
+        return self.fp is not None and url in self.done[kind]
+
+    def add_done(self, kind, url):
+        if self.fp is not None:
+            self._append(("done", kind, url))
+
+    def add_valid_path(self, path):
+        if self.fp is not None:
+            self._append(("valid_path", path))
+
+    def add_result(self, record):
+        if self.fp is not None:
+            self._append(("result", record))
+
+    def start_level(self, depth, frontier_start):
+        """ Recursion `depth` expands the valid paths from index `frontier_start` """
+        if self.fp is not None:
+            self.levels.append((depth, frontier_start))
+            self._append(("level", depth, frontier_start))
+            self.flush()
+
+    def complete_phase(self, name, *, paths=(), files=()):
+        self.phases.add(name)
+        if self.fp is not None:
+            self._append(("phase", name, list(paths), list(files)))
+            self.flush()
+
+    def flush(self):
+        if self.fp is not None and self.pending:
+            pickle.dump(self.pending, self.fp, protocol=pickle.HIGHEST_PROTOCOL)
+            self.fp.flush()
+            self.pending = []
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        if self.fp is not None:
+            self.flush()
+            self.fp.close()
+            self.fp = None
+
+    def _append(self, event):
+        self.pending.append(event)
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def _read(self, path):
+        header = None
+        valid_length = 0
+        with open(path, "rb") as fp:
+            while True:
+                try:
+                    events = pickle.load(fp)
+                except EOFError:
+                    break
+                except Exception:
+                    # Batch cut short by a kill, drop it so new batches are appended after the last complete one
+                    break
+                valid_length = fp.tell()
+                for event in events:
+                    if event[0] == "scan":
+                        header = event[1:]
+                    else:
+                        self._apply(event)
+        os.truncate(path, valid_length)
+        return header
+
+    def _apply(self, event):
+        kind = event[0]
+        if kind == "done":
+            self.done[event[1]].add(event[2])
+        elif kind == "valid_path":
+            self.valid_paths.append(event[1])
+        elif kind == "result":
+            self.results.append(event[1])
+        elif kind == "level":
+            self.levels.append((event[1], event[2]))
+        elif kind == "phase":
+            self.phases.add(event[1])
+            self.paths.extend(event[2])
+            self.files.extend(event[3])
@@ -17,9 +17,6 @@
 # Place, Suite 330, Boston, MA  02111-1307  USA
 #
 
-from collections import defaultdict
-
-
 name = "delvelabs/tachyon"
 expected_file_responses = [200, 206]
 file_sample_len = 5120
@@ -27,16 +24,26 @@ file_sample_len = 5120
 # Templates, used by plugins
 path_template = {'url': '', 'description': ''}
 
-# User config
-target_host = ''
-base_url = ''
+# User config, the settings of each scan are in its tachyon.scancontext.ScanContext
 proxy_url = ''
-pre_crawled_paths = []
 forge_vhost = None
+default_user_agent = 'Mozilla/5.0 (Windows NT 6.1) AppleWebKit/537.36 (KHTML, like Gecko) ' \
+                     'Chrome/41.0.2228.0 Safari/537.36'
 # maximum compatibility
 user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko)'\
     ' Chrome/60.0.3112.113 Safari/537.36'
 cookies = None
-allow_download = False
-
-plugin_settings = defaultdict(list)
+# Maximum number of requests submitted to hammertime at once by the fetchers, 0 for no limit
+request_window = 1000
+# Number of results kept in memory for the revalidation, the next ones are moved to a temporary file. 0 for no limit
+result_spill_threshold = 10000
+# Response bodies kept as evidence (HAR, downloads) are stored once per distinct content in this directory
+blob_store_dir = "output/blobs"
+# Maximum number of entries per HAR file written with --har-output-dir
+har_segment_size = 1000
+# Number of results revalidated at once at the end of the scan
+revalidation_concurrency = 10
+# Age in seconds after which the calibration data kept with --kb-store-dir is no longer reused
+kb_ttl = 7 * 24 * 3600
+# Maximum number of seconds of progress lost when a scan written to a --checkpoint file is interrupted
+checkpoint_interval = 5.0
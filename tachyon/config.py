@@ -17,74 +17,128 @@
 # Place, Suite 330, Boston, MA  02111-1307  USA
 
 
+import asyncio
+
 from aiohttp import ClientSession, TCPConnector
 from aiohttp.cookiejar import DummyCookieJar
 from contextlib import asynccontextmanager
 from hammertime import HammerTime
-from hammertime.config import custom_event_loop
 from hammertime.engine import AioHttpEngine
 from hammertime.engine.scaling import SlowStartPolicy, StaticPolicy
+from hammertime.http import Entry
 from hammertime.kb import KnowledgeBase
-from hammertime.ruleset import StopRequest
+from hammertime.ruleset import Heuristics, RejectRequest, StopRequest
 from hammertime.rules.sampling import ContentHashSampling, ContentSampling, ContentSimhashSampling
 from hammertime.rules.waf import RejectWebApplicationFirewall
 from hammertime.rules import DetectSoft404, RejectStatusCode, DynamicTimeout, RejectCatchAllRedirect, FollowRedirects, \
     SetHeader, DeadHostDetection, FilterRequestFromURL, DetectBehaviorChange, IgnoreLargeBody, RedirectLimiter
 
-from tachyon import conf
-from tachyon.heuristics import RejectIgnoredQuery, LogBehaviorChange, MatchString, StripTag
-from tachyon.filefetcher import ValidateEntry
+from tachyon import conf, kbstore, textutils
+from tachyon.heuristics import RejectIgnoredQuery, LogBehaviorChange, MatchString, StripTag, ValidateEntry
 
-heuristics_with_child = []
 initial_limit = 5120
-default_user_agent = 'Mozilla/5.0 (Windows NT 6.1) AppleWebKit/537.36 (KHTML, like Gecko) ' \
-                     'Chrome/41.0.2228.0 Safari/537.36'
+default_user_agent = conf.default_user_agent
+
+
+def create_session(loop, cookies=None, limit=100, limit_per_host=0):
+    """
+    `limit` caps the connections opened at once over all hosts, `limit_per_host` those to the same host (0 for no
+    cap), so a session shared by the scans of several hosts does not let a slow one take every connection.
+    """
+    connector = TCPConnector(loop=loop, ssl=False, use_dns_cache=True, ttl_dns_cache=None, limit=limit,
+                             limit_per_host=limit_per_host)
+    if cookies is not None:
+        return ClientSession(loop=loop, connector=connector, cookie_jar=DummyCookieJar(loop=loop))
+    else:
+        return ClientSession(loop=loop, connector=connector)
 
 
 @asynccontextmanager
-async def configure_hammertime(proxy=None, retry_count=3, cookies=None, concurrency=0, **kwargs):
-    loop = custom_event_loop()
+async def configure_hammertime(context, proxy=None, retry_count=3, cookies=None, concurrency=0, kb_store=None,
+                               session=None, **kwargs):
+    """
+    HammerTime for the scan of the target of `context`. A `session` given by the caller is shared with other scans,
+    it is left open.
+    """
+    # The loop of the caller, custom_event_loop() would replace it by a new one with uvloop
+    loop = asyncio.get_running_loop()
     engine = AioHttpEngine(loop=loop, verify_ssl=False, proxy=proxy)
     await engine.session.close()
-    connector = TCPConnector(loop=loop, ssl=False, use_dns_cache=True, ttl_dns_cache=None)
-    if cookies is not None:
-        engine.session = ClientSession(loop=loop, connector=connector, cookie_jar=DummyCookieJar(loop=loop))
-    else:
-        engine.session = ClientSession(loop=loop, connector=connector)
+    owns_session = session is None
+    engine.session = create_session(loop, cookies) if owns_session else session
 
     scale_policy = SlowStartPolicy(initial=3)
     if concurrency > 0:
         scale_policy = StaticPolicy(concurrency)
 
     kb = KnowledgeBase()
+    hammertime = None
+    vhost = kwargs.get("vhost")
+    stored = kb_store.load(context.base_url, vhost) if kb_store is not None else None
+    if stored is not None:
+        stored.populate(kb)
     try:
         hammertime = HammerTime(loop=loop, request_engine=engine, retry_count=retry_count, proxy=proxy, kb=kb,
                                 scale_policy=scale_policy)
-        setup_hammertime_heuristics(hammertime, **kwargs)
+        setup_hammertime_heuristics(hammertime, context, **kwargs)
         hammertime.collect_successful_requests()
         hammertime.kb = kb
+        fingerprint = None
+        if kb_store is not None:
+            fingerprint = await probe_fingerprint(hammertime, context)
+            if stored is not None and not kbstore.fingerprint_matches(stored.fingerprint, fingerprint):
+                kbstore.reset(kb)
         yield hammertime
+        if fingerprint is not None:
+            kb_store.save(kb, context.base_url, vhost, fingerprint)
     finally:
-        await engine.session.close()
+        archive = getattr(hammertime, "har_archive", None)
+        if archive is not None:
+            # Completes the last segment and stops the writer thread, waiting for the entries still queued
+            await loop.run_in_executor(None, archive.close)
+            if archive.failed:
+                textutils.output_error("%d HAR entries could not be written: %s" % (archive.failed, archive.last_error))
+        if owns_session:
+            await engine.session.close()
+
+
+async def probe_fingerprint(hammertime, context):
+    """ Status code and content simhash of a random path, None if the host did not answer """
+    from uuid import uuid4
+
+    heuristics = Heuristics(request_engine=hammertime.request_engine)
+    heuristics.add_multiple(hammertime.probe_heuristics)
+    try:
+        entry = await hammertime.request_engine.perform_high_priority(
+            Entry.create("%s/%s" % (context.base_url, uuid4().hex)), heuristics)
+    except (StopRequest, RejectRequest):
+        return None
+    simhash = entry.result.content_simhash
+    return {"code": entry.response.code, "simhash": simhash.value if simhash is not None else None}
 
 
-def setup_hammertime_heuristics(hammertime, *,
+def setup_hammertime_heuristics(hammertime, context, *,
                                 user_agent=default_user_agent, vhost=None, confirmation_factor=1,
-                                har_output_dir=None):
-    global heuristics_with_child
+                                har_output_dir=None, har_compress=False):
+    """
+    The heuristics with child heuristics and the ones used for probes are kept on `hammertime`, each scan of the
+    process has its own.
+    """
     dead_host_detection = DeadHostDetection(threshold=200)
     detect_soft_404 = DetectSoft404(distance_threshold=6, confirmation_factor=confirmation_factor)
     follow_redirects = FollowRedirects()
     heuristics_with_child = [RejectCatchAllRedirect(), follow_redirects,
                              RejectIgnoredQuery()]
-    hosts = (vhost, conf.target_host) if vhost is not None else conf.target_host
+    hosts = (vhost, context.target_host) if vhost is not None else context.target_host
 
     init_heuristics = [SetHeader("User-Agent", user_agent),
-                       SetHeader("Host", vhost if vhost is not None else conf.target_host),
+                       SetHeader("Host", vhost if vhost is not None else context.target_host),
                        ContentHashSampling(), ContentSampling(), ContentSimhashSampling(),
                        dead_host_detection,
                        RejectStatusCode({503, 508}, exception_class=StopRequest),
-                       StripTag('input'), StripTag('script')]
+                       StripTag('input', 'script')]
+    hammertime.heuristics_with_child = heuristics_with_child
+    hammertime.probe_heuristics = init_heuristics
 
     global_heuristics = [RejectStatusCode({404, 406, 502}),
                          RejectWebApplicationFirewall(),
@@ -115,14 +169,18 @@ def setup_hammertime_heuristics(hammertime, *,
         heuristic.child_heuristics.add_multiple(global_heuristics)
 
     if har_output_dir is not None:
-        from tachyon.har import StoreHAR, FileWriter
-        hammertime.heuristics.add(StoreHAR(writer=FileWriter(har_output_dir)))
+        from tachyon.blobstore import get_store
+        from tachyon.har import StoreHAR, HARArchive
+        archive = HARArchive(har_output_dir, segment_size=conf.har_segment_size, compress=har_compress,
+                             blob_store=get_store(conf.blob_store_dir))
+        hammertime.heuristics.add(StoreHAR(writer=archive))
+        hammertime.har_archive = archive
 
 
 def add_http_header(hammertime, header_name, header_value):
     set_header = SetHeader(header_name, header_value)
     hammertime.heuristics.add(set_header)
-    for heuristic in heuristics_with_child:
+    for heuristic in getattr(hammertime, "heuristics_with_child", []):
         heuristic.child_heuristics.add(set_header)
 
 
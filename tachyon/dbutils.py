@@ -17,37 +17,89 @@
 # Place, Suite 330, Boston, MA  02111-1307  USA
 #
 
-from tachyon import database
+from contextlib import contextmanager
+from contextvars import ContextVar
 
+from tachyon.urlindex import UrlIndex
 
-def _get_cached_url_string(url_obj):
-    if len(url_obj['url']) == 1 and url_obj['url'] == '/':
-        return url_obj['url']
 
-    return url_obj['url'].strip('/')
+_additions = ContextVar("additions", default=None)
 
 
-def add_path_to_fetch_queue(url_obj):
+class Additions:
+    """
+     Paths and files added by a plugin while it runs concurrently with others. They are kept aside and merged into
+     the scan context afterwards so the final order does not depend on which plugin finished first.
+    """
+
+    def __init__(self, context):
+        self.context = context
+        self.paths = []
+        self.files = []
+        self.paths_index = UrlIndex()
+        self.files_index = UrlIndex()
+
+    def add_path(self, url_obj):
+        return self._add(url_obj, self.paths, self.paths_index, self.context.paths_index)
+
+    def add_file(self, url_obj):
+        return self._add(url_obj, self.files, self.files_index, self.context.files_index)
+
+    def _add(self, url_obj, entries, index, context_index):
+        if url_obj['url'] in context_index or not index.add(url_obj['url']):
+            return False
+        entries.append(url_obj)
+        return True
+
+
+@contextmanager
+def collect_additions(context):
+    """ add_path and add_file calls made within the block (and the tasks it spawns) go to the yielded Additions """
+    additions = Additions(context)
+    token = _additions.set(additions)
+    try:
+        yield additions
+    finally:
+        _additions.reset(token)
+
+
+def merge_additions(context, additions):
+    """ Add the collected entries to the scan context, `additions` is left with the ones that were not known yet """
+    additions.paths = [path for path in additions.paths if add_path(context, path)]
+    additions.files = [file for file in additions.files if add_file(context, file)]
+
+
+def add_path_to_fetch_queue(context, url_obj):
     """
      Add a path to the fetch queue but makes sure it's not already there.
      returns True if the path was not in the list, False if it's a duplicate
     """
-    url_string = _get_cached_url_string(url_obj)
-    if url_string not in database.path_cache:
-        database.path_cache.add(url_string)
+    return context.path_cache.add(url_obj['url'])
+
+
+def add_path(context, url_obj):
+    """
+     Add a path to the paths of the scan unless an equivalent url was already added.
+     returns True if the path was added, False if it's a duplicate
+    """
+    additions = _additions.get()
+    if additions is not None and additions.context is context:
+        return additions.add_path(url_obj)
+    if context.paths_index.add(url_obj['url']):
+        context.paths.append(url_obj)
         return True
-    else:
-        return False
+    return False
 
 
-def add_file_to_fetch_queue(url_obj):
+def add_file(context, url_obj):
     """
-     Add a file to the fetch queue but makes sure it's not already there.
-     returns True if the file was not in the list, False if it's a duplicate
+     Add a file to the files of the scan unless an equivalent url was already added.
+     returns True if the file was added, False if it's a duplicate
     """
-    url_string = _get_cached_url_string(url_obj)
-    if url_string not in database.file_cache:
-        database.file_cache.add(url_string)
+    additions = _additions.get()
+    if additions is not None and additions.context is context:
+        return additions.add_file(url_obj)
+    if context.files_index.add(url_obj['url']):
+        context.files.append(url_obj)
         return True
-    else:
-        return False
+    return False
@@ -19,44 +19,58 @@
 
 from urllib.parse import urljoin
 
-from hammertime.rules.deadhostdetection import OfflineHostException
-from hammertime.ruleset import RejectRequest, StopRequest
-
 from .textutils import output_manager, PrettyOutput
+from .requestwindow import RequestWindow
 from .result import ResultAccumulator
-from tachyon import database
 
 
 class DirectoryFetcher:
 
-    def __init__(self, target_host, hammertime, accumulator=None):
-        self.target_host = target_host
+    def __init__(self, context, hammertime, accumulator=None, window_size=0):
+        self.context = context
         self.hammertime = hammertime
-        self.accumulator = accumulator or ResultAccumulator(output_manager=output_manager or PrettyOutput())
+        self.accumulator = accumulator or ResultAccumulator(output_manager=output_manager or PrettyOutput(),
+                                                            context=context)
+        self.window_size = window_size
 
     async def fetch_paths(self, paths):
-        for path in paths:
-            url = urljoin(self.target_host, path["url"])
-            if url[-1] != "/":
-                url += "/"
-            self.hammertime.request(url, arguments={"path": path})
+        """ Paths the checkpoint of the scan reports as done were requested by a previous run and are skipped. """
+        from hammertime.rules.deadhostdetection import OfflineHostException
+        from hammertime.ruleset import RejectRequest, StopRequest
+
+        checkpoint = self.context.checkpoint
+        paths = (path for path in paths if not checkpoint.is_done("path", path["url"]))
 
-        iterator = self.hammertime.successful_requests()
+        def on_failure(arguments, error):
+            if not isinstance(error, OfflineHostException):
+                checkpoint.add_done("path", arguments["path"]["url"])
 
-        # Really make sure we are done (issue in hammertime 0.5.1 when first request is a failure?)
-        while iterator.has_pending():
-            async for entry in iterator:
+        window = RequestWindow(self.hammertime, self.window_size, on_failure=on_failure)
+        window.submit((self._to_url(path), {"path": path}) for path in paths)
+
+        try:
+            async for entry in window.successful_requests():
                 try:
                     if "path" not in entry.arguments:
                         continue
 
                     if entry.response.code != 401:
-                        database.valid_paths.append(entry.arguments["path"])
+                        self.context.valid_paths.append(entry.arguments["path"])
+                        checkpoint.add_valid_path(entry.arguments["path"])
                     if entry.arguments["path"]["url"] != "/":
                         self.accumulator.add_entry(entry)
+                    checkpoint.add_done("path", entry.arguments["path"]["url"])
                 except OfflineHostException:
                     raise
                 except RejectRequest:
                     pass
                 except StopRequest:
                     continue
+        finally:
+            window.close()
+
+    def _to_url(self, path):
+        url = urljoin(self.context.base_url, path["url"])
+        if url[-1] != "/":
+            url += "/"
+        return url
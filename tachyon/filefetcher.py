@@ -19,56 +19,57 @@
 
 from urllib.parse import urljoin
 
-from hammertime.rules.deadhostdetection import OfflineHostException
-from hammertime.ruleset import StopRequest, RejectRequest
-
 from .textutils import output_manager, PrettyOutput
+from .requestwindow import RequestWindow
 from .result import ResultAccumulator
 
 
 class FileFetcher:
 
-    def __init__(self, host, hammertime, accumulator=None):
-        self.host = host
+    def __init__(self, context, hammertime, accumulator=None, window_size=0):
+        self.context = context
         self.hammertime = hammertime
-        self.accumulator = accumulator or ResultAccumulator(output_manager=output_manager or PrettyOutput())
+        self.accumulator = accumulator or ResultAccumulator(output_manager=output_manager or PrettyOutput(),
+                                                            context=context)
+        self.window_size = window_size
 
     async def fetch_files(self, file_list):
-        for file in file_list:
-            url = urljoin(self.host, file["url"])
-            self.hammertime.request(url, arguments={"file": file})
+        """
+        `file_list` can be any iterable, it is consumed lazily as room opens up in the request window. Files the
+        checkpoint of the scan reports as done were requested by a previous run and are skipped.
+        """
+        from hammertime.rules.deadhostdetection import OfflineHostException
+        from hammertime.ruleset import StopRequest, RejectRequest
+
+        checkpoint = self.context.checkpoint
+        file_list = (file for file in file_list if not checkpoint.is_done("file", file["url"]))
+
+        def on_failure(arguments, error):
+            if not isinstance(error, OfflineHostException):
+                checkpoint.add_done("file", arguments["file"]["url"])
 
-        iterator = self.hammertime.successful_requests()
+        window = RequestWindow(self.hammertime, self.window_size, on_failure=on_failure)
+        window.submit((urljoin(self.context.base_url, file["url"]), {"file": file}) for file in file_list)
 
-        # Really make sure we are done (issue in hammertime 0.5.1 when first request is a failure?)
-        while iterator.has_pending():
-            async for entry in iterator:
+        try:
+            async for entry in window.successful_requests():
                 try:
                     self.accumulator.add_entry(entry)
+                    if "file" in entry.arguments:
+                        checkpoint.add_done("file", entry.arguments["file"]["url"])
                 except OfflineHostException:
                     raise
                 except RejectRequest:
                     pass
                 except StopRequest:
                     continue
+        finally:
+            window.close()
 
 
-class ValidateEntry:
-    """
-    Combines the RejectSoft404 and RejectErrorBehavior, but excludes problems when
-    the result requested a string match and found it.
-    """
-
-    async def after_response(self, entry):
-        if entry.result.string_match:
-            # We found what we were looking for, this entry has to be valid.
-            return
-
-        if getattr(entry.result, "error_behavior", False):
-            raise StopRequest("Error behavior detected.")
-        if getattr(entry.result, "soft404", False):
-            raise RejectRequest("Soft 404 detected")
-
-    async def on_request_successful(self, entry):
-        # Apply the same logic as on response
-        await self.after_response(entry)
+def __getattr__(name):
+    # ValidateEntry now lives with the other heuristics, it is only imported when requested to keep this module light
+    if name == "ValidateEntry":
+        from tachyon.heuristics import ValidateEntry
+        return ValidateEntry
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
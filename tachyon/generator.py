@@ -17,56 +17,75 @@
 # Place, Suite 330, Boston, MA  02111-1307  USA
 
 
-import tachyon.database as database
+import time
+from collections import namedtuple
+
+from tachyon.candidate import Candidate
+from tachyon.scheduler import prioritize
+from tachyon.urlindex import UrlIndex, canonical_path
+
+
+LevelStats = namedtuple("LevelStats", ["depth", "directories", "generated", "duration"])
 
 
 class PathGenerator:
 
-    def generate_paths(self, *, use_valid_paths):
+    def __init__(self, context):
+        self.context = context
+        # Valid paths before this index were already expanded, the ones after it form the recursion frontier
+        self.frontier_start = 0
+        self.level_stats = []
+
+    def generate_paths(self, *, use_valid_paths, depth=None):
+        """ Expansions of the valid paths at a recursion `depth` are recorded in level_stats, not pre-crawled ones """
         generated_paths = []
         if use_valid_paths:
-            generated_paths.extend(self._create_new_paths_from_valid_paths())
-            database.path_cache.update(path["url"] for path in generated_paths)
+            start = time.perf_counter()
+            frontier = self._next_frontier()
+            generated_paths.extend(self._create_new_paths_from_frontier(frontier))
+            if depth is not None:
+                self.level_stats.append(LevelStats(depth=depth, directories=len(frontier),
+                                                   generated=len(generated_paths),
+                                                   duration=time.perf_counter() - start))
         else:
-            generated_paths.extend([path for path in self._database_paths()])
+            generated_paths.extend([path for path in self._loaded_paths()])
             generated_paths.extend([file for file in self._use_files_as_paths()])
         return generated_paths
 
-    def _database_paths(self):
-        for path in database.paths:
-            if path["url"] not in database.path_cache:
-                database.path_cache.add(path["url"])
+    def _loaded_paths(self):
+        for path in prioritize(self.context.paths):
+            if self.context.path_cache.add(path["url"]):
                 yield path
 
     def _use_files_as_paths(self):
-        for file in database.files:
+        for file in prioritize(self.context.files):
             path = "/%s" % file["url"]
-            if not file.get("no_suffix") and path not in database.path_cache:
-                file_as_path = file.copy()
-                file_as_path["url"] = path
-                database.path_cache.add(path)
-                yield file_as_path
-
-    def _create_new_paths_from_valid_paths(self):
-        new_paths = []
-        for path in database.valid_paths:
-            for _path in database.paths:
+            if not file.get("no_suffix") and self.context.path_cache.add(path):
+                yield Candidate(path, file)
+
+    def _next_frontier(self):
+        """ Valid paths found since the previous expansion. Older ones were already joined with every path. """
+        frontier = self.context.valid_paths[self.frontier_start:]
+        self.frontier_start = len(self.context.valid_paths)
+        return frontier
+
+    def _create_new_paths_from_frontier(self, frontier):
+        for _path in prioritize(self.context.paths):
+            for path in frontier:
                 new_path = self._join_paths(path, _path)
-                if new_path is not None and new_path["url"] not in database.path_cache:
-                    new_paths.append(new_path)
-        return new_paths
+                if new_path is not None and self.context.path_cache.add(new_path["url"]):
+                    yield new_path
 
     def _join_paths(self, leading_path, trailing_path):
         if leading_path["url"] != "/" and trailing_path["url"] != "/":
-            new_path = trailing_path.copy()
-            new_path["url"] = leading_path["url"] + trailing_path["url"]
-            return new_path
+            return Candidate(leading_path["url"] + trailing_path["url"], trailing_path)
         return None
 
 
 class FileGenerator:
 
-    def __init__(self):
+    def __init__(self, context):
+        self.context = context
         self.file_suffixes = ['', '.sql', '.bak', '-bak', '.old', '-old', '.dmp', '.dump', '.zip', '.rar', '.7z',
                               '.tar.gz', '.tar.bz2', '.tar', '.tgz', '~', '.conf.old', '.conf', '.config', '.conf.orig',
                               '.conf.bak', '.cnf', '.cfg', '.ini', '.inc', '.inc.old', '.inc.orig', '.log', '.txt',
@@ -75,45 +94,114 @@ class FileGenerator:
         self.executables_suffixes = ['.php', '.asp', '.aspx', '.pl', '.cgi', '.cfm']
 
     def generate_files(self, skip_root=False):
-        files = list()
-        for path in database.valid_paths:
-            if not skip_root or not self._is_root(path):
-                files.extend(self._add_all_possible_files_to_path(path))
-        return files
+        """
+        Lazily yield every file candidate, so requests can start before the whole expansion is done. Candidates come
+        out by descriptor priority, each descriptor being tried on every valid path before moving to the next one.
+
+        Candidates are deduplicated without keeping a key for each of them, that would grow with files x paths. A valid
+        path is joined with the files once per scan and a file name (file and suffix) is used once per generation.
+        A URL reachable from several directories, through names having a directory part, is only requested from the
+        directories joined with the files first, the deepest of them if there are several. The files are not expected
+        to change between generations.
+        """
+        paths = self._paths_to_expand(skip_root)
+        current = {canonical_path(path["url"]) for path in paths}
+        self.context.file_directories.update(current)
+        nested, tails = self._nested_names()
+        expanding = [(self._prefix(path["url"]), self._segments(path["url"])) for path in paths]
+
+        self.context.file_names = UrlIndex()
+        for file in prioritize(self.context.files):
+            file_names = []
+            for name, suffix in self._names_of(file):
+                if self.context.file_names.add(name):
+                    key = self._canonical(name)
+                    file_names.append((name.strip("/"), suffix, key in nested or key in tails))
+            for prefix, segments in expanding:
+                for name, suffix, shared in file_names:
+                    if not shared or not self._generated_elsewhere(segments, name, nested, tails, current):
+                        yield Candidate(prefix + name, file, suffix)
+
+    def count_files(self, skip_root=False):
+        """
+        Upper bound of the number of candidates generate_files() will yield: every file name on every path to expand.
+        It is exact unless file names are duplicated or have a directory part.
+        """
+        names = sum(1 if file.get('no_suffix') else len(self._suffixes_of(file)) for file in self.context.files)
+        return names * len(self._paths_to_expand(skip_root))
+
+    def _paths_to_expand(self, skip_root):
+        """ Valid paths not joined with the files yet """
+        paths = []
+        expanded = UrlIndex()
+        for path in self.context.valid_paths:
+            if (not skip_root or not self._is_root(path)) and path["url"] not in self.context.file_directories \
+                    and expanded.add(path["url"]):
+                paths.append(path)
+        return paths
+
+    def _nested_names(self):
+        """
+        File names having a directory part, and their trailing parts that are file names as well: the only ones
+        whose candidates can also be reached from another directory.
+        """
+        nested = set()
+        for file in self.context.files:
+            if "/" in file["url"].strip("/"):
+                nested.update(canonical_path(name) for name, _ in self._names_of(file))
+        tails = set()
+        for name in nested:
+            parts = name.split("/")
+            tails.update("/".join(parts[i:]) for i in range(1, len(parts)))
+        if tails:
+            names = (self._canonical(name) for file in self.context.files for name, _ in self._names_of(file))
+            tails = {name for name in names if name in tails}
+        return nested, tails
+
+    def _generated_elsewhere(self, segments, name, nested, tails, current):
+        """
+        True if the candidate of `name` in the directory made of `segments` is also the one of another file name in
+        another directory that takes precedence: one joined with the files by a previous generation, or a deeper one
+        joined by this generation.
+        """
+        parts = segments + canonical_path(name).split("/")
+        for depth in range(len(parts)):
+            if depth == len(segments):
+                continue
+            directory = "/".join(parts[:depth]) or "/"
+            rest = "/".join(parts[depth:])
+            if depth < len(segments):
+                if rest in nested and directory in self.context.file_directories and directory not in current:
+                    return True
+            elif rest in tails and directory in self.context.file_directories:
+                return True
+        return False
+
+    def _names_of(self, file):
+        """ File names and suffix indexes of the candidates of a descriptor """
+        if file.get('no_suffix'):
+            return [(file["url"], None)]
+        return [(file["url"] + suffix, index) for index, suffix in enumerate(self._suffixes_of(file))]
+
+    def _suffixes_of(self, file):
+        return self.executables_suffixes if file.get('executable') else self.file_suffixes
+
+    def _canonical(self, name):
+        return canonical_path(name) if "/" in name else name
+
+    def _prefix(self, base_path):
+        """ What _join_path() puts before the file name """
+        return "/" if base_path == "/" else "/%s/" % base_path.strip("/")
+
+    def _segments(self, path):
+        path = canonical_path(path)
+        return [] if path == "/" else path.split("/")
 
     def _is_root(self, path):
-        if path == "/":
-            return True
-        elif isinstance(path, dict):
-            return self._is_root(path["url"])
+        if isinstance(path, str):
+            return path == "/"
         else:
-            return False
-
-    def _add_all_possible_files_to_path(self, path):
-        for file in database.files:
-            if file.get('no_suffix'):
-                new_filename = self._create_file(file, path, is_file=True, no_suffix=True)
-                yield new_filename
-            elif file.get('executable'):
-                yield from self._create_executable_files(path, file)
-            else:
-                yield from self._create_files_with_suffixe(path, file)
-
-    def _create_executable_files(self, path, file):
-        for executable_suffix in self.executables_suffixes:
-            new_filename = self._create_file(file, path, suffix=executable_suffix, is_file=True, executable=True)
-            yield new_filename
-
-    def _create_files_with_suffixe(self, path, file):
-        for suffix in self.file_suffixes:
-            new_filename = self._create_file(file, path, suffix=suffix, is_file=True)
-            yield new_filename
-
-    def _create_file(self, base_file, path, suffix="", **kwargs):
-        url = self._join_path(path["url"], base_file["url"] + suffix)
-        file = base_file.copy()
-        file.update(url=url, **kwargs)
-        return file
+            return path["url"] == "/"
 
     def _join_path(self, base_path, file_path):
         if base_path == "/":
@@ -1,35 +1,148 @@
-import asyncio
+import atexit
+import gzip
 import json
-import uuid
+import queue
+import threading
 from os.path import join
 
 from hammertime.utils.har import HammerTimeToHAR
-from marshmallow_har import HAR, Creator
+from marshmallow_har import Creator
 from tachyon.__version__ import __version__
 
 
-class FileWriter:
+def dump(har):
+    data = har.dump()
+    # marshmallow 2 returns (data, errors)
+    return data[0] if isinstance(data, tuple) else data
 
-    def __init__(self, output_dir):
+
+class HARArchive:
+    """
+    Writes the entries of the scan in HAR files of at most `segment_size` entries (tachyon-0001.har,
+    tachyon-0002.har, ...), optionally gzip compressed. A segment is a complete HAR document once the next one is
+    started or the archive is closed.
+
+    Conversion and writes are done by a dedicated thread fed through a bounded queue. add() returns the locator of
+    the entry: the segment path and the index of its first HAR entry, as a followed redirect chain expands into one
+    HAR entry per step. While the queue is full, add() waits for room: every result keeps its evidence. Entries that
+    fail to convert or write are counted in `failed`, the last error is kept in `last_error`.
+
+    With a `blob_store`, response bodies are not embedded: the content of each HAR entry references its blob through
+    a "_blob" field holding the SHA-256 of the body.
+    """
+
+    def __init__(self, output_dir, segment_size=1000, compress=False, queue_size=1000, blob_store=None):
         self.dir = output_dir
+        self.blob_store = blob_store
+        self.segment_size = segment_size
+        self.compress = compress
+        self.converter = HammerTimeToHAR()
+        self.creator = Creator(name="Tachyon", version=__version__)
+        self.segment = 1
+        self.index = 0
+        self.closed = False
+        self.failed = 0
+        self.last_error = None
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = threading.Thread(target=self._run, name="tachyon-har", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def add(self, entry):
+        if self.closed:
+            return None
+
+        count = len(entry.result.redirects) or 1
+        if self.index > 0 and self.index + count > self.segment_size:
+            self.segment += 1
+            self.index = 0
+
+        locator = "%s#%d" % (self.segment_path(self.segment), self.index)
+        self.index += count
+        self.queue.put((self.segment, entry))
+        return locator
+
+    def segment_path(self, segment):
+        return join(self.dir, "tachyon-%04d.har%s" % (segment, ".gz" if self.compress else ""))
 
-    def __call__(self, har: HAR):
-        filename = "%s.har" % uuid.uuid4()
-        file_path = join(self.dir, filename)
-        with open(file_path, "w") as fp:
-            fp.write(json.dumps(har.dump(), indent=4))
-        return file_path
+    def flush(self):
+        """ Wait until the entries added so far are written """
+        self.queue.join()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.queue.put(None)
+            self.thread.join()
+            atexit.unregister(self.close)
+
+    def _run(self):
+        segment = None
+        output = None
+        first = True
+        try:
+            while True:
+                item = self.queue.get()
+                try:
+                    if item is None:
+                        return
+
+                    number, entry = item
+                    try:
+                        if number != segment:
+                            if output is not None:
+                                self._end_segment(output)
+                            segment, output = number, None
+                            output = self._start_segment(number)
+                            first = True
+
+                        har = self.converter.convert_entries([entry], creator=self.creator)
+                        har_entries = dump(har)["log"]["entries"]
+                        if self.blob_store is not None:
+                            self._reference_blobs(entry, har_entries)
+                        for har_entry in har_entries:
+                            output.write(("" if first else ",") + json.dumps(har_entry, separators=(",", ":")))
+                            first = False
+                    except Exception as e:
+                        # The writer must keep draining the queue whatever happens, producers would block otherwise
+                        self.failed += 1
+                        self.last_error = e
+                finally:
+                    self.queue.task_done()
+        finally:
+            if output is not None:
+                self._end_segment(output)
+
+    def _reference_blobs(self, entry, har_entries):
+        # Same expansion as HammerTimeToHAR.convert_entries, one HAR entry per redirect step
+        for step, har_entry in zip(entry.result.redirects or [entry], har_entries):
+            if step.response is None or "response" not in har_entry:
+                continue
+            raw = step.response.raw
+            content = har_entry["response"]["content"]
+            content["_blob"] = self.blob_store.put(raw)
+            content["size"] = len(raw)
+            content["text"] = ""
+
+    def _start_segment(self, number):
+        path = self.segment_path(number)
+        output = gzip.open(path, "wt", encoding="utf-8") if self.compress else open(path, "w", encoding="utf-8")
+        log = dump(self.converter.convert_entries([], creator=self.creator))["log"]
+        log.pop("entries", None)
+        # The log fields without the closing brace, the entries are streamed after them
+        fields = json.dumps(log, separators=(",", ":"))[:-1]
+        output.write('{"log":' + fields + ("," if log else "") + '"entries":[')
+        return output
+
+    def _end_segment(self, output):
+        output.write("]}}")
+        output.close()
 
 
 class StoreHAR:
 
     def __init__(self, writer):
         self.writer = writer
-        self.converter = HammerTimeToHAR()
 
     async def on_request_successful(self, entry):
-        await asyncio.get_event_loop().run_in_executor(None, self._write_har, entry)
-
-    def _write_har(self, entry):
-        har = self.converter.convert_entries([entry], creator=Creator(name="Tachyon", version=__version__))
-        entry.result.har_location = self.writer(har)
+        entry.result.har_location = self.writer.add(entry)
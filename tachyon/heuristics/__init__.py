@@ -21,6 +21,7 @@ from .logbehaviorchange import LogBehaviorChange
 from .matchstring import MatchString
 from .rejectignoredquery import RejectIgnoredQuery
 from .striptag import StripTag
+from .validateentry import ValidateEntry
 
 
 __all__ = [
@@ -28,4 +29,5 @@ __all__ = [
     MatchString,
     RejectIgnoredQuery,
     StripTag,
+    ValidateEntry,
 ]
@@ -18,21 +18,91 @@
 
 
 import binascii
+import re
+
+
+SIGNATURE_KEYS = ("match_string", "match_bytes", "match_regex", "match_limit")
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+class Signature:
+    """
+    The match_string, match_bytes (hexadecimal) and match_regex of a descriptor, each being a single value or a
+    list of them. The descriptor matches if any of them is found in the response. Multiple patterns are combined
+    into a single regular expression so the body is scanned once. match_limit bounds the number of bytes scanned.
+    """
+
+    __slots__ = ("literal", "pattern", "patterns", "limit")
+
+    def __init__(self, match_string=None, match_bytes=None, match_regex=None, match_limit=None):
+        literals = [string.encode("utf-8") for string in _as_list(match_string)]
+        literals += [binascii.unhexlify(hex_string.encode("utf-8")) for hex_string in _as_list(match_bytes)]
+        regexes = [regex.encode("utf-8") for regex in _as_list(match_regex)]
+
+        self.limit = match_limit
+        self.literal = None
+        self.pattern = None
+        self.patterns = []
+        if len(literals) == 1 and not regexes:
+            # A plain substring search is faster than any regular expression
+            self.literal = literals[0]
+        else:
+            alternatives = [re.escape(literal) for literal in literals] + regexes
+            try:
+                self.pattern = re.compile(b"|".join(b"(?:%s)" % alternative for alternative in alternatives))
+            except re.error:
+                # Patterns with inline flags can't be combined
+                self.patterns = [re.compile(alternative) for alternative in alternatives]
+
+    @classmethod
+    def from_descriptor(cls, descriptor):
+        return cls(**{key: descriptor.get(key) for key in SIGNATURE_KEYS})
+
+    def match(self, content, limit=None):
+        """ `limit` applies when the signature has no match_limit of its own """
+        end = self.limit or limit or len(content)
+        if self.literal is not None:
+            return content.find(self.literal, 0, end) != -1
+        if self.pattern is not None:
+            return self.pattern.search(content, 0, end) is not None
+        return any(pattern.search(content, 0, end) is not None for pattern in self.patterns)
 
 
 class MatchString:
+    """
+    Sets entry.result.string_match for files whose descriptor has a signature. Signatures are compiled the first
+    time they are seen and shared by every descriptor with the same signature, so the cost per response does not
+    depend on how they are written. `max_scan_bytes` bounds the number of body bytes scanned by default.
+    """
+
+    def __init__(self, max_scan_bytes=None):
+        self.max_scan_bytes = max_scan_bytes
+        self.signatures = {}
 
     async def before_request(self, entry):
         entry.result.string_match = False
 
     async def after_response(self, entry):
         if "file" in entry.arguments:
-            if "match_string" in entry.arguments["file"]:
-                byte_string = entry.arguments["file"]["match_string"].encode("utf-8")
-                entry.result.string_match = byte_string in entry.response.raw
-            elif "match_bytes" in entry.arguments["file"]:
-                raw_hex_string = entry.arguments["file"]["match_bytes"].encode("utf-8")
-                raw_string = binascii.unhexlify(raw_hex_string)
-                entry.result.string_match = raw_string in entry.response.raw
-            else:
+            signature = self.get_signature(entry.arguments["file"])
+            if signature is None:
                 entry.result.string_match = False
+            else:
+                entry.result.string_match = signature.match(entry.response.raw, self.max_scan_bytes)
+
+    def get_signature(self, descriptor):
+        key = tuple(self._hashable(descriptor.get(name)) for name in SIGNATURE_KEYS)
+        if not any(key[:3]):
+            return None
+        if key not in self.signatures:
+            self.signatures[key] = Signature.from_descriptor(descriptor)
+        return self.signatures[key]
+
+    @staticmethod
+    def _hashable(value):
+        return tuple(value) if isinstance(value, list) else value
@@ -17,6 +17,8 @@
 # Place, Suite 330, Boston, MA  02111-1307  USA
 
 
+import asyncio
+from collections import OrderedDict
 from uuid import uuid4
 from urllib.parse import urlparse
 from hammertime.http import Entry
@@ -25,11 +27,39 @@ from hammertime.rules.simhash import Simhash, DEFAULT_FILTER
 import hashlib
 
 
+class SampleCache(OrderedDict):
+    """ Dictionary keeping the `maxsize` most recently used entries. """
+
+    def __init__(self, maxsize=10000, items=()):
+        super().__init__()
+        self.maxsize = maxsize
+        self.update(items)
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.maxsize:
+            self.popitem(last=False)
+
+
 class RejectIgnoredQuery:
+    """
+    Rejects responses to URLs with a query string when the response is the same as the one obtained with a random
+    query on the same path. The sample of each path is requested once, concurrent requests on a path without a sample
+    share the same probe.
+    """
 
-    def __init__(self, match_treshold=5, match_filter=DEFAULT_FILTER, token_size=4):
+    def __init__(self, match_treshold=5, match_filter=DEFAULT_FILTER, token_size=4, max_samples=10000):
         self.engine = None
-        self.samples = {}
+        self.max_samples = max_samples
+        self.samples = SampleCache(max_samples)
+        self.simhashes = SampleCache(max_samples)
+        self.pending = {}
         self.match_threshold = match_treshold
         self.match_filter = match_filter
         self.token_size = token_size
@@ -47,6 +77,8 @@ class RejectIgnoredQuery:
         self.child_heuristics = heuristics
 
     async def after_response(self, entry):
+        if "?" not in entry.request.url:
+            return
         url = urlparse(entry.request.url)
         if len(url.query) > 0:
             sample_simhash = await self._get_sample(url)
@@ -58,11 +90,22 @@ class RejectIgnoredQuery:
         try:
             return self.samples[sample_key]
         except KeyError:
-            random_query = "{scheme}://{netloc}{path}?{query}"\
-                .format(scheme=parsed_url.scheme, netloc=parsed_url.netloc, path=parsed_url.path, query=str(uuid4()))
-            sample = await self.engine.perform_high_priority(Entry.create(random_query), self.child_heuristics)
-            self.samples[sample_key] = self._hash_response(sample.response)
-            return self.samples[sample_key]
+            pass
+
+        probe = self.pending.get(sample_key)
+        if probe is None:
+            probe = asyncio.ensure_future(self._take_sample(parsed_url, sample_key))
+            self.pending[sample_key] = probe
+            probe.add_done_callback(lambda _: self.pending.pop(sample_key, None))
+        # A waiter being cancelled must not cancel the probe the others are waiting on
+        return await asyncio.shield(probe)
+
+    async def _take_sample(self, parsed_url, sample_key):
+        random_query = "{scheme}://{netloc}{path}?{query}"\
+            .format(scheme=parsed_url.scheme, netloc=parsed_url.netloc, path=parsed_url.path, query=str(uuid4()))
+        sample = await self.engine.perform_high_priority(Entry.create(random_query), self.child_heuristics)
+        self.samples[sample_key] = self._hash_response(sample.response)
+        return self.samples[sample_key]
 
     def _match(self, response, sample_simhash):
         if "md5" in sample_simhash:
@@ -73,10 +116,18 @@ class RejectIgnoredQuery:
         elif "simhash" in sample_simhash:
             try:
                 response_simhash = self._create_simhash(response.content)
-                return self._simhash_equal(response_simhash, self._create_simhash(sample_simhash["simhash"]))
+                return self._simhash_equal(response_simhash, self._sample_simhash(sample_simhash["simhash"]))
             except UnicodeDecodeError:
                 return False
 
+    def _sample_simhash(self, value):
+        try:
+            return self.simhashes[value]
+        except KeyError:
+            simhash = self._create_simhash(value)
+            self.simhashes[value] = simhash
+            return simhash
+
     def _hash_response(self, response):
         try:
             return {"simhash": self._create_simhash(response.content).value}
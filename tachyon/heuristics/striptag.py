@@ -2,11 +2,27 @@ import re
 
 
 class StripTag:
+    """
+    Replaces the given tags, attributes included, by the bare tag (ex: <input name="a" value="b"> becomes <input>).
+    The body is replaced once at most, only when something was stripped.
 
-    def __init__(self, tag_name):
-        tag_name = tag_name.encode('utf-8')
-        self.replacement = b'<%s>' % tag_name
-        self.rule = re.compile(b'<%s\\s[^>]+>' % tag_name)
+    There is one expression per tag on purpose: starting with the literal `<tag`, re skips ahead to its candidates as
+    fast as a separate `<tag` in body check would. A single expression alternating the tags has no literal prefix
+    and is about twice as slow (see benchmarks/striptag.py).
+    """
+
+    def __init__(self, *tag_names):
+        self.rules = []
+        for tag_name in tag_names:
+            tag_name = tag_name.encode('utf-8')
+            self.rules.append((b'<%s>' % tag_name, re.compile(b'<%s\\s[^>]+>' % re.escape(tag_name))))
 
     async def after_response(self, entry):
-        entry.response.raw = self.rule.sub(self.replacement, entry.response.raw)
+        stripped = entry.response.raw
+        total = 0
+        for replacement, rule in self.rules:
+            stripped, count = rule.subn(replacement, stripped)
+            total += count
+
+        if total:
+            entry.response.raw = stripped
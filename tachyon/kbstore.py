@@ -0,0 +1,127 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+from os.path import join
+
+
+# Calibration data of the heuristics, the rest of the knowledge base only makes sense for the scan that produced it
+PERSISTED_KEYS = ("soft_404_responses", "query_samples", "bad_behavior_response")
+
+FORMAT_VERSION = 1
+
+
+class StoredKnowledgeBase:
+
+    def __init__(self, entries, fingerprint, saved_at):
+        self.entries = entries
+        self.fingerprint = fingerprint
+        self.saved_at = saved_at
+
+    def populate(self, kb):
+        """
+        Must be called before the heuristics are added: the entries are already in the knowledge base when they call
+        set_kb(), so they adopt them through load_kb() instead of starting empty.
+        """
+        for key, value in self.entries.items():
+            if key not in kb:
+                setattr(kb, key, value)
+
+
+class KnowledgeBaseStore:
+    """
+    Keeps the calibration data of the heuristics (soft 404 samples, ignored query samples, bad behavior signatures)
+    on disk between scans of the same target and vhost, so a rescan does not send the calibration requests again.
+
+    Files older than `ttl` seconds are ignored. The files are pickles, the directory must only be writable by the user
+    running the scans.
+    """
+
+    def __init__(self, directory, ttl=7 * 24 * 3600):
+        self.directory = directory
+        self.ttl = ttl
+
+    def path(self, target, vhost=None):
+        key = hashlib.sha256(("%s|%s" % (target, vhost or "")).encode("utf-8")).hexdigest()
+        return join(self.directory, "%s.kb" % key[:32])
+
+    def load(self, target, vhost=None, now=None):
+        now = time.time() if now is None else now
+        try:
+            with open(self.path(target, vhost), "rb") as fp:
+                data = pickle.load(fp)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Truncated or written by an incompatible version, calibrate again as if there was none
+            return None
+
+        if not isinstance(data, dict) or data.get("version") != FORMAT_VERSION:
+            return None
+        if data.get("target") != target or data.get("vhost") != vhost:
+            return None
+        if now - data["saved_at"] > self.ttl:
+            return None
+
+        return StoredKnowledgeBase(data["entries"], data["fingerprint"], data["saved_at"])
+
+    def save(self, kb, target, vhost=None, fingerprint=None, now=None):
+        entries = {key: getattr(kb, key) for key in PERSISTED_KEYS if key in kb}
+        data = {
+            "version": FORMAT_VERSION,
+            "target": target,
+            "vhost": vhost,
+            "saved_at": time.time() if now is None else now,
+            "fingerprint": fingerprint,
+            "entries": entries,
+        }
+
+        os.makedirs(self.directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(descriptor, "wb") as fp:
+                pickle.dump(data, fp, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self.path(target, vhost))
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+
+def reset(kb):
+    """ Empties the persisted entries in place, the heuristics holding them start calibrating from scratch. """
+    for key in PERSISTED_KEYS:
+        if key in kb:
+            getattr(kb, key).clear()
+
+
+def fingerprint_matches(stored, current, distance_threshold=6):
+    """
+    The fingerprint is the status code and content simhash of a request to a random path. When the host no longer
+    answers it the same way, its soft 404 pages changed and the stored samples cannot be trusted.
+    """
+    if stored is None or current is None or stored["code"] != current["code"]:
+        return False
+    if stored["simhash"] is None or current["simhash"] is None:
+        return stored["simhash"] == current["simhash"]
+    return bin(stored["simhash"] ^ current["simhash"]).count("1") <= distance_threshold
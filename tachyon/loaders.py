@@ -19,7 +19,7 @@ import json
 import os.path as osp
 import sys
 
-from tachyon import textutils
+from tachyon import textutils, wordlist
 
 
 def _get_data_dir():
@@ -31,6 +31,23 @@ def load_json_resource(name):
     return load_targets(data_path)
 
 
+def load_wordlist_resource(name, cache_dir=None):
+    data_path = osp.join(_get_data_dir(), name + '.json')
+    return load_wordlist(data_path, cache_dir=cache_dir)
+
+
+def load_wordlist(file, cache_dir=None):
+    """ Load the list of targets from its compiled form, compiling it first if it is missing or outdated """
+    target = wordlist.compiled_path(file, cache_dir)
+    try:
+        if not wordlist.is_current(file, target):
+            wordlist.compile_wordlist(file, target, load_targets(file))
+        return wordlist.Wordlist(wordlist.CompiledWordlist(target))
+    except OSError as e:
+        textutils.output_info("Could not use a compiled wordlist for %s (%s), loading it in memory" % (file, e))
+        return wordlist.Wordlist(load_targets(file), prioritized=False)
+
+
 def load_targets(file):
     """ Load the list of target paths """
     loaded = []
@@ -44,6 +61,12 @@ def load_targets(file):
     return loaded
 
 
+def load_target_list(filename):
+    """ One target per line, blank lines and lines starting with # are ignored """
+    with open(filename) as fp:
+        return [line.strip() for line in fp if line.strip() and not line.strip().startswith("#")]
+
+
 def load_cookie_file(filename):
     try:
         with open(filename, 'r') as cookie_file:
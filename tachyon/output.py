@@ -16,8 +16,11 @@
 # this program; if not, write to the Free Software Foundation, Inc., 59 Temple
 # Place, Suite 330, Boston, MA  02111-1307  USA
 
+import atexit
 import json
 import logging
+import queue
+import threading
 from datetime import datetime
 
 import click
@@ -31,8 +34,85 @@ logging.addLevelName(FOUND, "FOUND")
 logging.addLevelName(TIMEOUT, "TIMEOUT")
 
 
+class OutputWriter:
+    """
+    Writes lines from a dedicated thread so a slow terminal or pipe does not block the event loop. Lines wait in a
+    bounded queue. While it is full, a `droppable` line (progress information) is dropped and counted, any other line
+    (results, errors, the summary) waits for room: a scan slows down rather than losing findings. The thread writes
+    whatever is queued at once, up to `batch_size` lines per write. Queued lines are written before the process exits.
+    """
+
+    def __init__(self, stream=None, maxsize=10000, batch_size=256):
+        self.stream = stream
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.max_depth = 0
+        self.lines = 0
+        self.writes = 0
+        self.dropped = 0
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="tachyon-output", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    @property
+    def depth(self):
+        return self.queue.qsize()
+
+    def write(self, line, droppable=False):
+        if self.closed:
+            click.echo(line, file=self.stream)
+            return
+        if droppable:
+            try:
+                self.queue.put_nowait(line)
+            except queue.Full:
+                self.dropped += 1
+                return
+        else:
+            self.queue.put(line)
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    def flush(self):
+        """ Wait until the lines queued so far are written """
+        self.queue.join()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.queue.put(None)
+            self.thread.join()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while batch[-1] is not None and len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines = [line for line in batch if line is not None]
+            try:
+                if lines:
+                    click.echo("\n".join(lines), file=self.stream)
+                    self.lines += len(lines)
+                    self.writes += 1
+            except OSError:
+                # Nobody reads the output anymore (ex: closed pipe), keep draining so producers never block
+                pass
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+            if batch[-1] is None:
+                return
+
+
 class OutputManager:
 
+    writer = None
+
     def output_result(self, text, data=None):
         self._add_output(text, FOUND, data)
 
@@ -45,8 +125,15 @@ class OutputManager:
     def output_timeout(self, text):
         self._add_output(text, TIMEOUT)
 
-    def output_raw_message(self, message):
-        click.echo(message)
+    def output_raw_message(self, message, droppable=False):
+        if self.writer is not None:
+            self.writer.write(message, droppable=droppable)
+        else:
+            click.echo(message)
+
+    def flush_writer(self):
+        if self.writer is not None:
+            self.writer.flush()
 
     def output_header(self):
         pass
@@ -54,6 +141,10 @@ class OutputManager:
     def flush(self):
         raise NotImplementedError
 
+    def close(self):
+        """ Nothing is output afterwards """
+        self.flush()
+
     def _add_output(self, text, level, data=None):
         raise NotImplementedError
 
@@ -74,6 +165,7 @@ class JSONOutput(OutputManager):
         if not self.flushed:
             self.output_raw_message(json.dumps({"result": self.buffer, "version": __version__, "from": conf.name}))
             self.flushed = True
+        self.flush_writer()
 
     def _add_output(self, text, level, data=None):
         formatted = self._format_output(self._get_current_time(), logging.getLevelName(level), text, data)
@@ -86,10 +178,37 @@ class JSONOutput(OutputManager):
         return output
 
 
+class NDJSONOutput(JSONOutput):
+    """
+    Newline delimited JSON: each record is written on its own line as soon as it is produced. The last line is a
+    summary record carrying the version and origin of the output, written on close() so that the records output
+    after a flush, such as an interruption, still come before it.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.counts = {}
+
+    def flush(self):
+        self.flush_writer()
+
+    def close(self):
+        if not self.flushed:
+            summary = {"type": "summary", "counts": self.counts, "version": __version__, "from": conf.name}
+            self.output_raw_message(json.dumps(summary))
+            self.flushed = True
+        self.flush_writer()
+
+    def _add_output(self, text, level, data=None):
+        formatted = self._format_output(self._get_current_time(), logging.getLevelName(level), text, data)
+        self.counts[formatted["type"]] = self.counts.get(formatted["type"], 0) + 1
+        self.output_raw_message(json.dumps(formatted), droppable=level == logging.INFO)
+
+
 class PrettyOutput(OutputManager):
 
     def flush(self):
-        pass
+        self.flush_writer()
 
     def output_header(self):
         """ Print a _cute_ program header """
@@ -98,7 +217,7 @@ class PrettyOutput(OutputManager):
 
     def _add_output(self, text, level, data=None):
         formatted = self._format_output(self._get_current_time(), logging.getLevelName(level), text, data)
-        self.output_raw_message(formatted)
+        self.output_raw_message(formatted, droppable=level == logging.INFO)
 
     def _format_output(self, time, level_name, text, data):
         output_format = "[{time}] [{level}] {text}"
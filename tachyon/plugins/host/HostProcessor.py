@@ -16,18 +16,16 @@
 # this program; if not, write to the Free Software Foundation, Inc., 59 Temple
 # Place, Suite 330, Boston, MA  02111-1307  USA
 #
-from tachyon import conf, textutils, database
+from tachyon import conf, dbutils
 
 
-async def execute(hammertime):
+async def execute(hammertime, context):
     """ This plugin process the hostname to generate host and filenames relatives to it """
-    target = conf.target_host
+    target = context.target_host
 
     # Remove char to figure out the human-likely expressed domain name
     # host.host.host.com = hosthosthost.com. host.com hostcom, host, /host.ext
     # We don't test for domain.dom/domain since "cp * ./sitename" is unlikely to happen (questionable)
-    added = 0
-
     # http://oksala.org -> oksala.org
     target = target.replace('http://', '')
     target = target.replace('https://', '')
@@ -41,16 +39,14 @@ async def execute(hammertime):
     new_target = conf.path_template.copy()
     new_target['url'] = target
     new_target['description'] = "HostProcessor generated filename"
-    database.files.append(new_target)
-    added += 1
+    dbutils.add_file(context, new_target)
 
     # www.oksala.org -> oksala.org
     target = target.replace('www.', '')
     new_target = conf.path_template.copy()
     new_target['url'] = target
     new_target['description'] = "HostProcessor generated filename"
-    database.files.append(new_target)
-    added += 1
+    dbutils.add_file(context, new_target)
 
     # oksala.org -> oksala
     dom_pos = target.rfind('.')
@@ -58,8 +54,7 @@ async def execute(hammertime):
     new_target = conf.path_template.copy()
     new_target['url'] = nodom_target
     new_target['description'] = "HostProcessor generated filename"
-    database.files.append(new_target)
-    added += 1
+    dbutils.add_file(context, new_target)
 
     # shortdom (blabla.ok.ok.test.com -> test)
     new_target = conf.path_template.copy()
@@ -74,25 +69,19 @@ async def execute(hammertime):
 
         new_target['url'] = short_dom
         new_target['description'] = "HostProcessor generated filename"
-        database.files.append(new_target)
-        added += 1
+        dbutils.add_file(context, new_target)
 
         new_target = new_target.copy()
         new_target['url'] = short_dom + 'admin'
-        database.files.append(new_target)
-        added += 1
+        dbutils.add_file(context, new_target)
 
         new_target = new_target.copy()
         new_target['url'] = short_dom + '-admin'
-        database.files.append(new_target)
-        added += 1
+        dbutils.add_file(context, new_target)
 
     # flatten subdomains
     target = target.replace('.', '')
     new_target = conf.path_template.copy()
     new_target['url'] = target
     new_target['description'] = "HostProcessor generated filename"
-    database.files.append(new_target)
-    added += 1
-
-    textutils.output_info(" - HostProcessor Plugin: added " + str(added) + " new filenames")
+    dbutils.add_file(context, new_target)
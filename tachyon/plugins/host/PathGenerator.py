@@ -19,53 +19,41 @@
 
 from datetime import date
 
-from tachyon import conf, textutils, database
+from tachyon import conf, dbutils
 
 
-plugin_settings = conf.plugin_settings["PathGenerator"]
-
-
-def add_generated_path(path):
+def add_generated_path(context, path):
     current_template = conf.path_template.copy()
     current_template['description'] = 'Computer generated path'
     current_template['is_file'] = False
     current_template['url'] = '/' + path
-    current_template['handle_redirect'] = "ignoreRedirect" not in plugin_settings
-    database.paths.append(current_template)
+    current_template['handle_redirect'] = "ignoreRedirect" not in context.plugin_settings["PathGenerator"]
+    return dbutils.add_path(context, current_template)
 
 
-def add_generated_file(file):
+def add_generated_file(context, file):
     """ Add file to database """
     current_template = conf.path_template.copy()
     current_template['description'] = 'Computer generated file'
     current_template['url'] = file
-    current_template['handle_redirect'] = "ignoreRedirect" not in plugin_settings
-    database.files.append(current_template)
+    current_template['handle_redirect'] = "ignoreRedirect" not in context.plugin_settings["PathGenerator"]
+    return dbutils.add_file(context, current_template)
 
 
-async def execute(hammertime):
+async def execute(hammertime, context):
     """ Generate common simple paths (a-z, 0-9) """
-    path_added = 0
-    file_added = 0
+    plugin_settings = context.plugin_settings["PathGenerator"]
 
     if "skipAlpha" not in plugin_settings:
         for char in range(ord('a'), ord('z')+1):
-            add_generated_path(chr(char))
-            path_added += 1
-            add_generated_file(chr(char))
-            file_added += 1
+            add_generated_path(context, chr(char))
+            add_generated_file(context, chr(char))
 
     if "skipNumeric" not in plugin_settings:
         for char in range(ord('0'), ord('9')+1):
-            add_generated_path(chr(char))
-            path_added += 1
-            add_generated_file(chr(char))
-            file_added += 1
+            add_generated_path(context, chr(char))
+            add_generated_file(context, chr(char))
 
     if "skipYear" not in plugin_settings:
         for year in range(1990, date.today().year + 5):
-            add_generated_path(str(year))
-            path_added += 1
-
-    textutils.output_info(' - PathGenerator Plugin: added ' + str(path_added) + ' computer generated path.')
-    textutils.output_info(' - PathGenerator Plugin: added ' + str(file_added) + ' computer generated files.')
+            add_generated_path(context, str(year))
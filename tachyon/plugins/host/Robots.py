@@ -22,19 +22,17 @@ from urllib.parse import urljoin
 
 from hammertime.ruleset import StopRequest, RejectRequest
 
-from tachyon import conf, textutils, database
+from tachyon import conf, textutils, dbutils
 
 
-async def execute(hammertime):
+async def execute(hammertime, context):
     """ Fetch /robots.txt and add the disallowed paths as target """
     current_template = dict(conf.path_template)
     current_template['description'] = 'Robots.txt entry'
 
-    target_url = urljoin(conf.base_url, "/robots.txt")
+    target_url = urljoin(context.base_url, "/robots.txt")
 
     try:
-        added = 0
-
         entry = await hammertime.request(target_url)
         if entry and entry.response:
             matches = re.findall(r'Disallow:\s*/[a-zA-Z0-9-/\r]+\n', entry.response.content)
@@ -57,12 +55,6 @@ async def execute(hammertime):
 
                     current_template = current_template.copy()
                     current_template['url'] = target_path
-                    database.paths.append(current_template)
-                    added += 1
-
-        if added > 0:
-            textutils.output_info(' - Robots Plugin: added ' + str(added) + ' base paths using /robots.txt')
-        else:
-            textutils.output_info(' - Robots Plugin: no usable entries in /robots.txt')
+                    dbutils.add_path(context, current_template)
     except (StopRequest, RejectRequest):
         textutils.output_info(' - Robots Plugin: /robots.txt not found on target site')
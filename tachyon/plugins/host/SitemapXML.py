@@ -17,72 +17,184 @@
 # Place, Suite 330, Boston, MA  02111-1307  USA
 #
 
-import re
-from urllib.parse import urljoin
-from urllib.parse import urlparse
+import asyncio
+import zlib
+from urllib.parse import urljoin, urlparse
+from xml.etree.ElementTree import XMLParser, ParseError
 
 from hammertime.ruleset import StopRequest, RejectRequest
 
-from tachyon import conf, textutils, database
+from tachyon import conf, textutils, dbutils
+from tachyon.urlindex import UrlIndex
 
 
-def add_path(path):
+CHUNK_SIZE = 64 * 1024
+DEFAULT_CONCURRENCY = 5
+MAX_SITEMAPS = 100
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def add_path(context, path):
     current_template = conf.path_template.copy()
     current_template['description'] = 'Found in sitemap.xml'
     current_template['is_file'] = False
-    current_template['url'] = '/' + path
-    if current_template not in database.paths:
-        database.paths.append(current_template)
-        return True
+    current_template['url'] = '/' + path.lstrip('/')
+    return dbutils.add_path(context, current_template)
 
 
-def add_file(filename):
+def add_file(context, filename):
     """ Add file to database """
     current_template = conf.path_template.copy()
     current_template['description'] = 'Found in sitemap.xml'
     current_template['url'] = filename
-    if current_template not in database.files:
-        database.files.append(current_template)
-        return True
-
-
-async def execute(hammertime):
+    return dbutils.add_file(context, current_template)
+
+
+def iter_chunks(raw, chunk_size=CHUNK_SIZE):
+    """ Slices of the document, gzip compressed sitemaps (.xml.gz) are inflated one slice at a time. """
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if raw[:2] == GZIP_MAGIC else None
+    for start in range(0, len(raw), chunk_size):
+        chunk = raw[start:start + chunk_size]
+        if decompressor is None:
+            yield chunk
+            continue
+        while chunk:
+            yield decompressor.decompress(chunk, chunk_size)
+            chunk = decompressor.unconsumed_tail
+    if decompressor is not None:
+        yield decompressor.flush()
+
+
+class LocationTarget:
+    """
+    XMLParser target keeping the <loc> directly under a <url> or <sitemap> child of the root, in the namespace of that
+    element. Other locations, such as the <image:loc> of an image attached to a page, are not pages of the site.
+    No tree is built, memory stays bounded whatever the size of the document.
+    """
+
+    def __init__(self):
+        self.open = []
+        self.text = None
+        self.locations = []
+
+    def doctype(self, name, pubid, system):
+        # Entities can only be declared in a DTD, a sitemap has no use for one
+        raise ParseError("DOCTYPE is not allowed in a sitemap")
+
+    def start(self, tag, attrib):
+        namespace, _, name = tag.rpartition("}")
+        name = name.lower()
+        if name == "loc" and len(self.open) == 2 and self.open[1] in ((namespace, "url"), (namespace, "sitemap")):
+            self.text = []
+        self.open.append((namespace, name))
+
+    def data(self, data):
+        if self.text is not None:
+            self.text.append(data)
+
+    def end(self, tag):
+        self.open.pop()
+        if self.text is not None and len(self.open) == 2:
+            location = "".join(self.text).strip()
+            if location:
+                self.locations.append((self.open[1][1], location))
+            self.text = None
+
+    def close(self):
+        pass
+
+
+def iter_locations(chunks):
+    """
+    Yields ("url", location) for the pages of an <urlset> and ("sitemap", location) for the children of a
+    <sitemapindex>. A malformed or truncated document, or one declaring a DOCTYPE, ends the iteration with the
+    locations read so far.
+    """
+    target = LocationTarget()
+    parser = XMLParser(target=target)
+    try:
+        for chunk in chunks:
+            parser.feed(chunk)
+            yield from target.locations
+            target.locations.clear()
+        parser.close()
+    except (ParseError, zlib.error):
+        return
+
+
+class SitemapReader:
+    """
+    Reads a sitemap and the sitemaps listed by sitemap indexes, one level of indexes at a time with at most
+    `concurrency` requests in flight. Only sitemaps from the target host are followed, up to `max_sitemaps`.
+    """
+
+    def __init__(self, context, hammertime, concurrency=DEFAULT_CONCURRENCY, max_sitemaps=MAX_SITEMAPS):
+        self.context = context
+        self.hammertime = hammertime
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.max_sitemaps = max_sitemaps
+        self.visited = UrlIndex()
+        self.sitemap_count = 0
+        self.added = 0
+
+    async def read(self, url, raw):
+        self.visited.add(url)
+        level = [(url, raw)]
+        while level:
+            children = []
+            for url, raw in level:
+                if raw is not None:
+                    self.sitemap_count += 1
+                    children.extend(self._add_locations(url, raw))
+
+            children = self._select(children)
+            contents = await asyncio.gather(*(self._fetch(child) for child in children))
+            level = list(zip(children, contents))
+
+    def _add_locations(self, url, raw):
+        host = urlparse(url).netloc
+        children = []
+        for kind, location in iter_locations(iter_chunks(raw)):
+            parsed = urlparse(location)
+            if kind == "sitemap":
+                if parsed.netloc == host:
+                    children.append(urljoin(url, location))
+            elif parsed.path.strip('/') and add_path(self.context, parsed.path.rstrip('/')):
+                self.added += 1
+        return children
+
+    def _select(self, children):
+        budget = self.max_sitemaps - self.sitemap_count
+        selected = []
+        for child in children:
+            if len(selected) >= budget:
+                break
+            if self.visited.add(child):
+                selected.append(child)
+        return selected
+
+    async def _fetch(self, url):
+        async with self.semaphore:
+            try:
+                entry = await self.hammertime.request(url)
+                return entry.response.raw
+            except (StopRequest, RejectRequest):
+                return None
+
+
+async def execute(hammertime, context):
     """ Fetch sitemap.xml and add each entry as a target """
 
-    current_template = dict(conf.path_template)
-    current_template['description'] = 'sitemap.xml entry'
-
-    target_url = urljoin(conf.base_url, "/sitemap.xml")
+    target_url = urljoin(context.base_url, "/sitemap.xml")
 
     try:
         entry = await hammertime.request(target_url)
-
-        regexp = re.compile('(?im).*<url>\\s*<loc>(.*)</loc>\\s*</url>.*')
-        matches = re.findall(regexp, entry.response.content)
-
-        added = 0
-        for match in matches:
-            if not isinstance(match, str):
-                match = match.decode('utf-8', 'ignore')
-            parsed = urlparse(match)
-            if parsed.path:
-                new_path = parsed.path
-            else:
-                continue
-
-            # Remove trailing /
-            if new_path.endswith('/'):
-                new_path = new_path[:-1]
-
-            if add_path(new_path):
-                added += 1
-
-        if added > 0:
-            textutils.output_info(' - SitemapXML Plugin: added %d base paths '
-                                  'using /sitemap.xml' % added)
-        else:
-            textutils.output_info(' - SitemapXML Plugin: no usable entries '
-                                  'in /sitemap.xml')
     except (StopRequest, RejectRequest):
         textutils.output_info(' - SitemapXML Plugin: /sitemap.xml not found on '
                               'target site')
+        return
+
+    reader = SitemapReader(context, hammertime)
+    await reader.read(target_url, entry.response.raw)
+
+    textutils.output_info(' - SitemapXML Plugin: %d sitemaps read' % reader.sitemap_count)
@@ -17,103 +17,183 @@
 # Place, Suite 330, Boston, MA  02111-1307  USA
 #
 
-import os
-from hammertime.ruleset import StopRequest, RejectRequest
+import asyncio
+import time
 from urllib.parse import urljoin
 
-from tachyon import conf, textutils
+from hammertime.ruleset import StopRequest, RejectRequest
 
+from tachyon import conf, textutils
+from tachyon.blobstore import get_store
+from tachyon.urlindex import UrlIndex
 
-base_headers = dict()
 
+DEFAULT_CONCURRENCY = 10
 
-def save_file(path, content):
-    output = "output/" + conf.target_host + path
+description_file = 'SVN entries file at'
+description_dir = "SVN entries Dir at"
 
-    if not os.path.exists(output[:output.rfind('/')]):
-        os.makedirs(output[:output.rfind('/')])
 
-    with open(output, "wb") as outfile:
-        if isinstance(content, str):
-            outfile.write(content.encode('utf-8'))
-        else:
-            outfile.write(content)
+def save_file(target_host, path, content):
+    """ The body goes to the blob store, identical files are stored once and linked to their output path """
+    output = "output/" + target_host + path
+    store = get_store(conf.blob_store_dir)
+    store.link(store.put(content), output)
 
 # Fixme
-#def parse_svn_17_db(filename):
+# def parse_svn_17_db(filename):
 #    conn = sqlite3.connect(filename)
-#    files = conn.execute('select local_relpath, ".svn/pristine/" || substr(checksum,7,2) || "/" || substr(checksum,7) || ".svn-base" as alpha from NODES;')
-#    #for entries in files:
-#    #    if
+#    files = conn.execute('select local_relpath, ".svn/pristine/" || substr(checksum,7,2) || "/" || '
+#                         'substr(checksum,7) || ".svn-base" as alpha from NODES;')
 #    pass
 
 
-async def parse_svn_entries(url, hammertime):
-    description_file = 'SVN entries file at'
-    description_dir = "SVN entries Dir at"
-    target_url = url + "/.svn/entries"
-
-    try:
-        entry = await hammertime.request(target_url)
-        tokens = entry.response.content.split('\n')
-        if 'dir' in tokens:
-            for pos, token in enumerate(tokens):
-                if token == 'dir':
-                    # Fetch more entries recursively
-                    if tokens[pos-1] != '':
-                        if conf.allow_download:
-                            textutils.output_info(' - Svn Plugin: Downloading: ' + url + '/' + tokens[pos - 1] + '\r')
-                        else:
-                            textutils.output_found(description_dir + ' at: ' + url + '/' + tokens[pos - 1])
-
-                        # Parse next
-                        await parse_svn_entries(url + "/" + tokens[pos-1], hammertime)
-
-                elif token == 'file':
-                    if conf.allow_download:
-                        textutils.output_info(' - Svn Plugin: Downloading: ' + url + '/' + tokens[pos - 1] + '\r')
-                        # Fetch text-base file
-                        path = url + "/.svn/text-base" + '/' + tokens[pos-1] + ".svn-base"
-                        entry = await hammertime.request(path)
-                        save_file(url + '/' + tokens[pos-1], entry.response.content)
-                    else:
-                        textutils.output_found(description_file + ' at: ' + url + '/' + tokens[pos - 1])
-    except (RejectRequest, StopRequest):
-        pass
-
-
-async def execute(hammertime):
+def get_concurrency(plugin_settings):
+    """ -x Svn:concurrency=20 """
+    for setting in plugin_settings:
+        name, _, value = setting.partition("=")
+        if name == "concurrency" and value.isdigit() and int(value) > 0:
+            return int(value)
+    return DEFAULT_CONCURRENCY
+
+
+def parse_entries(content):
+    """ Returns the (directories, files) names listed in a legacy (< 1.7) .svn/entries file """
+    directories = []
+    files = []
+    tokens = content.split('\n')
+    for pos, token in enumerate(tokens[1:], start=1):
+        name = tokens[pos - 1]
+        # The first dir entry is the directory itself, it has an empty name
+        if token == 'dir' and name != '':
+            directories.append(name)
+        elif token == 'file':
+            files.append(name)
+    return directories, files
+
+
+class SvnCrawler:
+    """
+    Breadth-first crawl of the .svn/entries files, one directory level at a time. At most `concurrency` requests are
+    in flight. Downloads are started as soon as a file is listed and written to disk from a worker thread, so the
+    crawl of the next level is not held back by the disk.
+    """
+
+    def __init__(self, hammertime, concurrency=DEFAULT_CONCURRENCY, allow_download=False, target_host=""):
+        self.hammertime = hammertime
+        self.allow_download = allow_download
+        self.target_host = target_host
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.visited = UrlIndex()
+        self.depth = 0
+        self.directory_count = 0
+        self.file_count = 0
+        self.download_count = 0
+        self.request_count = 0
+        self.duration = 0
+
+    async def crawl(self, base_url):
+        start = time.perf_counter()
+        try:
+            async with asyncio.TaskGroup() as downloads:
+                frontier = [base_url] if self.visited.add(base_url) else []
+                while frontier:
+                    listings = await asyncio.gather(*(self._fetch_entries(url) for url in frontier))
+                    frontier = self._process_level(frontier, listings, downloads)
+                    if frontier:
+                        self.depth += 1
+        finally:
+            self.duration = time.perf_counter() - start
+
+    def _process_level(self, urls, listings, downloads):
+        next_frontier = []
+        for url, listing in zip(urls, listings):
+            if listing is None:
+                continue
+            self.directory_count += 1
+            directories, files = listing
+
+            for name in directories:
+                if self.allow_download:
+                    textutils.output_info(' - Svn Plugin: Downloading: ' + url + '/' + name + '\r')
+                else:
+                    textutils.output_found(description_dir + ' at: ' + url + '/' + name)
+                if self.visited.add(url + "/" + name):
+                    next_frontier.append(url + "/" + name)
+
+            for name in files:
+                self.file_count += 1
+                if self.allow_download:
+                    textutils.output_info(' - Svn Plugin: Downloading: ' + url + '/' + name + '\r')
+                    downloads.create_task(self._download(url, name))
+                else:
+                    textutils.output_found(description_file + ' at: ' + url + '/' + name)
+        return next_frontier
+
+    async def _fetch_entries(self, url):
+        content = await self._request(url + "/.svn/entries")
+        return None if content is None else parse_entries(content)
+
+    async def _download(self, url, name):
+        content = await self._request(url + "/.svn/text-base/" + name + ".svn-base")
+        if content is not None:
+            await asyncio.to_thread(save_file, self.target_host, url + '/' + name, content)
+            self.download_count += 1
+
+    async def _request(self, url):
+        async with self.semaphore:
+            try:
+                entry = await self.hammertime.request(url)
+                return entry.response.content
+            except (RejectRequest, StopRequest):
+                return None
+            finally:
+                self.request_count += 1
+
+    def format_stats(self):
+        rate = self.request_count / self.duration if self.duration else 0
+        message = "crawled %d directories (depth %d), %d files listed" % (
+            self.directory_count, self.depth, self.file_count)
+        if self.allow_download:
+            message += ", %d downloaded" % self.download_count
+        return message + " in %.2f seconds (%.1f requests/s)" % (self.duration, rate)
+
+
+async def execute(hammertime, context):
     """ Fetch /.svn/entries and parse for target paths """
 
     textutils.output_info(' - Svn Plugin: Searching for /.svn/entries')
-    target_url = urljoin(conf.base_url, "/.svn/entries")
+    target_url = urljoin(context.base_url, "/.svn/entries")
     svn_legacy = True
 
     try:
-        entry = await hammertime.request(target_url)
-        if conf.allow_download:
+        await hammertime.request(target_url)
+        if context.allow_download:
             textutils.output_info(' - Svn Plugin: /.svn/entries found! crawling... (will download files to output/)')
         else:
-            textutils.output_info(' - Svn Plugin: /.svn/entries found! crawling... (use -a to download files instead of printing)')
-       
+            textutils.output_info(' - Svn Plugin: /.svn/entries found! crawling... '
+                                  '(use -a to download files instead of printing)')
+
         # test for version 1.7+
-        target_url = urljoin(conf.base_url, "/.svn/wc.db")
-        entry = await hammertime.request(target_url)
+        target_url = urljoin(context.base_url, "/.svn/wc.db")
+        await hammertime.request(target_url)
 
-        #if response_code in conf.expected_file_responses and content:
+        # if response_code in conf.expected_file_responses and content:
         #    textutils.output_info(' - Svn Plugin: SVN 1.7+ detected, parsing wc.db')
         #    svn_legacy = False
         #    save_file(conf.target_base_path + '/wc.db', content)
 
         # Process index
         if svn_legacy:
-            # parse entries
-            await parse_svn_entries(conf.base_url, hammertime)
-        #else:
-          #  parse_svn_17_db(conf.target_base_path + '/wc.db')
+            crawler = SvnCrawler(hammertime, concurrency=get_concurrency(context.plugin_settings["Svn"]),
+                                 allow_download=context.allow_download, target_host=context.target_host)
+            await crawler.crawl(context.base_url.rstrip("/"))
+            textutils.output_info(' - Svn Plugin: ' + crawler.format_stats())
+        # else:
+        #    parse_svn_17_db(conf.target_base_path + '/wc.db')
 
         # Clean up display
-        if conf.allow_download:
+        if context.allow_download:
             textutils.output_info('')
     except (StopRequest, RejectRequest):
         textutils.output_info(' - Svn Plugin: no /.svn/entries found')
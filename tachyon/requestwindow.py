@@ -0,0 +1,70 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+
+class RequestWindow:
+    """
+    Submits requests to hammertime while keeping at most `size` of them in flight. The next candidates are only
+    requested as prior ones complete, so memory depends on the window rather than on the number of candidates.
+    A size of 0 submits everything at once.
+
+    `on_failure` is called with the arguments and the exception of each request that did not succeed.
+    """
+
+    def __init__(self, hammertime, size=0, on_failure=None):
+        self.hammertime = hammertime
+        self.size = size
+        self.on_failure = on_failure
+        self.in_flight = 0
+        self.pending = iter(())
+
+    def submit(self, requests):
+        """ `requests` is an iterable of (url, arguments) tuples, consumed as room becomes available. """
+        self.pending = iter(requests)
+        self._fill()
+
+    async def successful_requests(self):
+        iterator = self.hammertime.successful_requests()
+
+        # Really make sure we are done (issue in hammertime 0.5.1 when first request is a failure?)
+        while iterator.has_pending():
+            async for entry in iterator:
+                yield entry
+
+    def close(self):
+        """ Drop the candidates that were not submitted yet. """
+        self.pending = iter(())
+
+    def _fill(self):
+        while not self.size or self.in_flight < self.size:
+            if self.hammertime.is_closed:
+                self.close()
+                return
+            try:
+                url, arguments = next(self.pending)
+            except StopIteration:
+                return
+            future = self.hammertime.request(url, arguments=arguments)
+            self.in_flight += 1
+            future.add_done_callback(lambda future, arguments=arguments: self._on_completion(future, arguments))
+
+    def _on_completion(self, future, arguments):
+        self.in_flight -= 1
+        if self.on_failure is not None and not future.cancelled() and future.exception() is not None:
+            self.on_failure(arguments, future.exception())
+        self._fill()
@@ -1,52 +1,190 @@
+import pickle
+import tempfile
+from collections import deque
+
+
+class Record:
+    """
+    What revalidation and the result output need to know about a found entry. The response body, headers and
+    redirect chain are not kept, so the memory used per result does not depend on the size of the response.
+    """
+
+    __slots__ = ("url", "arguments", "code", "empty", "special", "simhash", "har")
+
+    def __init__(self, url, arguments, code, empty=False, special=None, simhash=None, har=None):
+        self.url = url
+        self.arguments = arguments
+        self.code = code
+        self.empty = empty
+        self.special = special
+        self.simhash = simhash
+        self.har = har
+
+    @classmethod
+    def from_entry(cls, entry):
+        code = entry.response.code
+        raw = entry.response.raw
+        return cls(entry.request.url, entry.arguments, code,
+                   empty=len(raw) == 0,
+                   special="tomcat-redirect" if code == 404 and cls._detect_tomcat_fake_404(raw) else None,
+                   simhash=getattr(entry.result, "error_simhash", None),
+                   har=getattr(entry.result, "har_location", None))
+
+    def to_entry(self):
+        """ A fresh entry to request the url again """
+        from hammertime.http import Entry
+
+        entry = Entry.create(self.url, arguments=self.arguments)
+        if self.simhash is not None:
+            entry.result.error_simhash = self.simhash
+        return entry
+
+    @staticmethod
+    def _detect_tomcat_fake_404(content):
+        """ An apache setup will issue a 404 on an existing path if there is a tomcat trying to handle jsp on the same
+            host """
+        if content.find(b'Apache Tomcat/') != -1:
+            return True
+
+        return False
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+
+class RecordStore:
+    """
+    Records in insertion order. Once more than `spill_threshold` records are held in memory, they are moved to an
+    anonymous temporary file. 0 keeps everything in memory.
+    """
+
+    def __init__(self, spill_threshold=0):
+        self.spill_threshold = spill_threshold
+        self.records = []
+        self.spill_file = None
+        self.spilled = 0
+
+    def append(self, record):
+        self.records.append(record)
+        if self.spill_threshold and len(self.records) > self.spill_threshold:
+            self._spill()
+
+    def _spill(self):
+        if self.spill_file is None:
+            self.spill_file = tempfile.TemporaryFile()
+        for record in self.records:
+            pickle.dump(record, self.spill_file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.spilled += len(self.records)
+        self.records = []
+
+    def __iter__(self):
+        """ Records must not be added while iterating. """
+        if self.spill_file is not None:
+            self.spill_file.flush()
+            self.spill_file.seek(0)
+            try:
+                for _ in range(self.spilled):
+                    yield pickle.load(self.spill_file)
+            finally:
+                self.spill_file.seek(0, 2)
+        yield from self.records
+
+    def __len__(self):
+        return self.spilled + len(self.records)
+
+    def close(self):
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+        self.records = []
+        self.spilled = 0
 
 
 class ResultAccumulator:
 
-    def __init__(self, *, output_manager):
+    def __init__(self, *, output_manager, spill_threshold=0, context=None):
+        """ Results are recorded in the checkpoint of the scan `context`, when one is given """
         self.output_manager = output_manager
-        self.candidates = []
+        self.candidates = RecordStore(spill_threshold)
+        self.context = context
 
     def add_entry(self, entry):
-        entry = self._select_entry(entry)
-        self._output_found(entry)
-        self.candidates.append(entry)
-
-    async def revalidate(self, validator):
-        for entry in self.candidates:
-            if await validator.is_valid(entry):
-                self._output_found(entry, confirmed=True)
-
-    def _output_found(self, entry, **kwargs):
-        if "file" in entry.arguments or "path" in entry.arguments:
-            data = self._get_data(entry, kwargs)
-            message = self._format_message(entry, data)
+        record = Record.from_entry(self._select_entry(entry))
+        self._output_found(record)
+        self.candidates.append(record)
+        if self.context is not None:
+            self.context.checkpoint.add_result(record)
+
+    def restore(self, records):
+        """ Results found by a previous run of the scan, output again so the output of this run is complete """
+        for record in records:
+            self._output_found(record)
+            self.candidates.append(record)
+
+    async def revalidate(self, validator, concurrency=1):
+        """
+        Up to `concurrency` records are validated at once. A confirmation is output as soon as the records found
+        before it are done, so the output order is the same whatever the completion order.
+        """
+        import asyncio
+
+        semaphore = asyncio.Semaphore(concurrency)
+        pending = deque()
+
+        async def is_valid(record):
+            async with semaphore:
+                return await validator.is_valid(record.to_entry())
+
+        try:
+            for record in self.candidates:
+                pending.append((record, asyncio.ensure_future(is_valid(record))))
+                # Completed validations wait behind a slow one, bound how many may do so
+                if len(pending) >= 2 * concurrency:
+                    await self._output_confirmed(*pending.popleft())
+            while pending:
+                await self._output_confirmed(*pending.popleft())
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+    async def _output_confirmed(self, record, validation):
+        if await validation:
+            self._output_found(record, confirmed=True)
+
+    def _output_found(self, record, **kwargs):
+        if "file" in record.arguments or "path" in record.arguments:
+            data = self._get_data(record, kwargs)
+            message = self._format_message(record, data)
             self.output_manager.output_result(message, data=data)
 
-    def _format_message(self, entry, data):
-        url = entry.request.url
-        return "{prefix}{desc} at: {url}{suffix}".format(prefix=self._get_prefix(entry, data),
-                                                         suffix=self._get_suffix(entry, data),
-                                                         desc=data["description"], url=url)
+    def _format_message(self, record, data):
+        return "{prefix}{desc} at: {url}{suffix}".format(prefix=self._get_prefix(record, data),
+                                                         suffix=self._get_suffix(record, data),
+                                                         desc=data["description"], url=record.url)
 
-    def _get_prefix(self, entry, data):
-        if "file" in entry.arguments:
-            if entry.response.code == 500:
+    def _get_prefix(self, record, data):
+        if "file" in record.arguments:
+            if record.code == 500:
                 return "ISE, "
-            elif len(entry.response.raw) == 0:
+            elif record.empty:
                 return "Empty "
-        if "path" in entry.arguments:
-            if entry.response.code == 401:
+        if "path" in record.arguments:
+            if record.code == 401:
                 return "Password Protected - "
-            elif entry.response.code == 403:
+            elif record.code == 403:
                 return "*Forbidden* "
             elif data.get("special") == "tomcat-redirect":
                 return "Tomcat redirect, "
-            elif entry.response.code == 500:
+            elif record.code == 500:
                 return "ISE, "
 
         return ""
 
-    def _get_suffix(self, entry, data):
+    def _get_suffix(self, record, data):
         parts = []
 
         if data.get("confirmed"):
@@ -60,33 +198,23 @@ class ResultAccumulator:
         else:
             return ""
 
-    def _get_data(self, entry, additional):
-        url = entry.request.url
-        descriptor = entry.arguments.get("file") or entry.arguments.get("path")
+    def _get_data(self, record, additional):
+        descriptor = record.arguments.get("file") or record.arguments.get("path")
 
-        data = {"url": url,
+        data = {"url": record.url,
                 "description": descriptor["description"],
-                "code": entry.response.code,
+                "code": record.code,
                 "severity": descriptor.get('severity', "warning")}
         data.update(additional)
 
-        if entry.response.code == 404 and self._detect_tomcat_fake_404(entry.response.raw):
-            data["special"] = "tomcat-redirect"
+        if record.special is not None:
+            data["special"] = record.special
 
-        har = getattr(entry.result, "har_location", None)
-        if har is not None:
-            data["har"] = har
+        if record.har is not None:
+            data["har"] = record.har
 
         return data
 
-    def _detect_tomcat_fake_404(self, content):
-        """ An apache setup will issue a 404 on an existing path if there is a tomcat trying to handle jsp on the same
-            host """
-        if content.find(b'Apache Tomcat/') != -1:
-            return True
-
-        return False
-
     def _select_entry(self, entry):
         if entry.result.redirects:
             last_step = entry.result.redirects[-1]
@@ -0,0 +1,61 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+from collections import defaultdict
+from urllib.parse import urlparse
+
+from tachyon.checkpoint import Checkpoint
+from tachyon.urlindex import UrlIndex
+
+
+class ScanContext:
+    """
+    State of the scan of one target: the loaded paths and files with what the plugins added to them, the valid paths
+    found so far and the URLs already requested. Each scan has its own, so scans can run side by side in the same
+    process and a new scan does not need anything reset.
+    """
+
+    def __init__(self, base_url="", *, target_host=None, plugin_settings=None, allow_download=False,
+                 checkpoint=None):
+        self.base_url = base_url
+        self.target_host = target_host if target_host is not None else urlparse(base_url).netloc
+        self.plugin_settings = plugin_settings if plugin_settings is not None else defaultdict(list)
+        self.allow_download = allow_download
+        self.checkpoint = checkpoint if checkpoint is not None else Checkpoint()
+
+        # Paths and filenames loaded from disk, followed by the ones added by the plugins
+        self.paths = []
+        self.files = []
+
+        # Paths found to exist, the files are looked for in them
+        self.valid_paths = []
+
+        # Paths already requested, to avoid requesting duplicates. Files are not recorded one by one, the valid paths
+        # already joined with every file are (see FileGenerator).
+        self.path_cache = UrlIndex()
+        self.file_directories = UrlIndex()
+        # File names (file and suffix) of the last generation of file candidates
+        self.file_names = UrlIndex()
+
+        # URLs added to paths and files, to avoid adding duplicates
+        self.paths_index = UrlIndex()
+        self.files_index = UrlIndex()
+
+    @classmethod
+    def from_url(cls, parsed_url, **kwargs):
+        return cls("%s://%s" % (parsed_url.scheme, parsed_url.netloc), target_host=parsed_url.netloc, **kwargs)
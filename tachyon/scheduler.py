@@ -0,0 +1,43 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+
+""" Most severe first. Descriptors without a severity are reported as warnings. """
+SEVERITIES = ["critical", "medium", "warning", "info"]
+DEFAULT_SEVERITY = "warning"
+
+
+def severity_rank(descriptor):
+    severity = descriptor.get("severity", DEFAULT_SEVERITY)
+    try:
+        return SEVERITIES.index(severity)
+    except ValueError:
+        return SEVERITIES.index(DEFAULT_SEVERITY)
+
+
+def prioritize(descriptors):
+    """
+    Order descriptors so the most severe ones are requested first. Descriptors come in wordlist order, one section
+    after the other: the sort is stable, so within a severity each section stays together and in its original order.
+    Collections that know their priority order, such as wordlists, provide it through in_priority_order() instead of
+    being sorted on every call.
+    """
+    in_priority_order = getattr(descriptors, "in_priority_order", None)
+    if in_priority_order is not None:
+        return in_priority_order()
+    return sorted(descriptors, key=severity_rank)
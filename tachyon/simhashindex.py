@@ -0,0 +1,73 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+try:
+    import numpy
+except ImportError:  # Optional, the index falls back to comparing integers one by one
+    numpy = None
+
+
+def popcount(values):
+    """ Number of bits set in each uint64 of the array """
+    if hasattr(numpy, "bitwise_count"):
+        return numpy.bitwise_count(values)
+    return numpy.unpackbits(values.view(numpy.uint8)).reshape(len(values), 64).sum(axis=1)
+
+
+class SimhashIndex:
+    """
+    Simhash values packed in a uint64 array. A lookup computes the Hamming distance to every indexed value in one
+    vectorized operation instead of comparing Simhash objects one by one. Without numpy, the values are kept as a
+    tuple of ints and compared with int.bit_count().
+    """
+
+    def __init__(self, values=(), threshold=5):
+        self.threshold = threshold
+        self.source_size = 0
+        self.values = self._empty()
+        self.update(values)
+
+    def update(self, values):
+        values = list(values)
+        if numpy is None:
+            self.values = tuple(sorted(set(self.values).union(values)))
+        else:
+            self.values = numpy.unique(numpy.concatenate([self.values, numpy.array(values, dtype=numpy.uint64)]))
+        self.source_size += len(values)
+
+    def sync(self, values):
+        """ Index `values`, a collection that only grows (ex: the kb's bad behavior set), if it changed since """
+        if len(values) != self.source_size:
+            self.values = self._empty()
+            self.source_size = 0
+            self.update(values)
+
+    def near(self, value):
+        """ True if an indexed value is less than `threshold` bits away from `value` """
+        if len(self.values) == 0:
+            return False
+        if numpy is None:
+            return any((known ^ value).bit_count() < self.threshold for known in self.values)
+        distances = popcount(numpy.bitwise_xor(self.values, numpy.uint64(value)))
+        return bool((distances < self.threshold).any())
+
+    def __len__(self):
+        return len(self.values)
+
+    @staticmethod
+    def _empty():
+        return () if numpy is None else numpy.empty(0, dtype=numpy.uint64)
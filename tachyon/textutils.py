@@ -17,22 +17,36 @@
 # Place, Suite 330, Boston, MA  02111-1307  USA
 
 
-from .output import PrettyOutput, JSONOutput
+from contextvars import ContextVar
+
+from .output import PrettyOutput, JSONOutput, NDJSONOutput, OutputWriter
 
 
 output_manager = None
 
+_target = ContextVar("target", default=None)
+
+
+def set_target(target):
+    """ Prefix the messages of the current task, and of the tasks it spawns, with `target` """
+    _target.set(target)
+
+
+def _with_target(text):
+    target = _target.get()
+    return text if target is None else "[%s] %s" % (target, text)
+
 
 def output_error(text):
-    output_manager.output_error(text)
+    output_manager.output_error(_with_target(text))
 
 
 def output_info(text):
-    output_manager.output_info(text)
+    output_manager.output_info(_with_target(text))
 
 
 def output_timeout(text):
-    output_manager.output_timeout(text)
+    output_manager.output_timeout(_with_target(text))
 
 
 def output_found(text, data=None):
@@ -43,11 +57,14 @@ def flush():
     output_manager.flush()
 
 
-def init_log(json_output):
+def init_log(json_output, ndjson_output=False):
     global output_manager
-    if json_output:
+    if ndjson_output:
+        output_manager = NDJSONOutput()
+    elif json_output:
         output_manager = JSONOutput()
     else:
         output_manager = PrettyOutput()
 
+    output_manager.writer = OutputWriter()
     return output_manager
@@ -0,0 +1,73 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+
+import hashlib
+import re
+
+
+_repeated_slashes = re.compile("/{2,}")
+
+
+def canonical_path(url):
+    """ "/admin", "admin/" and "//admin" all designate the same resource. """
+    path = _repeated_slashes.sub("/", url).strip("/")
+    return path or "/"
+
+
+def hash_key(url):
+    """ 64 bit key of the canonical path. Unlike hash(), it is stable across processes. """
+    digest = hashlib.blake2b(canonical_path(url).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class UrlIndex:
+    """
+    Set of canonical URL paths, stored as 64 bit hashes rather than strings.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def add(self, url):
+        """ Returns True if the url was not in the index yet. """
+        key = hash_key(url)
+        if key in self.keys:
+            self.hits += 1
+            return False
+
+        self.misses += 1
+        self.keys.add(key)
+        self.count += 1
+        return True
+
+    def update(self, urls):
+        for url in urls:
+            self.add(url)
+
+    def clear(self):
+        self.keys = set()
+        self.count = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, url):
+        return hash_key(url) in self.keys
+
+    def __len__(self):
+        return self.count
@@ -0,0 +1,248 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+
+import bisect
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import struct
+from array import array
+from collections import OrderedDict
+from itertools import chain
+
+from tachyon.scheduler import prioritize, severity_rank
+from tachyon.urlindex import UrlIndex, hash_key
+
+
+MAGIC = b"TWL1"
+# Bumped whenever the layout or the ordering of compiled entries changes
+FORMAT_VERSION = 3
+
+# magic, format version, entry count, source size, source mtime (ns), source sha256
+HEADER = struct.Struct("<4sIQQQ32s")
+MTIME = struct.Struct("<Q")
+MTIME_OFFSET = struct.calcsize("<4sIQQ")
+
+
+def default_cache_dir():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "tachyon", "wordlists")
+
+
+def compiled_path(source, cache_dir=None):
+    source = os.path.abspath(source)
+    name = "%s-%s.twl" % (os.path.basename(source), hashlib.sha1(source.encode("utf-8")).hexdigest()[:16])
+    return os.path.join(cache_dir or default_cache_dir(), name)
+
+
+def compile_wordlist(source, target, entries):
+    """
+    Write `entries` to `target` in priority order: a header identifying the source, an offset table, the sorted keys
+    of the entry URLs (see UrlIndex) and one compact JSON record per entry. The file is replaced atomically, concurrent
+    readers keep their mapping of the old one.
+    """
+    stat = os.stat(source)
+    entries = prioritize(entries)
+    records = [json.dumps(entry, separators=(",", ":")).encode("utf-8") for entry in entries]
+    keys = array("Q", sorted(hash_key(entry["url"]) for entry in entries))
+    offsets = array("Q", [0])
+    for record in records:
+        offsets.append(offsets[-1] + len(record))
+
+    data_start = HEADER.size + offsets.itemsize * len(offsets) + keys.itemsize * len(keys)
+    for i in range(len(offsets)):
+        offsets[i] += data_start
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temp = "%s.%d.tmp" % (target, os.getpid())
+    with open(temp, "wb") as fp:
+        fp.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(records), stat.st_size, stat.st_mtime_ns,
+                             _file_hash(source)))
+        fp.write(offsets.tobytes())
+        fp.write(keys.tobytes())
+        for record in records:
+            fp.write(record)
+    os.replace(temp, target)
+
+
+def is_current(source, target):
+    """ The compiled file is current if the source has the same size and mtime, or failing that, the same content. """
+    try:
+        with open(target, "rb") as fp:
+            magic, version, _, size, mtime_ns, digest = HEADER.unpack(fp.read(HEADER.size))
+    except (OSError, struct.error):
+        return False
+
+    if magic != MAGIC or version != FORMAT_VERSION:
+        return False
+
+    stat = os.stat(source)
+    if stat.st_size != size:
+        return False
+    if stat.st_mtime_ns == mtime_ns:
+        return True
+    if _file_hash(source) != digest:
+        return False
+
+    # Same content with a new mtime (ex: a fresh checkout), recorded so the next runs do not hash the source again
+    try:
+        with open(target, "r+b") as fp:
+            fp.seek(MTIME_OFFSET)
+            fp.write(MTIME.pack(stat.st_mtime_ns))
+    except OSError:
+        pass
+    return True
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for block in iter(lambda: fp.read(1 << 20), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+class CompiledWordlist:
+    """
+    Read-only sequence over a compiled wordlist. The file is memory-mapped and entries are decoded on first access, so
+    only the pages being read are resident. The `cache_size` most recently decoded entries are kept: candidates
+    generated from an entry while it is in use share the same dict, without pinning every entry ever read.
+    """
+
+    def __init__(self, path, cache_size=1024):
+        with open(path, "rb") as fp:
+            self.mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        _, _, self.count, _, _, _ = HEADER.unpack_from(self.mmap)
+        keys_start = HEADER.size + 8 * (self.count + 1)
+        self.offsets = memoryview(self.mmap)[HEADER.size:keys_start].cast("Q")
+        self.keys = memoryview(self.mmap)[keys_start:keys_start + 8 * self.count].cast("Q")
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        entry = self.cache.get(index)
+        if entry is None:
+            entry = self.cache[index] = json.loads(self.mmap[self.offsets[index]:self.offsets[index + 1]])
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(index)
+        return entry
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+    def has_url(self, url):
+        """ Looked up in the sorted keys, without decoding any entry """
+        key = hash_key(url)
+        index = bisect.bisect_left(self.keys, key)
+        return index < self.count and self.keys[index] == key
+
+    def close(self):
+        if not self.mmap.closed:
+            self.cache.clear()
+            self.keys.release()
+            self.offsets.release()
+            self.mmap.close()
+
+
+class Wordlist:
+    """
+    Loaded entries (a CompiledWordlist, already in priority order) followed by the entries added during the scan,
+    mostly by plugins. Supports the list operations used on the paths and files of a ScanContext.
+
+    Entries that were not compiled are sorted once when `prioritized` is false, and added entries are inserted in
+    priority order, so in_priority_order() never sorts.
+    """
+
+    def __init__(self, base, prioritized=True):
+        self.base = base if prioritized else prioritize(base)
+        self.added = []
+        self.added_in_order = []
+        # URLs of entries that were not compiled, indexed on the first lookup
+        self.base_index = None
+
+    def copy(self):
+        """ A wordlist sharing the loaded entries, without the ones added to this one """
+        return Wordlist(self.base)
+
+    def append(self, entry):
+        self.added.append(entry)
+        bisect.insort(self.added_in_order, entry, key=severity_rank)
+
+    def extend(self, entries):
+        for entry in entries:
+            self.append(entry)
+
+    def in_priority_order(self):
+        if not self.added:
+            return iter(self.base)
+        # Both sides are sorted by severity, merging keeps them lazy. Loaded entries come first on equal severity.
+        return heapq.merge(self.base, self.added_in_order, key=severity_rank)
+
+    def has_url(self, url):
+        """ True if `url` is the one of a loaded entry. Added entries are not looked up. """
+        if hasattr(self.base, "has_url"):
+            return self.base.has_url(url)
+        if self.base_index is None:
+            self.base_index = UrlIndex()
+            self.base_index.update(entry["url"] for entry in self.base)
+        return url in self.base_index
+
+    def close(self):
+        """ Release the loaded entries, copies sharing them can no longer be read either """
+        if hasattr(self.base, "close"):
+            self.base.close()
+
+    def __iter__(self):
+        return chain(self.base, self.added)
+
+    def __len__(self):
+        return len(self.base) + len(self.added)
+
+
+class WordlistIndex(UrlIndex):
+    """
+    UrlIndex of the entries added to a wordlist that also holds the URLs of its loaded entries. These are looked up in
+    the wordlist itself rather than being hashed upfront, which would decode every entry.
+    """
+
+    def __init__(self, wordlist, urls=()):
+        super().__init__()
+        self.wordlist = wordlist
+        self.update(urls)
+
+    def add(self, url):
+        if self.wordlist.has_url(url):
+            self.hits += 1
+            return False
+        return super().add(url)
+
+    def __contains__(self, url):
+        return self.wordlist.has_url(url) or super().__contains__(url)
@@ -0,0 +1,149 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from os.path import join
+from unittest import TestCase
+from unittest.mock import patch
+
+from tachyon import conf
+from tachyon.blobstore import BlobStore, get_store
+from tachyon.plugins.host.Svn import save_file
+
+
+class TestBlobStore(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.store = BlobStore(self.directory.name)
+
+    def test_put_stores_content_under_its_hash(self):
+        key = self.store.put(b"<html>login</html>")
+
+        self.assertEqual(key, hashlib.sha256(b"<html>login</html>").hexdigest())
+        self.assertEqual(self.store.path(key), join(self.directory.name, key[:2], key))
+        self.assertEqual(self.store.get(key), b"<html>login</html>")
+        self.assertEqual(self.store.put("<html>login</html>"), key)
+
+    def test_identical_content_is_written_once(self):
+        with patch.object(self.store, "_write", wraps=self.store._write) as write:
+            keys = {self.store.put(b"error template") for _ in range(10)}
+
+        self.assertEqual(len(keys), 1)
+        write.assert_called_once()
+        self.assertEqual((self.store.stored, self.store.deduplicated), (1, 9))
+        self.assertEqual((self.store.bytes_written, self.store.bytes_saved), (14, 14 * 9))
+
+    def test_blobs_written_by_a_previous_store_are_reused(self):
+        key = self.store.put(b"content")
+
+        other = BlobStore(self.directory.name)
+        with patch.object(other, "_write") as write:
+            self.assertEqual(other.put(b"content"), key)
+        write.assert_not_called()
+
+    def test_concurrent_puts_of_same_content(self):
+        with ThreadPoolExecutor(8) as executor:
+            keys = set(executor.map(self.store.put, [b"same body"] * 100))
+
+        key, = keys
+        self.assertEqual(self.store.get(key), b"same body")
+        self.assertEqual(os.listdir(join(self.directory.name, key[:2])), [key])
+
+    def test_concurrent_put_returns_once_the_blob_is_written(self):
+        writing = threading.Event()
+        release = threading.Event()
+        write = self.store._write
+
+        def slow_write(key, content):
+            writing.set()
+            release.wait(5)
+            write(key, content)
+
+        target = join(self.directory.name, "output", "file.php")
+        with patch.object(self.store, "_write", slow_write), ThreadPoolExecutor(2) as executor:
+            first = executor.submit(self.store.put, b"same body")
+            writing.wait(5)
+            second = executor.submit(self.store.put, b"same body")
+            self.assertFalse(second.done())
+            release.set()
+            self.store.link(second.result(5), target)
+
+        self.assertEqual(first.result(), second.result())
+        with open(target, "rb") as fp:
+            self.assertEqual(fp.read(), b"same body")
+        self.assertEqual((self.store.stored, self.store.deduplicated), (1, 1))
+
+    def test_failed_write_is_retried_by_concurrent_put(self):
+        writing = threading.Event()
+        release = threading.Event()
+        write = self.store._write
+        calls = []
+
+        def failing_write(key, content):
+            calls.append(key)
+            if len(calls) == 1:
+                writing.set()
+                release.wait(5)
+                raise OSError("disk full")
+            write(key, content)
+
+        with patch.object(self.store, "_write", failing_write), ThreadPoolExecutor(2) as executor:
+            first = executor.submit(self.store.put, b"same body")
+            writing.wait(5)
+            second = executor.submit(self.store.put, b"same body")
+            release.set()
+            with self.assertRaises(OSError):
+                first.result(5)
+            key = second.result(5)
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.store.get(key), b"same body")
+
+    def test_link_makes_blob_available_at_target(self):
+        key = self.store.put(b"content")
+        target = join(self.directory.name, "output", "a", "file.php")
+
+        self.store.link(key, target)
+        self.store.link(key, target)
+
+        with open(target, "rb") as fp:
+            self.assertEqual(fp.read(), b"content")
+        self.assertEqual(os.stat(target).st_ino, os.stat(self.store.path(key)).st_ino)
+
+    def test_svn_downloads_go_through_the_store(self):
+        blobs = join(self.directory.name, "blobs")
+        with patch.object(conf, "blob_store_dir", blobs):
+            current = os.getcwd()
+            os.chdir(self.directory.name)
+            try:
+                save_file("example.com", "/a.php", "<?php same")
+                save_file("example.com", "/b/b.php", "<?php same")
+            finally:
+                os.chdir(current)
+
+        store = get_store(blobs)
+        self.assertEqual((store.stored, store.deduplicated), (1, 1))
+        with open(join(self.directory.name, "output", "example.com", "b", "b.php")) as fp:
+            self.assertEqual(fp.read(), "<?php same")
@@ -0,0 +1,60 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+
+from unittest import TestCase
+
+from tachyon.candidate import Candidate
+
+
+class TestCandidate(TestCase):
+
+    def setUp(self):
+        self.descriptor = {"url": "config", "description": "Config file", "severity": "critical",
+                           "match_string": "password"}
+
+    def test_url_is_the_generated_url(self):
+        candidate = Candidate("/admin/config.bak", self.descriptor)
+
+        self.assertEqual(candidate["url"], "/admin/config.bak")
+        self.assertEqual(candidate.get("url"), "/admin/config.bak")
+        self.assertEqual(self.descriptor["url"], "config")
+
+    def test_other_keys_are_read_from_descriptor(self):
+        candidate = Candidate("/admin/config.bak", self.descriptor)
+
+        self.assertEqual(candidate["description"], "Config file")
+        self.assertEqual(candidate.get("severity", "warning"), "critical")
+        self.assertEqual(candidate.get("no_suffix"), None)
+        self.assertIn("match_string", candidate)
+        self.assertNotIn("match_bytes", candidate)
+        with self.assertRaises(KeyError):
+            candidate["match_bytes"]
+
+    def test_descriptor_is_shared_when_created_from_another_candidate(self):
+        parent = Candidate("/admin", self.descriptor)
+
+        candidate = Candidate("/admin/admin", parent)
+
+        self.assertIs(candidate.descriptor, self.descriptor)
+
+    def test_to_dict_merge_url_with_descriptor(self):
+        candidate = Candidate("/admin/config.bak", self.descriptor)
+
+        self.assertEqual(candidate.to_dict(), {"url": "/admin/config.bak", "description": "Config file",
+                                               "severity": "critical", "match_string": "password"})
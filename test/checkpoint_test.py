@@ -0,0 +1,275 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+
+import os
+import tempfile
+from os.path import join
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from aiohttp.test_utils import make_mocked_coro
+from fixtures import async_test, FakeHammerTimeEngine, create_json_data, RaiseForPaths, SetFlagInResult
+from hammertime.core import HammerTime
+from hammertime.ruleset import RejectRequest
+
+from tachyon import __main__ as tachyon, dbutils
+from tachyon.checkpoint import Checkpoint, CheckpointMismatch
+from tachyon.directoryfetcher import DirectoryFetcher
+from tachyon.filefetcher import FileFetcher
+from tachyon.output import PrettyOutput
+from tachyon.result import Record, ResultAccumulator
+from tachyon.scancontext import ScanContext
+from tachyon.wordlist import Wordlist
+
+
+class TestCheckpoint(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = join(self.directory.name, "scan.checkpoint")
+
+    def checkpoint(self, resume=True, target="http://example.com", **kwargs):
+        checkpoint = Checkpoint(self.path, target=target, resume=resume, **kwargs)
+        self.addCleanup(checkpoint.close)
+        return checkpoint
+
+    def test_resumed_checkpoint_restores_progress(self):
+        checkpoint = self.checkpoint(resume=False)
+        checkpoint.complete_phase("plugins", paths=[{"url": "/svn"}], files=[{"url": "entries"}])
+        checkpoint.add_done("path", "/admin")
+        checkpoint.add_done("file", "/admin")
+        checkpoint.add_valid_path({"url": "/admin"})
+        checkpoint.add_result(Record("http://example.com/admin/", {"path": {"url": "/admin"}}, 200))
+        checkpoint.start_level(1, 3)
+        checkpoint.close()
+
+        resumed = self.checkpoint()
+
+        self.assertEqual(resumed.phases, {"plugins"})
+        self.assertEqual(resumed.paths, [{"url": "/svn"}])
+        self.assertEqual(resumed.files, [{"url": "entries"}])
+        self.assertEqual(resumed.valid_paths, [{"url": "/admin"}])
+        self.assertEqual([record.url for record in resumed.results], ["http://example.com/admin/"])
+        self.assertEqual(resumed.levels, [(1, 3)])
+        self.assertTrue(resumed.is_done("path", "/admin/"))
+        self.assertFalse(resumed.is_done("path", "/login"))
+
+    def test_events_are_appended_after_previous_run(self):
+        checkpoint = self.checkpoint(resume=False)
+        checkpoint.add_done("path", "/a")
+        checkpoint.close()
+        checkpoint = self.checkpoint()
+        checkpoint.add_done("path", "/b")
+        checkpoint.close()
+
+        resumed = self.checkpoint()
+
+        self.assertTrue(resumed.is_done("path", "/a"))
+        self.assertTrue(resumed.is_done("path", "/b"))
+
+    def test_events_are_written_by_batch(self):
+        checkpoint = self.checkpoint(resume=False, flush_interval=3600)
+        size = os.path.getsize(self.path)
+
+        checkpoint.add_done("path", "/a")
+        checkpoint.add_done("path", "/b")
+        self.assertEqual(os.path.getsize(self.path), size)
+
+        checkpoint.complete_phase("root_files")
+        self.assertGreater(os.path.getsize(self.path), size)
+
+    def test_truncated_batch_is_dropped(self):
+        checkpoint = self.checkpoint(resume=False)
+        checkpoint.add_done("path", "/a")
+        checkpoint.flush()
+        complete = os.path.getsize(self.path)
+        checkpoint.add_done("path", "/b")
+        checkpoint.close()
+        os.truncate(self.path, os.path.getsize(self.path) - 3)
+
+        resumed = self.checkpoint()
+        resumed.add_done("path", "/c")
+        resumed.close()
+
+        self.assertGreaterEqual(os.path.getsize(self.path), complete)
+        resumed = self.checkpoint()
+        self.assertTrue(resumed.is_done("path", "/a"))
+        self.assertFalse(resumed.is_done("path", "/b"))
+        self.assertTrue(resumed.is_done("path", "/c"))
+
+    def test_checkpoint_of_another_target_is_refused(self):
+        self.checkpoint(resume=False).close()
+
+        with self.assertRaises(CheckpointMismatch):
+            self.checkpoint(target="http://other.example.com")
+
+    def test_new_scan_overwrites_previous_checkpoint(self):
+        checkpoint = self.checkpoint(resume=False)
+        checkpoint.add_done("path", "/a")
+        checkpoint.close()
+
+        self.checkpoint(resume=False).close()
+
+        self.assertFalse(self.checkpoint().is_done("path", "/a"))
+
+    def test_without_path_nothing_is_done(self):
+        checkpoint = Checkpoint()
+        checkpoint.add_done("path", "/a")
+        checkpoint.complete_phase("plugins")
+
+        self.assertFalse(checkpoint.is_done("path", "/a"))
+        self.assertEqual(checkpoint.phases, {"plugins"})
+
+
+@patch("tachyon.output.OutputManager.output_result")
+class TestFetchersWithCheckpoint(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = join(self.directory.name, "scan.checkpoint")
+
+    def async_setup(self, loop):
+        self.engine = FakeHammerTimeEngine()
+        self.hammertime = HammerTime(loop=loop, request_engine=self.engine)
+        self.hammertime.collect_successful_requests()
+        self.hammertime.heuristics.add_multiple([SetFlagInResult("soft404", False),
+                                                 SetFlagInResult("error_behavior", False)])
+
+    @async_test()
+    async def test_directory_fetcher_records_and_skips_done_paths(self, output_result, loop):
+        self.async_setup(loop)
+        self.hammertime.heuristics.add(RaiseForPaths(["/b"], RejectRequest("404")))
+        context = ScanContext("http://example.com", checkpoint=Checkpoint(self.path, resume=False))
+        accumulator = ResultAccumulator(output_manager=PrettyOutput(), context=context)
+        fetcher = DirectoryFetcher(context, self.hammertime, accumulator=accumulator)
+
+        await fetcher.fetch_paths(create_json_data(["/a", "/b"]))
+        context.checkpoint.close()
+        resumed = Checkpoint(self.path, resume=True)
+        context.checkpoint = resumed
+        await fetcher.fetch_paths(create_json_data(["/a", "/b", "/c"]))
+        resumed.close()
+
+        self.assertEqual(list(self.engine.get_requested_urls()), ["http://example.com/a/", "http://example.com/b/",
+                                                                  "http://example.com/c/"])
+        self.assertEqual([path["url"] for path in resumed.valid_paths], ["/a"])
+        self.assertEqual([record.url for record in resumed.results], ["http://example.com/a/"])
+
+    @async_test()
+    async def test_file_fetcher_skips_done_files(self, output_result, loop):
+        self.async_setup(loop)
+        checkpoint = Checkpoint(self.path, resume=False)
+        checkpoint.add_done("file", "/index.php.bak")
+        checkpoint.close()
+        checkpoint = Checkpoint(self.path, resume=True)
+        self.addCleanup(checkpoint.close)
+        fetcher = FileFetcher(ScanContext("http://example.com", checkpoint=checkpoint), self.hammertime)
+
+        await fetcher.fetch_files(create_json_data(["/index.php.bak", "/index.php.old"]))
+
+        self.assertEqual(list(self.engine.get_requested_urls()), ["http://example.com/index.php.old"])
+
+
+class TestResumeScan(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = join(directory.name, "scan.checkpoint")
+        self.context = ScanContext("http://example.com")
+        self.context.valid_paths.extend(create_json_data(["/"]))
+        self.accumulator = ResultAccumulator(output_manager=MagicMock())
+
+    @async_test()
+    async def test_completed_phases_are_skipped_and_their_state_restored(self, loop):
+        checkpoint = self.context.checkpoint
+        checkpoint.phases = {"plugins", "root_files"}
+        checkpoint.paths = [{"url": "/from-plugin"}]
+        checkpoint.results = [Record("http://example.com/found", {"file": {"url": "found", "description": "d"}}, 200)]
+        hammertime = HammerTime(loop=loop, request_engine=FakeHammerTimeEngine())
+        hammertime.collect_successful_requests()
+
+        with patch("tachyon.__main__.load_execute_host_plugins", make_mocked_coro()) as plugins, \
+                patch("tachyon.__main__.load_execute_file_plugins"), \
+                patch("tachyon.__main__.get_session_cookies", make_mocked_coro()), \
+                patch("tachyon.__main__.FileFetcher") as file_fetcher, \
+                patch("tachyon.__main__.test_paths_exists", make_mocked_coro()), \
+                patch("tachyon.textutils.output_info"):
+            file_fetcher.return_value.fetch_files = make_mocked_coro()
+            await tachyon.scan(hammertime, self.context, accumulator=self.accumulator)
+
+        plugins.assert_not_called()
+        self.assertEqual(self.context.paths, [{"url": "/from-plugin"}])
+        root_files, files = [c[0][0] for c in file_fetcher.return_value.fetch_files.call_args_list]
+        self.assertEqual(list(root_files), [])
+        self.assertNotEqual(files, ())
+        self.assertEqual(checkpoint.phases, {"plugins", "root_files", "files"})
+        self.assertEqual([record.url for record in self.accumulator.candidates], ["http://example.com/found"])
+        self.accumulator.output_manager.output_result.assert_called()
+
+    @async_test()
+    async def test_additions_of_host_plugins_are_recorded(self, loop):
+        self.context.paths = Wordlist([{"url": "/admin"}], prioritized=False)
+        self.context.checkpoint = Checkpoint(self.path, target="http://example.com")
+        hammertime = HammerTime(loop=loop, request_engine=FakeHammerTimeEngine())
+        hammertime.collect_successful_requests()
+        plugin = MagicMock(spec=["execute"])
+
+        async def execute(hammertime, context):
+            dbutils.add_path(context, {"url": "/from-plugin"})
+
+        async def load_execute_host_plugins(hammertime, context):
+            return await tachyon.execute_host_plugins([plugin], hammertime, context)
+
+        plugin.execute = execute
+        with patch("tachyon.__main__.load_execute_host_plugins", load_execute_host_plugins), \
+                patch("tachyon.__main__.get_session_cookies", make_mocked_coro()), \
+                patch("tachyon.textutils.output_info"):
+            await tachyon.scan(hammertime, self.context, accumulator=self.accumulator, plugins_only=True)
+        self.context.checkpoint.close()
+
+        resumed = Checkpoint(self.path, target="http://example.com", resume=True)
+        self.addCleanup(resumed.close)
+        self.assertEqual(resumed.paths, [{"url": "/from-plugin"}])
+        self.assertEqual([path["url"] for path in self.context.paths], ["/admin", "/from-plugin"])
+
+    @async_test()
+    async def test_interrupted_recursion_level_is_expanded_again(self, loop):
+        self.context.paths = create_json_data(["/admin", "/images"])
+        checkpoint = self.context.checkpoint
+        checkpoint.fp = MagicMock()
+        checkpoint.phases = {"plugins", "root_files"}
+        checkpoint.valid_paths = create_json_data(["/admin", "/admin/admin"])
+        checkpoint.levels = [(1, 1), (2, 2)]
+        fetcher = MagicMock()
+        fetcher.fetch_paths = make_mocked_coro()
+
+        with patch("tachyon.__main__.DirectoryFetcher", MagicMock(return_value=fetcher)), \
+                patch("tachyon.textutils.output_info") as output_info:
+            await tachyon.test_paths_exists(MagicMock(is_closed=False, _interrupted=False), self.context,
+                                            recursive=True, depth_limit=2, accumulator=self.accumulator)
+
+        recursion = [list(c[0][0]) for c in fetcher.fetch_paths.call_args_list][2:]
+        self.assertEqual([[path["url"] for path in paths] for paths in recursion],
+                         [["/admin/admin/admin", "/admin/admin/images"]])
+        self.assertIn("paths", checkpoint.phases)
+        levels = [c[0][0] for c in output_info.call_args_list if c[0][0].startswith("Recursion depth")]
+        self.assertEqual([level.split(":")[0] for level in levels], ["Recursion depth 2"])
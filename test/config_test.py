@@ -17,6 +17,7 @@
 # Place, Suite 330, Boston, MA  02111-1307  USA
 
 
+import tempfile
 from unittest import TestCase
 from unittest.mock import MagicMock, patch
 
@@ -28,17 +29,21 @@ from hammertime.core import HammerTime
 from hammertime.rules import RejectCatchAllRedirect, FollowRedirects, FilterRequestFromURL, SetHeader
 
 from tachyon import conf, config
+from tachyon.scancontext import ScanContext
 
 
 class TestConfig(TestCase):
 
+    def setUp(self):
+        self.context = ScanContext("http://example.com")
+
     @async_test()
     async def test_add_http_headers(self, loop):
         hammertime = HammerTime(loop=loop)
-        config.heuristics_with_child = [RejectCatchAllRedirect(), FollowRedirects()]
-        hammertime.heuristics.add_multiple(config.heuristics_with_child)
+        hammertime.heuristics_with_child = [RejectCatchAllRedirect(), FollowRedirects()]
+        hammertime.heuristics.add_multiple(hammertime.heuristics_with_child)
         hammertime.heuristics.add = MagicMock()
-        for heuristic in config.heuristics_with_child:
+        for heuristic in hammertime.heuristics_with_child:
             heuristic.child_heuristics.add = MagicMock()
 
         config.add_http_header(hammertime, "header", "value")
@@ -46,7 +51,7 @@ class TestConfig(TestCase):
         set_header = hammertime.heuristics.add.call_args[0][0]
         self.assertEqual(set_header.name, "header")
         self.assertEqual(set_header.value, "value")
-        for heuristic_with_child in config.heuristics_with_child:
+        for heuristic_with_child in hammertime.heuristics_with_child:
             set_header = heuristic_with_child.child_heuristics.add.call_args[0][0]
             self.assertEqual(set_header.name, "header")
             self.assertEqual(set_header.value, "value")
@@ -57,41 +62,37 @@ class TestConfig(TestCase):
 
         with patch("tachyon.config.SetHeader") as set_header:
             set_header.return_value = SetHeader("a", "b")
-            async with config.configure_hammertime(user_agent=user_agent):
+            async with config.configure_hammertime(self.context, user_agent=user_agent):
                 pass
 
             set_header.assert_any_call("User-Agent", user_agent)
 
     @async_test()
     async def test_configure_hammertime_add_host_header_to_request_header(self):
-        conf.target_host = "example.com"
-
         with patch("tachyon.config.SetHeader") as set_header:
             set_header.return_value = SetHeader("a", "b")
-            async with config.configure_hammertime():
+            async with config.configure_hammertime(self.context):
                 pass
 
-            set_header.assert_any_call("Host", conf.target_host)
+            set_header.assert_any_call("Host", "example.com")
 
     @async_test()
     async def test_configure_hammertime_use_user_supplied_vhost_for_host_header(self):
-        conf.target_host = "example.com"
         forge_vhost = "vhost.example.com"
 
         with patch("tachyon.config.SetHeader") as set_header:
             set_header.return_value = SetHeader("a", "b")
-            async with config.configure_hammertime(vhost=forge_vhost):
+            async with config.configure_hammertime(self.context, vhost=forge_vhost):
                 pass
 
             set_header.assert_any_call("Host", forge_vhost)
 
     @async_test()
     async def test_configure_hammertime_allow_requests_to_user_supplied_vhost(self):
-        conf.target_host = "example.com"
         forge_vhost = "vhost.example.com"
 
         with patch("tachyon.config.FilterRequestFromURL", MagicMock(return_value=FilterRequestFromURL)) as url_filter:
-            async with config.configure_hammertime(vhost=forge_vhost):
+            async with config.configure_hammertime(self.context, vhost=forge_vhost):
                 pass
 
             _, kwargs = url_filter.call_args
@@ -103,7 +104,7 @@ class TestConfig(TestCase):
         engine.session.close = make_mocked_coro()
         EngineFactory = MagicMock(return_value=engine)
         with patch("tachyon.config.AioHttpEngine", EngineFactory):
-            async with config.configure_hammertime(proxy="my-proxy") as hammertime:
+            async with config.configure_hammertime(self.context, proxy="my-proxy") as hammertime:
                 EngineFactory.assert_called_once_with(loop=loop, verify_ssl=False, proxy="my-proxy")
                 self.assertEqual(hammertime.request_engine.request_engine, engine)
 
@@ -111,7 +112,7 @@ class TestConfig(TestCase):
     async def test_configure_hammertime_create_client_session_with_dummy_cookie_jar_if_user_supply_cookies(self):
         cookies = "not none"
         with patch("tachyon.config.ClientSession") as SessionFactory:
-            async with config.configure_hammertime(cookies=cookies):
+            async with config.configure_hammertime(self.context, cookies=cookies):
                 pass
 
             _, kwargs = SessionFactory.call_args
@@ -121,9 +122,53 @@ class TestConfig(TestCase):
     async def test_configure_hammertime_configure_aiohttp_to_resolve_host_only_once(self, loop):
         with patch("tachyon.config.TCPConnector", MagicMock(return_value=TCPConnector(loop=loop))) as \
                 ConnectorFactory:
-            async with config.configure_hammertime():
+            async with config.configure_hammertime(self.context):
                 pass
 
             _, kwargs = ConnectorFactory.call_args
             self.assertTrue(kwargs["use_dns_cache"])
             self.assertIsNone(kwargs["ttl_dns_cache"])
+
+    @async_test()
+    async def test_create_session_cap_connections_globally_and_per_host(self, loop):
+        with patch("tachyon.config.TCPConnector", MagicMock(return_value=TCPConnector(loop=loop))) as \
+                ConnectorFactory:
+            session = config.create_session(loop, limit=50, limit_per_host=10)
+            await session.close()
+
+            _, kwargs = ConnectorFactory.call_args
+            self.assertEqual((kwargs["limit"], kwargs["limit_per_host"]), (50, 10))
+
+    @async_test()
+    async def test_configure_hammertime_leave_shared_session_open(self, loop):
+        session = config.create_session(loop)
+
+        async with config.configure_hammertime(self.context, session=session) as hammertime:
+            self.assertIs(hammertime.request_engine.request_engine.session, session)
+        async with config.configure_hammertime(self.context, session=session):
+            pass
+
+        self.assertFalse(session.closed)
+        await session.close()
+
+    @async_test()
+    async def test_configure_hammertime_close_har_archive_at_scan_end(self):
+        with tempfile.TemporaryDirectory() as directory, patch.object(conf, "blob_store_dir", directory + "/blobs"):
+            async with config.configure_hammertime(self.context, har_output_dir=directory) as hammertime:
+                archive = hammertime.har_archive
+
+            self.assertTrue(archive.closed)
+            self.assertFalse(archive.thread.is_alive())
+
+    @async_test()
+    async def test_configure_hammertime_keep_heuristics_of_each_scan_apart(self):
+        other = ScanContext("http://other.example.com")
+
+        async with config.configure_hammertime(self.context) as hammertime, \
+                config.configure_hammertime(other) as other_hammertime:
+            hosts = [[heuristic.value for heuristic in scan.probe_heuristics
+                      if isinstance(heuristic, SetHeader) and heuristic.name == "Host"]
+                     for scan in (hammertime, other_hammertime)]
+
+            self.assertEqual(hosts, [["example.com"], ["other.example.com"]])
+            self.assertIsNot(hammertime.heuristics_with_child[0], other_hammertime.heuristics_with_child[0])
@@ -23,28 +23,26 @@ from unittest.mock import call, patch
 from fixtures import async_test, FakeHammerTimeEngine, create_json_data, RaiseForPaths, SetResponseCode, SetFlagInResult
 from hammertime.core import HammerTime
 from hammertime.ruleset import RejectRequest
-from tachyon.database import valid_paths
 from tachyon.directoryfetcher import DirectoryFetcher
-
-from tachyon import database
+from tachyon.scancontext import ScanContext
 
 
 @patch("tachyon.output.OutputManager.output_result")
 class TestDirectoryFetcher(TestCase):
 
     def setUp(self):
-        valid_paths.clear()
         self.host = "http://example.com"
+        self.context = ScanContext(self.host)
 
     def async_setup(self, loop):
         self.hammertime = HammerTime(loop=loop, request_engine=FakeHammerTimeEngine())
         self.hammertime.collect_successful_requests()
         self.hammertime.heuristics.add_multiple([SetFlagInResult("soft404", False),
                                                  SetFlagInResult("error_behavior", False)])
-        self.directory_fetcher = DirectoryFetcher(self.host, self.hammertime)
+        self.directory_fetcher = DirectoryFetcher(self.context, self.hammertime)
 
     @async_test()
-    async def test_fetch_paths_add_valid_path_to_database(self, output_result, loop):
+    async def test_fetch_paths_add_valid_path_to_scan_context(self, output_result, loop):
         valid = ["/a", "b", "/c", "/1", "/2", "/3"]
         invalid = ["/d", "/e", "/4", "/5"]
         paths = valid + invalid
@@ -53,8 +51,8 @@ class TestDirectoryFetcher(TestCase):
 
         await self.directory_fetcher.fetch_paths(create_json_data(paths))
 
-        self.assertEqual(len(valid), len(valid_paths))
-        for path in valid_paths:
+        self.assertEqual(len(valid), len(self.context.valid_paths))
+        for path in self.context.valid_paths:
             self.assertIn(path["url"], valid)
             self.assertNotIn(path["url"], invalid)
 
@@ -66,7 +64,7 @@ class TestDirectoryFetcher(TestCase):
 
         await self.directory_fetcher.fetch_paths(create_json_data(paths))
 
-        self.assertEqual(len(database.valid_paths), 0)
+        self.assertEqual(len(self.context.valid_paths), 0)
 
     @async_test()
     async def test_fetch_paths_output_found_directory(self, output_result, loop):
@@ -91,7 +89,7 @@ class TestDirectoryFetcher(TestCase):
 
         await self.directory_fetcher.fetch_paths(paths)
 
-        self.assertEqual(database.valid_paths, paths)
+        self.assertEqual(self.context.valid_paths, paths)
         output_result.assert_not_called()
 
     @async_test()
@@ -27,9 +27,9 @@ from hammertime.http import Entry
 from hammertime.kb import KnowledgeBase
 from hammertime.ruleset import RejectRequest
 
-from tachyon import conf
 from tachyon.config import setup_hammertime_heuristics
 from tachyon.filefetcher import FileFetcher, ValidateEntry
+from tachyon.scancontext import ScanContext
 
 
 @patch("tachyon.output.OutputManager.output_result")
@@ -42,14 +42,14 @@ class TestFileFetcher(TestCase):
     def setUpFetcher(self, loop):
         self.hammertime = HammerTime(loop=loop, request_engine=FakeHammerTimeEngine(), kb=KnowledgeBase())
         self.hammertime.collect_successful_requests()
-        conf.target_host = self.host
-        self.file_fetcher = FileFetcher(self.host, self.hammertime)
+        self.context = ScanContext(self.host)
+        self.file_fetcher = FileFetcher(self.context, self.hammertime)
 
     def setup_hammertime_heuristics(self, add_before_defaults=None, add_after_defaults=None):
         if add_before_defaults is not None:
             self.hammertime.heuristics.add_multiple(add_before_defaults)
         with patch("tachyon.config.DetectSoft404", new=MagicMock(return_value=SetFlagInResult("soft404", False))):
-            setup_hammertime_heuristics(self.hammertime)
+            setup_hammertime_heuristics(self.hammertime, self.context)
         if add_after_defaults is not None:
             self.hammertime.heuristics.add_multiple(add_after_defaults)
 
@@ -19,19 +19,19 @@
 
 from unittest import TestCase
 
-import tachyon.database as database
-
 from tachyon.generator import FileGenerator
+from tachyon.scancontext import ScanContext
 
 
 class TestFileGenerator(TestCase):
 
     def setUp(self):
-        self.generator = FileGenerator()
+        self.context = ScanContext()
+        self.generator = FileGenerator(self.context)
 
     def test_generate_file_append_loaded_files_to_valid_path_if_no_suffix(self):
-        database.valid_paths = load_paths(["/", "/0", "/1/", "2"])
-        database.files = load_files(["/abc.html", "/123.php", "test"], no_suffix=True)
+        self.context.valid_paths = load_paths(["/", "/0", "/1/", "2"])
+        self.context.files = load_files(["/abc.html", "/123.php", "test"], no_suffix=True)
 
         files = self.generator.generate_files()
 
@@ -42,8 +42,8 @@ class TestFileGenerator(TestCase):
         self.assertEqual(expected, {file["url"] for file in files})
 
     def test_generate_file_append_executable_suffixes_to_loaded_files_if_file_is_executable(self):
-        database.valid_paths = load_paths(["/", "0"])
-        database.files = load_files(["/abc", "123"], executable=True)
+        self.context.valid_paths = load_paths(["/", "0"])
+        self.context.files = load_files(["/abc", "123"], executable=True)
         self.generator.executables_suffixes = [".php", ".aspx"]
 
         files = self.generator.generate_files()
@@ -53,8 +53,8 @@ class TestFileGenerator(TestCase):
         self.assertEqual(expected, {file["url"] for file in files})
 
     def test_generate_file_append_file_suffixes_to_loaded_files_if_no_suffix_is_false(self):
-        database.valid_paths = load_paths(["/", "0"])
-        database.files = load_files(["/abc", "123"])
+        self.context.valid_paths = load_paths(["/", "0"])
+        self.context.files = load_files(["/abc", "123"])
         self.generator.file_suffixes = [".txt", ".xml"]
 
         files = self.generator.generate_files()
@@ -63,6 +63,103 @@ class TestFileGenerator(TestCase):
                     "/0/abc.txt", "/0/abc.xml", "/0/123.txt", "/0/123.xml"}
         self.assertEqual(expected, {file["url"] for file in files})
 
+    def test_generate_files_is_lazy(self):
+        self.context.valid_paths = load_paths(["/"])
+        self.context.files = load_files(["/abc"])
+        self.generator.file_suffixes = [".txt"]
+
+        files = self.generator.generate_files()
+        self.context.valid_paths.extend(load_paths(["/0"]))
+
+        self.assertEqual({"/abc.txt", "/0/abc.txt"}, {file["url"] for file in files})
+
+    def test_count_files_match_generated_files_without_expanding_them(self):
+        self.context.valid_paths = load_paths(["/", "/0", "/1"])
+        self.context.files = load_files(["/abc", "123"]) + load_files(["test.html"], no_suffix=True) + \
+            load_files(["index"], executable=True)
+        self.generator.file_suffixes = [".txt", ".xml", ".bak"]
+        self.generator.executables_suffixes = [".php", ".aspx"]
+
+        self.assertEqual(self.generator.count_files(skip_root=True), 2 * 9)
+        self.assertEqual(len(list(self.generator.generate_files(skip_root=True))), 2 * 9)
+        self.assertEqual(self.generator.count_files(), 9)
+        self.assertEqual(len(list(self.generator.generate_files())), 9)
+
+    def test_count_files_exclude_duplicates(self):
+        self.context.valid_paths = load_paths(["/", "/0", "/0/1"])
+        self.context.files = load_files(["abc", "abc.txt", "/abc/", "0/abc.txt", "0/1/abc"])
+        self.generator.file_suffixes = ["", ".txt"]
+
+        count = self.generator.count_files()
+        files = [file["url"] for file in self.generator.generate_files()]
+
+        self.assertEqual(count, 3 * 10)
+        self.assertEqual(len(files), len(set(files)))
+        self.assertLess(len(files), count)
+
+    def test_files_are_not_generated_again_from_a_directory_found_later(self):
+        self.context.valid_paths = load_paths(["/"])
+        self.context.files = load_files(["admin/config", "config"], no_suffix=True)
+
+        first = [file["url"] for file in self.generator.generate_files()]
+        self.context.valid_paths.extend(load_paths(["/admin", "/config"]))
+        second = [file["url"] for file in FileGenerator(self.context).generate_files(skip_root=True)]
+
+        self.assertEqual(first, ["/admin/config", "/config"])
+        self.assertEqual(sorted(second), ["/admin/admin/config", "/config/admin/config", "/config/config"])
+
+    def test_nested_files_are_not_generated_again_from_a_parent_found_later(self):
+        self.context.valid_paths = load_paths(["/", "/a/b"])
+        self.context.files = load_files(["b/config", "config"], no_suffix=True)
+
+        first = [file["url"] for file in self.generator.generate_files()]
+        self.context.valid_paths.extend(load_paths(["/a"]))
+        second = [file["url"] for file in FileGenerator(self.context).generate_files(skip_root=True)]
+
+        self.assertEqual(sorted(first), ["/a/b/b/config", "/a/b/config", "/b/config", "/config"])
+        self.assertEqual(second, ["/a/config"])
+
+    def test_valid_paths_are_joined_with_files_once(self):
+        self.context.valid_paths = load_paths(["/", "/0"])
+        self.context.files = load_files(["abc"], no_suffix=True)
+
+        first = [file["url"] for file in self.generator.generate_files()]
+        self.context.valid_paths.extend(load_paths(["/1", "/0/"]))
+        second = [file["url"] for file in FileGenerator(self.context).generate_files(skip_root=True)]
+
+        self.assertEqual(first, ["/abc", "/0/abc"])
+        self.assertEqual(second, ["/1/abc"])
+        self.assertEqual(len(self.context.file_directories), 3)
+
+    def test_generated_files_share_the_loaded_descriptor(self):
+        self.context.valid_paths = load_paths(["/", "/0"])
+        self.context.files = load_files(["/abc"])
+        self.generator.file_suffixes = [".txt", ".xml"]
+
+        files = list(self.generator.generate_files())
+
+        self.assertEqual(len(files), 4)
+        self.assertTrue(all(file.descriptor is self.context.files[0] for file in files))
+        self.assertEqual([0, 1, 0, 1], [file.suffix for file in files])
+
+    def test_generate_files_skip_files_already_generated(self):
+        self.context.valid_paths = load_paths(["/", "/0"])
+        self.context.files = load_files(["abc", "/abc/", "0/abc"], no_suffix=True)
+
+        files = list(self.generator.generate_files())
+
+        self.assertEqual(["/abc", "/0/abc", "/0/0/abc"], [file["url"] for file in files])
+        self.assertEqual((self.context.file_names.misses, self.context.file_names.hits), (2, 1))
+
+    def test_generate_files_yield_most_severe_files_first_on_every_path(self):
+        self.context.valid_paths = load_paths(["/", "/0"])
+        self.context.files = load_files(["readme", "backup"], no_suffix=True)
+        self.context.files[1]["severity"] = "critical"
+
+        files = list(self.generator.generate_files())
+
+        self.assertEqual(["/backup", "/0/backup", "/readme", "/0/readme"], [file["url"] for file in files])
+
 
 def load_paths(path_list):
     loaded_paths = []
@@ -1,19 +1,17 @@
+import gzip
+import json
+import tempfile
+import threading
+from os.path import join
 from unittest import TestCase
 from unittest.mock import MagicMock
 from fixtures import async_test
-from tachyon.har import StoreHAR, HammerTimeToHAR
+from tachyon.blobstore import BlobStore
+from tachyon.har import StoreHAR, HammerTimeToHAR, HARArchive
 from hammertime.http import Entry, StaticResponse
 from marshmallow_har import Header
 
 
-class Matcher:
-    def __init__(self, compare):
-        self.compare = compare
-
-    def __eq__(self, other):
-        return self.compare(other)
-
-
 class StoreHARTest(TestCase):
 
     def setUp(self):
@@ -24,11 +22,135 @@ class StoreHARTest(TestCase):
     async def test_request_without_response(self, loop):
         entry = Entry.create("http://example.com")
 
-        self.writer.return_value = "/tmp/abc.har"
+        self.writer.add.return_value = "/tmp/tachyon-0001.har#0"
         await self.rule.on_request_successful(entry)
 
-        self.assertEqual(entry.result.har_location, "/tmp/abc.har")
-        self.writer.assert_called_with(Matcher(lambda har: har.entries[0].request.url == "http://example.com"))
+        self.assertEqual(entry.result.har_location, "/tmp/tachyon-0001.har#0")
+        self.writer.add.assert_called_once_with(entry)
+
+
+class HARArchiveTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def read(self, locator, opener=open):
+        path, index = locator.split("#")
+        with opener(path, "rt") as fp:
+            return json.load(fp)["log"]["entries"][int(index)]
+
+    def test_entries_are_written_to_rotating_segments(self):
+        archive = HARArchive(self.directory.name, segment_size=2)
+        entries = [Entry.create("http://example.com/%d" % i,
+                                response=StaticResponse(code=200, content="body %d" % i, headers={}))
+                   for i in range(5)]
+
+        locators = [archive.add(entry) for entry in entries]
+        archive.close()
+
+        self.assertEqual(locators, [join(self.directory.name, name) for name in [
+            "tachyon-0001.har#0", "tachyon-0001.har#1", "tachyon-0002.har#0", "tachyon-0002.har#1",
+            "tachyon-0003.har#0"]])
+        for i, locator in enumerate(locators):
+            har_entry = self.read(locator)
+            self.assertEqual(har_entry["request"]["url"], "http://example.com/%d" % i)
+            self.assertEqual(har_entry["response"]["content"]["text"], "body %d" % i)
+        with open(join(self.directory.name, "tachyon-0001.har")) as fp:
+            document = fp.read()
+        self.assertEqual(json.loads(document)["log"]["creator"]["name"], "Tachyon")
+        self.assertNotIn("\n", document)
+
+    def test_redirect_chain_takes_one_har_entry_per_step(self):
+        archive = HARArchive(self.directory.name, segment_size=3)
+        redirected = Entry.create("http://example.com/a")
+        redirected.result.redirects = [Entry.create("http://example.com/a"), Entry.create("http://example.com/a/")]
+
+        locators = [archive.add(Entry.create("http://example.com/")), archive.add(redirected),
+                    archive.add(Entry.create("http://example.com/b"))]
+        archive.close()
+
+        self.assertEqual([locator.rpartition("/")[2] for locator in locators],
+                         ["tachyon-0001.har#0", "tachyon-0001.har#1", "tachyon-0002.har#0"])
+        self.assertEqual(self.read(locators[1])["request"]["url"], "http://example.com/a")
+
+    def test_compressed_segments(self):
+        archive = HARArchive(self.directory.name, compress=True)
+
+        locator = archive.add(Entry.create("http://example.com/"))
+        archive.close()
+
+        self.assertTrue(locator.endswith("tachyon-0001.har.gz#0"))
+        self.assertEqual(self.read(locator, opener=gzip.open)["request"]["url"], "http://example.com/")
+
+    def test_bodies_are_referenced_from_the_blob_store(self):
+        store = BlobStore(join(self.directory.name, "blobs"))
+        archive = HARArchive(self.directory.name, blob_store=store)
+        redirected = Entry.create("http://example.com/a")
+        redirected.result.redirects = [
+            Entry.create("http://example.com/a", response=StaticResponse(code=302, content="", headers={})),
+            Entry.create("http://example.com/a/", response=StaticResponse(code=200, content="login", headers={})),
+        ]
+
+        locators = [archive.add(redirected),
+                    archive.add(Entry.create("http://example.com/b",
+                                             response=StaticResponse(code=200, content="login", headers={})))]
+        archive.close()
+
+        content = self.read(locators[1])["response"]["content"]
+        self.assertEqual(content["text"], "")
+        self.assertEqual(content["size"], 5)
+        self.assertEqual(store.get(content["_blob"]), b"login")
+        self.assertEqual(self.read(locators[0].replace("#0", "#1"))["response"]["content"]["_blob"], content["_blob"])
+        self.assertEqual((store.stored, store.deduplicated), (2, 1))
+
+    def test_flush_waits_for_queued_entries(self):
+        archive = HARArchive(self.directory.name)
+        archive.add(Entry.create("http://example.com/"))
+
+        archive.flush()
+
+        self.assertEqual(archive.queue.unfinished_tasks, 0)
+        archive.close()
+        self.assertIsNone(archive.add(Entry.create("http://example.com/")))
+
+    def test_stalled_writer_applies_backpressure_and_keeps_every_entry(self):
+        archive = HARArchive(self.directory.name, queue_size=2)
+        converting = threading.Event()
+        released = threading.Event()
+        convert_entries = archive.converter.convert_entries
+
+        def stalled_convert_entries(entries, **kwargs):
+            converting.set()
+            released.wait(5)
+            return convert_entries(entries, **kwargs)
+
+        archive.converter.convert_entries = stalled_convert_entries
+        locators = [archive.add(Entry.create("http://example.com/0"))]
+        converting.wait(5)
+        producer = threading.Thread(target=lambda: locators.extend(
+            archive.add(Entry.create("http://example.com/%d" % i)) for i in range(1, 5)))
+        producer.start()
+        producer.join(0.2)
+
+        self.assertTrue(producer.is_alive())
+        released.set()
+        producer.join(5)
+        archive.close()
+        self.assertEqual([self.read(locator)["request"]["url"] for locator in locators],
+                         ["http://example.com/%d" % i for i in range(5)])
+
+    def test_failed_conversions_are_counted(self):
+        archive = HARArchive(self.directory.name)
+        archive.converter.convert_entries = MagicMock(side_effect=ValueError("unserializable"))
+
+        archive.add(Entry.create("http://example.com/0"))
+        archive.add(Entry.create("http://example.com/1"))
+        archive.close()
+
+        self.assertEqual(archive.failed, 2)
+        self.assertIsInstance(archive.last_error, ValueError)
+        self.assertFalse(archive.thread.is_alive())
 
 
 class HammerTimeToHARConversion(TestCase):
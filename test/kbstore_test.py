@@ -0,0 +1,182 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+
+import os
+import tempfile
+from collections import defaultdict
+from unittest import TestCase
+from unittest.mock import patch
+
+from fixtures import async_test
+from hammertime.kb import KnowledgeBase
+from hammertime.rules import DetectSoft404, DetectBehaviorChange
+from hammertime.ruleset import Heuristics
+
+from tachyon import config
+from tachyon.heuristics import RejectIgnoredQuery
+from tachyon.kbstore import KnowledgeBaseStore, fingerprint_matches, reset
+from tachyon.scancontext import ScanContext
+
+
+class TestKnowledgeBaseStore(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.store = KnowledgeBaseStore(self.directory.name, ttl=3600)
+        self.fingerprint = {"code": 404, "simhash": 0b1010}
+
+    def calibrated_kb(self):
+        kb = KnowledgeBase()
+        Heuristics(kb=kb).add_multiple([DetectSoft404(), RejectIgnoredQuery(), DetectBehaviorChange()])
+        kb.soft_404_responses["http://example.com/"]["/\\l"] = [{"code": 200, "content_simhash": 123}]
+        kb.query_samples["example.com/"] = {"md5": b"abc"}
+        kb.bad_behavior_response.add(456)
+        return kb
+
+    def test_saved_calibration_is_adopted_by_heuristics_of_next_scan(self):
+        self.store.save(self.calibrated_kb(), "http://example.com", fingerprint=self.fingerprint, now=1000)
+        kb = KnowledgeBase()
+        soft_404, query, behavior = DetectSoft404(), RejectIgnoredQuery(), DetectBehaviorChange()
+
+        stored = self.store.load("http://example.com", now=2000)
+        stored.populate(kb)
+        Heuristics(kb=kb).add_multiple([soft_404, query, behavior])
+
+        self.assertEqual(stored.fingerprint, self.fingerprint)
+        self.assertEqual(soft_404.soft_404_responses["http://example.com/"]["/\\l"],
+                         [{"code": 200, "content_simhash": 123}])
+        self.assertIsInstance(soft_404.soft_404_responses, defaultdict)
+        self.assertEqual(query.samples["example.com/"], {"md5": b"abc"})
+        self.assertEqual(query.samples.maxsize, 10000)
+        self.assertEqual(behavior.known_bad_behavior, {456})
+        self.assertIs(kb.query_samples, query.samples)
+
+    def test_only_calibration_entries_are_saved(self):
+        kb = self.calibrated_kb()
+        kb.timeout_manager = object()
+
+        self.store.save(kb, "http://example.com", fingerprint=self.fingerprint)
+
+        self.assertEqual(set(self.store.load("http://example.com").entries),
+                         {"soft_404_responses", "query_samples", "bad_behavior_response"})
+
+    def test_entries_are_kept_per_target_and_vhost(self):
+        self.store.save(self.calibrated_kb(), "http://example.com", vhost="a.example.com", fingerprint=self.fingerprint)
+
+        self.assertIsNone(self.store.load("http://example.com"))
+        self.assertIsNone(self.store.load("https://example.com", vhost="a.example.com"))
+        self.assertIsNotNone(self.store.load("http://example.com", vhost="a.example.com"))
+
+    def test_expired_entries_are_ignored(self):
+        self.store.save(self.calibrated_kb(), "http://example.com", fingerprint=self.fingerprint, now=1000)
+
+        self.assertIsNotNone(self.store.load("http://example.com", now=1000 + 3600))
+        self.assertIsNone(self.store.load("http://example.com", now=1000 + 3601))
+
+    def test_corrupted_file_is_ignored(self):
+        self.store.save(self.calibrated_kb(), "http://example.com", fingerprint=self.fingerprint)
+        with open(self.store.path("http://example.com"), "r+b") as fp:
+            fp.truncate(10)
+
+        self.assertIsNone(self.store.load("http://example.com"))
+
+    def test_save_leaves_no_temporary_file(self):
+        self.store.save(self.calibrated_kb(), "http://example.com", fingerprint=self.fingerprint)
+        self.store.save(self.calibrated_kb(), "http://example.com", fingerprint=self.fingerprint)
+
+        self.assertEqual(os.listdir(self.directory.name), [os.path.basename(self.store.path("http://example.com"))])
+
+    def test_reset_empties_entries_shared_with_heuristics(self):
+        kb = self.calibrated_kb()
+        query = RejectIgnoredQuery()
+        query.load_kb(kb)
+
+        reset(kb)
+
+        self.assertEqual(len(kb.soft_404_responses), 0)
+        self.assertEqual(len(query.samples), 0)
+        self.assertEqual(kb.bad_behavior_response, set())
+
+
+class TestFingerprintMatches(TestCase):
+
+    def test_same_code_and_close_simhash_match(self):
+        self.assertTrue(fingerprint_matches({"code": 200, "simhash": 0b111111}, {"code": 200, "simhash": 0}))
+        self.assertTrue(fingerprint_matches({"code": 404, "simhash": None}, {"code": 404, "simhash": None}))
+
+    def test_changed_response_does_not_match(self):
+        self.assertFalse(fingerprint_matches({"code": 200, "simhash": 0b1111111}, {"code": 200, "simhash": 0}))
+        self.assertFalse(fingerprint_matches({"code": 200, "simhash": 0}, {"code": 404, "simhash": 0}))
+        self.assertFalse(fingerprint_matches({"code": 200, "simhash": 0}, {"code": 200, "simhash": None}))
+        self.assertFalse(fingerprint_matches({"code": 200, "simhash": 0}, None))
+        self.assertFalse(fingerprint_matches(None, {"code": 200, "simhash": 0}))
+
+
+class TestConfigureHammertimeWithStore(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.store = KnowledgeBaseStore(self.directory.name)
+        self.context = ScanContext("http://example.com")
+        self.fingerprint = {"code": 404, "simhash": 0}
+
+    async def scan(self, fingerprint, calibrate=None):
+        async def probe_fingerprint(hammertime, context):
+            return fingerprint
+        with patch("tachyon.config.probe_fingerprint", probe_fingerprint):
+            async with config.configure_hammertime(self.context, kb_store=self.store) as hammertime:
+                if calibrate is not None:
+                    calibrate(hammertime.kb)
+                return hammertime.kb
+
+    @async_test()
+    async def test_calibration_is_saved_and_reused_while_host_answers_the_same(self):
+        def calibrate(kb):
+            kb.query_samples["example.com/"] = {"md5": b"abc"}
+            kb.bad_behavior_response.add(123)
+
+        await self.scan(self.fingerprint, calibrate)
+        kb = await self.scan(self.fingerprint)
+
+        self.assertEqual(kb.query_samples["example.com/"], {"md5": b"abc"})
+        self.assertEqual(kb.bad_behavior_response, {123})
+
+    @async_test()
+    async def test_calibration_is_discarded_when_host_answers_differently(self):
+        self.store.save(self.calibrated_kb(), "http://example.com", fingerprint=self.fingerprint)
+
+        kb = await self.scan({"code": 200, "simhash": 0})
+
+        self.assertEqual(len(kb.query_samples), 0)
+        self.assertEqual(len(kb.soft_404_responses), 0)
+
+    @async_test()
+    async def test_nothing_is_saved_when_probe_fails(self):
+        await self.scan(None)
+
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def calibrated_kb(self):
+        kb = KnowledgeBase()
+        Heuristics(kb=kb).add_multiple([DetectSoft404(), RejectIgnoredQuery()])
+        kb.soft_404_responses["http://example.com/"]["/\\l"] = None
+        kb.query_samples["example.com/"] = {"md5": b"abc"}
+        return kb
@@ -19,11 +19,13 @@
 
 import binascii
 from unittest import TestCase
+from unittest.mock import patch
 
 from fixtures import async_test, create_json_data
 from hammertime.http import Entry, StaticResponse
 
 from tachyon.heuristics import MatchString
+from tachyon.heuristics.matchstring import Signature
 
 
 class TestMatchString(TestCase):
@@ -95,3 +97,66 @@ class TestMatchString(TestCase):
         await match_string.after_response(entry)
 
         self.assertTrue(entry.result.string_match)
+
+    @async_test()
+    async def test_match_any_of_multiple_patterns(self):
+        match_string = MatchString()
+
+        for content, expected in [("c99shell v1", True), ("r57 Shell", True), ("\x01\x02", True), ("nothing", False)]:
+            file_to_fetch = create_json_data(["file"], match_string=["c99shell", "r57 Shell"], match_bytes=["0102"])[0]
+            response = StaticResponse(200, {}, content=content)
+            entry = Entry.create("http://example.com/file", arguments={"file": file_to_fetch}, response=response)
+
+            await match_string.after_response(entry)
+
+            self.assertEqual(entry.result.string_match, expected, content)
+
+    @async_test()
+    async def test_match_regex(self):
+        file_to_fetch = create_json_data(["file"], match_regex=r"DB_PASS(WORD)?\s*=")[0]
+        match_string = MatchString()
+        response = StaticResponse(200, {}, content="define DB_PASSWORD = 'secret';")
+        entry = Entry.create("http://example.com/file", arguments={"file": file_to_fetch}, response=response)
+
+        await match_string.after_response(entry)
+
+        self.assertTrue(entry.result.string_match)
+
+    @async_test()
+    async def test_regex_with_inline_flags_combined_with_other_patterns(self):
+        file_to_fetch = create_json_data(["file"], match_string="abc", match_regex="(?i)index of /")[0]
+        match_string = MatchString()
+        response = StaticResponse(200, {}, content="<title>Index Of /backup</title>")
+        entry = Entry.create("http://example.com/file", arguments={"file": file_to_fetch}, response=response)
+
+        await match_string.after_response(entry)
+
+        self.assertTrue(entry.result.string_match)
+
+    @async_test()
+    async def test_scan_bounded_by_match_limit_or_max_scan_bytes(self):
+        content = "x" * 100 + "abc123"
+        for arguments, max_scan_bytes, expected in [({"match_limit": 50}, None, False),
+                                                    ({"match_limit": 200}, 50, True),
+                                                    ({}, 50, False),
+                                                    ({"match_regex": "abc"}, 50, False),
+                                                    ({}, None, True)]:
+            file_to_fetch = create_json_data(["file"], match_string="abc123", **arguments)[0]
+            match_string = MatchString(max_scan_bytes=max_scan_bytes)
+            response = StaticResponse(200, {}, content=content)
+            entry = Entry.create("http://example.com/file", arguments={"file": file_to_fetch}, response=response)
+
+            await match_string.after_response(entry)
+
+            self.assertEqual(entry.result.string_match, expected, arguments)
+
+    def test_signatures_are_compiled_once(self):
+        match_string = MatchString()
+        files = create_json_data(["file1", "file2"], match_string=["c99shell", "r57shell"])
+
+        with patch("tachyon.heuristics.matchstring.Signature.from_descriptor",
+                   wraps=Signature.from_descriptor) as from_descriptor:
+            signatures = {id(match_string.get_signature(file)) for file in files * 10}
+
+        self.assertEqual(len(signatures), 1)
+        from_descriptor.assert_called_once_with(files[0])
@@ -17,13 +17,15 @@
 # Place, Suite 330, Boston, MA  02111-1307  USA
 
 
+import io
 import json
+import threading
 from unittest import TestCase
 from unittest.mock import MagicMock, patch, call
 
 from freezegun import freeze_time
 
-from tachyon.output import JSONOutput, PrettyOutput, __version__
+from tachyon.output import JSONOutput, NDJSONOutput, OutputWriter, PrettyOutput, __version__
 
 
 class TestJSONOutput(TestCase):
@@ -82,6 +84,48 @@ class TestJSONOutput(TestCase):
         self.assertEqual(json.loads(actual), expected)
 
 
+class TestNDJSONOutput(TestCase):
+
+    def setUp(self):
+        self.output = NDJSONOutput()
+        self.output.output_raw_message = MagicMock()
+
+    def lines(self):
+        return [json.loads(args[0]) for args, kwargs in self.output.output_raw_message.call_args_list]
+
+    @freeze_time("2018-04-11 12:00:00")
+    def test_records_are_written_as_they_are_produced(self):
+        url = "http://example.com/y"
+        self.output.output_info("information...")
+        self.output.output_result("File x found at " + url, data={"url": url, "code": 200})
+
+        self.assertEqual(self.lines(), [
+            {"type": "info", "text": "information...", "time": "12:00:00"},
+            {"type": "found", "text": "File x found at " + url, "time": "12:00:00", "url": url, "code": 200},
+        ])
+        self.assertEqual(self.output.buffer, [])
+
+    def test_close_writes_summary_record_once(self):
+        self.output.output_info("information...")
+        self.output.output_result("found")
+        self.output.output_result("found")
+
+        self.output.close()
+        self.output.close()
+
+        self.assertEqual(self.lines()[3:], [{"type": "summary", "counts": {"info": 1, "found": 2},
+                                             "version": __version__, "from": "delvelabs/tachyon"}])
+
+    def test_records_output_after_flush_come_before_summary(self):
+        self.output.output_info("information...")
+        self.output.flush()
+        self.output.output_error("Keyboard Interrupt Received")
+        self.output.close()
+
+        self.assertEqual([line["type"] for line in self.lines()], ["info", "error", "summary"])
+        self.assertEqual(self.lines()[-1]["counts"], {"info": 1, "error": 1})
+
+
 @freeze_time("2018-04-11 12:00:00")
 class TestPrettyOutput(TestCase):
 
@@ -123,3 +167,90 @@ class TestPrettyOutput(TestCase):
         self.output.flush()
 
         click.echo.assert_has_calls([call("[12:00:00] [FOUND] %s" % found0), call("[12:00:00] [FOUND] %s" % found1)])
+
+
+class BlockingStream(io.StringIO):
+
+    def __init__(self):
+        super().__init__()
+        self.released = threading.Event()
+
+    def write(self, text):
+        self.released.wait(timeout=5)
+        return super().write(text)
+
+
+class TestOutputWriter(TestCase):
+
+    def test_lines_are_written_in_order_in_batches(self):
+        stream = BlockingStream()
+        writer = OutputWriter(stream=stream, batch_size=10)
+
+        for i in range(25):
+            writer.write("line %d" % i)
+        stream.released.set()
+        writer.flush()
+
+        self.assertEqual(stream.getvalue().splitlines(), ["line %d" % i for i in range(25)])
+        self.assertEqual(writer.lines, 25)
+        self.assertLess(writer.writes, 25)
+        writer.close()
+
+    def test_queue_depth_is_exposed_while_stream_is_slow(self):
+        stream = BlockingStream()
+        writer = OutputWriter(stream=stream, batch_size=1)
+
+        for i in range(5):
+            writer.write("line %d" % i)
+
+        self.assertGreaterEqual(writer.depth, 4)
+        self.assertGreaterEqual(writer.max_depth, 4)
+        stream.released.set()
+        writer.close()
+        self.assertEqual(writer.depth, 0)
+
+    def test_stalled_stream_never_loses_results(self):
+        stream = BlockingStream()
+        output = PrettyOutput()
+        output.writer = OutputWriter(stream=stream, maxsize=3, batch_size=1)
+
+        def produce():
+            for i in range(10):
+                output.output_info("progress %d" % i)
+                output.output_result("found %d" % i)
+
+        producer = threading.Thread(target=produce)
+        producer.start()
+        producer.join(timeout=0.2)
+        self.assertTrue(producer.is_alive())  # Held back by the stalled stream rather than dropping results
+
+        stream.released.set()
+        producer.join(timeout=5)
+        output.writer.close()
+        lines = stream.getvalue().splitlines()
+        self.assertEqual([line.partition("[FOUND] ")[2] for line in lines if "[FOUND]" in line],
+                         ["found %d" % i for i in range(10)])
+        self.assertEqual(len([line for line in lines if "[INFO]" in line]) + output.writer.dropped, 10)
+
+    def test_close_writes_queued_lines_and_later_lines_go_straight_to_stream(self):
+        stream = io.StringIO()
+        writer = OutputWriter(stream=stream)
+        writer.write("queued")
+
+        writer.close()
+        writer.write("after close")
+
+        self.assertEqual(stream.getvalue(), "queued\nafter close\n")
+        self.assertFalse(writer.thread.is_alive())
+
+    def test_output_manager_writes_through_its_writer(self):
+        stream = io.StringIO()
+        output = PrettyOutput()
+        output.writer = OutputWriter(stream=stream)
+
+        with freeze_time("2018-04-11 12:00:00"):
+            output.output_info("information...")
+        output.flush()
+
+        self.assertEqual(stream.getvalue(), "[12:00:00] [INFO] information...\n")
+        output.writer.close()
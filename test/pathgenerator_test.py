@@ -18,32 +18,30 @@
 
 
 from unittest import TestCase
+from unittest.mock import patch
 
-from tachyon import database
 from tachyon.generator import PathGenerator
+from tachyon.scancontext import ScanContext
 
 
 class TestPathGenerator(TestCase):
 
     def setUp(self):
-        database.files = []
-        database.paths = []
-        database.valid_paths = []
-        database.path_cache.clear()
+        self.context = ScanContext()
 
     def test_generate_paths_return_paths_from_loaded_file_if_not_using_valid_paths(self):
-        database.paths = self.load_paths(["/", "/0", "/1", "/2", "/3", "/4"])
-        generator = PathGenerator()
+        self.context.paths = self.load_paths(["/", "/0", "/1", "/2", "/3", "/4"])
+        generator = PathGenerator(self.context)
 
         paths = generator.generate_paths(use_valid_paths=False)
 
-        self.assertEqual(paths, database.paths)
+        self.assertEqual(paths, self.context.paths)
 
     def test_generate_paths_add_files_with_no_suffixes_to_loaded_paths_if_not_using_valid_paths(self):
-        database.paths = self.load_paths(["/", "/0", "/1", "/2"])
-        database.files = self.load_files(["file0", "file1", "file2"], no_suffix=False)
-        database.files.extend(self.load_files(["index.html", "phpinfo.php"], no_suffix=True))
-        generator = PathGenerator()
+        self.context.paths = self.load_paths(["/", "/0", "/1", "/2"])
+        self.context.files = self.load_files(["file0", "file1", "file2"], no_suffix=False)
+        self.context.files.extend(self.load_files(["index.html", "phpinfo.php"], no_suffix=True))
+        generator = PathGenerator(self.context)
 
         paths = generator.generate_paths(use_valid_paths=False)
 
@@ -55,13 +53,13 @@ class TestPathGenerator(TestCase):
 
     def test_generate_paths_append_loaded_paths_to_valid_paths_if_depth_is_one(self):
         paths = ["/", "/0", "/1", "/2", "/3", "/4"]
-        database.paths = self.load_paths(paths)
-        database.valid_paths = database.paths[:4]
-        generator = PathGenerator()
+        self.context.paths = self.load_paths(paths)
+        self.context.valid_paths = self.context.paths[:4]
+        generator = PathGenerator(self.context)
 
         generated_paths = generator.generate_paths(use_valid_paths=True)
 
-        valid_paths = set(path["url"] for path in database.valid_paths)
+        valid_paths = set(path["url"] for path in self.context.valid_paths)
         expected_paths = set()
         for path in valid_paths:
             if path != "/":
@@ -70,13 +68,13 @@ class TestPathGenerator(TestCase):
 
     def test_generate_paths_from_valid_paths_does_not_return_same_path_twice(self):
         paths = ["/0", "/1"]
-        database.paths = self.load_paths(paths)
-        generator = PathGenerator()
+        self.context.paths = self.load_paths(paths)
+        generator = PathGenerator(self.context)
 
         generated_paths = generator.generate_paths(use_valid_paths=False)
-        database.valid_paths.extend(generated_paths)
+        self.context.valid_paths.extend(generated_paths)
         generated_paths.extend(generator.generate_paths(use_valid_paths=True))
-        database.valid_paths.extend(generated_paths)
+        self.context.valid_paths.extend(generated_paths)
         generated_paths.extend(generator.generate_paths(use_valid_paths=True))
 
         expected_paths = {"/0", "/1", "/0/0", "/0/1", "/1/0", "/1/1"}
@@ -89,6 +87,43 @@ class TestPathGenerator(TestCase):
         self.assertTrue(all(path["url"] in expected_paths for path in generated_paths))
         self.assertFalse(any(path["url"] not in expected_paths for path in generated_paths))
 
+    def test_generate_paths_from_valid_paths_only_expand_paths_found_since_last_call(self):
+        self.context.paths = self.load_paths(["/0", "/1"])
+        self.context.valid_paths = self.load_paths(["/", "/a"])
+        generator = PathGenerator(self.context)
+
+        first_level = generator.generate_paths(use_valid_paths=True)
+        self.context.valid_paths.extend(self.load_paths(["/b"]))
+        with patch.object(generator, "_join_paths", wraps=generator._join_paths) as join_paths:
+            second_level = generator.generate_paths(use_valid_paths=True)
+
+        self.assertEqual({"/a/0", "/a/1"}, {path["url"] for path in first_level})
+        self.assertEqual({"/b/0", "/b/1"}, {path["url"] for path in second_level})
+        self.assertEqual(join_paths.call_count, 2)
+
+    def test_generate_paths_from_valid_paths_record_level_stats(self):
+        self.context.paths = self.load_paths(["/0", "/1", "/2"])
+        self.context.valid_paths = self.load_paths(["/", "/a", "/b"])
+        generator = PathGenerator(self.context)
+
+        generator.generate_paths(use_valid_paths=True, depth=3)
+        generator.generate_paths(use_valid_paths=True, depth=4)
+
+        self.assertEqual([(3, 3, 6), (4, 0, 0)],
+                         [(stats.depth, stats.directories, stats.generated) for stats in generator.level_stats])
+
+    def test_generate_paths_from_pre_crawled_paths_is_not_a_recursion_level(self):
+        self.context.paths = self.load_paths(["/0"])
+        self.context.valid_paths = self.load_paths(["/", "/a"])
+        generator = PathGenerator(self.context)
+
+        generator.generate_paths(use_valid_paths=True)
+        self.context.valid_paths.extend(self.load_paths(["/b"]))
+        generator.generate_paths(use_valid_paths=True, depth=1)
+
+        self.assertEqual([(1, 1, 1)],
+                         [(stats.depth, stats.directories, stats.generated) for stats in generator.level_stats])
+
     def load_paths(self, path_list):
         loaded_paths = []
         for path in path_list:
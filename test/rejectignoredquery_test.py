@@ -17,6 +17,7 @@
 # Place, Suite 330, Boston, MA  02111-1307  USA
 
 
+import asyncio
 import hashlib
 from unittest import TestCase
 from unittest.mock import patch, MagicMock
@@ -143,6 +144,56 @@ class TestRejectIgnoredQuery(TestCase):
 
             hashlib.md5.assert_not_called()
 
+    @async_test()
+    async def test_concurrent_responses_on_same_path_share_a_single_probe(self):
+        self.filter.set_engine(SlowEngine(StaticResponse(200, {}, "sample")))
+        entries = [Entry.create("http://example.com/?q=%d" % i, response=StaticResponse(200, {}, "123"))
+                   for i in range(5)]
+
+        with patch("tachyon.heuristics.rejectignoredquery.Simhash", FakeSimhash):
+            await asyncio.gather(*(self.filter.after_response(entry) for entry in entries))
+
+        self.assertEqual(self.filter.engine.calls, 1)
+        self.assertEqual(self.filter.pending, {})
+
+    @async_test()
+    async def test_failed_probe_is_reported_to_every_waiter_and_retried_later(self):
+        self.filter.set_engine(SlowEngine(ValueError("probe failed")))
+        entries = [Entry.create("http://example.com/?q=%d" % i, response=StaticResponse(200, {}, "123"))
+                   for i in range(3)]
+
+        results = await asyncio.gather(*(self.filter.after_response(entry) for entry in entries),
+                                       return_exceptions=True)
+
+        self.assertEqual([type(result) for result in results], [ValueError] * 3)
+        self.assertEqual(self.filter.engine.calls, 1)
+        self.assertNotIn("example.com/", self.kb.query_samples)
+        self.assertEqual(self.filter.pending, {})
+
+    @async_test()
+    async def test_sample_simhash_is_created_once(self):
+        self.kb.query_samples["example.com/"] = {"simhash": "sample value"}
+
+        with patch("tachyon.heuristics.rejectignoredquery.Simhash", MagicMock(wraps=FakeSimhash)) as simhash:
+            for content in ("one", "two", "three"):
+                await self.filter.after_response(Entry.create("http://example.com/?wsdl",
+                                                              response=StaticResponse(200, {}, content)))
+
+            sample_calls = [c for c in simhash.call_args_list if c[0][0] == "sample value"]
+            self.assertEqual(len(sample_calls), 1)
+
+    def test_samples_keep_only_the_most_recently_used_paths(self):
+        self.filter = RejectIgnoredQuery(max_samples=2)
+        self.kb = KnowledgeBase()
+        self.filter.set_kb(self.kb)
+
+        self.kb.query_samples["example.com/a"] = {"md5": b"a"}
+        self.kb.query_samples["example.com/b"] = {"md5": b"b"}
+        self.kb.query_samples["example.com/a"]
+        self.kb.query_samples["example.com/c"] = {"md5": b"c"}
+
+        self.assertEqual(list(self.kb.query_samples), ["example.com/a", "example.com/c"])
+
     def hash(self, response):
         return {"simhash": FakeSimhash(response.content).value}
 
@@ -154,3 +205,18 @@ class FakeSimhash:
 
     def distance(self, *args):
         return 999
+
+
+class SlowEngine:
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    async def perform_high_priority(self, entry, heuristics):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if isinstance(self.result, Exception):
+            raise self.result
+        entry.response = self.result
+        return entry
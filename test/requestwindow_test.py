@@ -0,0 +1,134 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+
+import asyncio
+from unittest import TestCase
+
+from fixtures import async_test, FakeHammerTimeEngine, RaiseForPaths
+from hammertime.core import HammerTime
+from hammertime.ruleset import RejectRequest
+
+from tachyon.requestwindow import RequestWindow
+
+
+class TestRequestWindow(TestCase):
+
+    def async_setup(self, loop):
+        self.hammertime = HammerTime(loop=loop, request_engine=FakeHammerTimeEngine())
+        self.hammertime.collect_successful_requests()
+        self.in_flight = CountInFlight()
+        self.hammertime.heuristics.add(self.in_flight)
+
+    @async_test()
+    async def test_submit_only_consume_candidates_up_to_window_size(self, loop):
+        self.async_setup(loop)
+        consumed = []
+        window = RequestWindow(self.hammertime, 3)
+
+        window.submit(self.requests(range(10), consumed))
+
+        self.assertEqual(consumed, [0, 1, 2])
+        self.assertEqual(window.in_flight, 3)
+        await self.drain(window)
+
+    @async_test()
+    async def test_successful_requests_return_all_entries_without_exceeding_window(self, loop):
+        self.async_setup(loop)
+        window = RequestWindow(self.hammertime, 4)
+
+        window.submit(self.requests(range(50)))
+        urls = await self.drain(window)
+
+        self.assertEqual(len(urls), 50)
+        self.assertEqual(self.in_flight.maximum, 4)
+        self.assertEqual(window.in_flight, 0)
+
+    @async_test()
+    async def test_failed_requests_make_room_for_next_candidates(self, loop):
+        self.async_setup(loop)
+        rejected = ["/%d" % i for i in range(0, 50, 2)]
+        self.hammertime.heuristics.add(RaiseForPaths(rejected, RejectRequest("Invalid path")))
+        window = RequestWindow(self.hammertime, 2)
+
+        window.submit(self.requests(range(50)))
+        urls = await self.drain(window)
+
+        self.assertEqual(len(urls), 25)
+
+    @async_test()
+    async def test_on_failure_receives_arguments_of_failed_requests(self, loop):
+        self.async_setup(loop)
+        self.hammertime.heuristics.add(RaiseForPaths(["/1", "/3"], RejectRequest("Invalid path")))
+        failures = []
+        window = RequestWindow(self.hammertime, 2, on_failure=lambda arguments, error: failures.append(arguments))
+
+        window.submit(("http://example.com/%d" % i, {"number": i}) for i in range(5))
+        await self.drain(window)
+
+        self.assertEqual(sorted(failure["number"] for failure in failures), [1, 3])
+
+    @async_test()
+    async def test_close_drop_pending_candidates(self, loop):
+        self.async_setup(loop)
+        consumed = []
+        window = RequestWindow(self.hammertime, 2)
+
+        window.submit(self.requests(range(10), consumed))
+        window.close()
+        urls = await self.drain(window)
+
+        self.assertEqual(len(urls), 2)
+        self.assertEqual(consumed, [0, 1])
+
+    @async_test()
+    async def test_no_limit_if_size_is_zero(self, loop):
+        self.async_setup(loop)
+        consumed = []
+        window = RequestWindow(self.hammertime, 0)
+
+        window.submit(self.requests(range(10), consumed))
+
+        self.assertEqual(len(consumed), 10)
+        await self.drain(window)
+
+    @staticmethod
+    def requests(numbers, consumed=None):
+        for i in numbers:
+            if consumed is not None:
+                consumed.append(i)
+            yield "http://example.com/%d" % i, {}
+
+    @staticmethod
+    async def drain(window):
+        return [entry.request.url async for entry in window.successful_requests()]
+
+
+class CountInFlight:
+
+    def __init__(self):
+        self.current = 0
+        self.maximum = 0
+
+    async def before_request(self, entry):
+        self.current += 1
+        self.maximum = max(self.maximum, self.current)
+        await asyncio.sleep(0)
+
+    async def after_response(self, entry):
+        self.current -= 1
@@ -1,7 +1,10 @@
+import asyncio
+
 from fixtures import async_test
 from unittest import TestCase
 from unittest.mock import MagicMock
-from tachyon.result import ResultAccumulator
+from tachyon.candidate import Candidate
+from tachyon.result import ResultAccumulator, Record
 from hammertime.http import Entry, StaticResponse
 
 
@@ -184,6 +187,94 @@ class ResultAccumulatorTest(TestCase):
                 "har": "/tmp/output/abc.har",
             })
 
+    def test_keep_compact_record_instead_of_entry(self):
+        entry = self._simple("backup", "http://example.com/backup.zip", har="/tmp/output/abc.har")
+        entry.response.content = "x" * 100000
+        entry.result.error_simhash = 1234
+
+        acc = ResultAccumulator(output_manager=MagicMock())
+        acc.add_entry(entry)
+
+        record, = acc.candidates
+        self.assertIsInstance(record, Record)
+        self.assertIs(record.arguments, entry.arguments)
+        self.assertEqual((record.url, record.code, record.simhash, record.har),
+                         ("http://example.com/backup.zip", 200, 1234, "/tmp/output/abc.har"))
+
+    @async_test()
+    async def test_revalidation_requests_a_fresh_entry_from_the_record(self, loop):
+        entry = self._simple("backup", "http://example.com/backup.zip")
+        entry.result.error_simhash = 1234
+        validator = NoRevalidate(accept=True)
+
+        acc = ResultAccumulator(output_manager=MagicMock())
+        acc.add_entry(entry)
+        await acc.revalidate(validator)
+
+        revalidated, = validator.entries
+        self.assertEqual(revalidated.request.url, "http://example.com/backup.zip")
+        self.assertEqual(revalidated.arguments, entry.arguments)
+        self.assertEqual(revalidated.result.error_simhash, 1234)
+        self.assertIsNone(revalidated.response)
+
+    @async_test()
+    async def test_records_spilled_past_threshold_are_revalidated_in_order(self, loop):
+        manager = MagicMock()
+        validator = NoRevalidate(accept=True)
+        descriptor = {"description": "backup", "severity": "critical"}
+
+        acc = ResultAccumulator(output_manager=manager, spill_threshold=2)
+        for i in range(5):
+            entry = self._simple("backup", "http://example.com/backup%d.zip" % i)
+            entry.arguments = {"file": Candidate("backup%d.zip" % i, descriptor)}
+            acc.add_entry(entry)
+        await acc.revalidate(validator)
+
+        self.assertEqual(len(acc.candidates), 5)
+        self.assertEqual(len(acc.candidates.records), 2)
+        self.assertEqual([entry.request.url for entry in validator.entries],
+                         ["http://example.com/backup%d.zip" % i for i in range(5)])
+        self.assertEqual(validator.entries[0].arguments["file"].to_dict(),
+                         {"url": "backup0.zip", "description": "backup", "severity": "critical"})
+        manager.output_result.assert_called_with("backup at: http://example.com/backup4.zip (Confirmed)", data={
+            "url": "http://example.com/backup4.zip",
+            "description": "backup",
+            "code": 200,
+            "severity": "critical",
+            "confirmed": True,
+        })
+
+    @async_test()
+    async def test_revalidation_runs_concurrently_and_outputs_in_found_order(self, loop):
+        manager = MagicMock()
+        validator = SlowRevalidate(delays=[0.03, 0.02, 0.01, 0], reject=["http://example.com/1"])
+
+        acc = ResultAccumulator(output_manager=manager)
+        for i in range(4):
+            acc.add_entry(self._simple("file %d" % i, "http://example.com/%d" % i))
+        manager.reset_mock()
+        await acc.revalidate(validator, concurrency=4)
+
+        self.assertEqual(validator.max_in_flight, 4)
+        self.assertEqual(validator.completed, ["http://example.com/%d" % i for i in (3, 2, 1, 0)])
+        self.assertEqual([call[0][0] for call in manager.output_result.call_args_list], [
+            "file 0 at: http://example.com/0 (Confirmed)",
+            "file 2 at: http://example.com/2 (Confirmed)",
+            "file 3 at: http://example.com/3 (Confirmed)",
+        ])
+
+    @async_test()
+    async def test_revalidation_bounds_concurrency(self, loop):
+        validator = SlowRevalidate(delays=[0.001] * 20)
+
+        acc = ResultAccumulator(output_manager=MagicMock())
+        for i in range(20):
+            acc.add_entry(self._simple("file", "http://example.com/%d" % i))
+        await acc.revalidate(validator, concurrency=3)
+
+        self.assertEqual(validator.max_in_flight, 3)
+        self.assertEqual(len(validator.completed), 20)
+
     @staticmethod
     def _simple(description, url, har=None):
         entry = Entry.create(url=url,
@@ -202,6 +293,26 @@ class NoRevalidate:
 
     def __init__(self, accept):
         self.accept = accept
+        self.entries = []
 
     async def is_valid(self, entry):
+        self.entries.append(entry)
         return self.accept
+
+
+class SlowRevalidate:
+
+    def __init__(self, delays, reject=()):
+        self.delays = list(delays)
+        self.reject = reject
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.completed = []
+
+    async def is_valid(self, entry):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delays.pop(0))
+        self.in_flight -= 1
+        self.completed.append(entry.request.url)
+        return entry.request.url not in self.reject
@@ -0,0 +1,56 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+
+from unittest import TestCase
+from urllib.parse import urlparse
+
+from tachyon.checkpoint import Checkpoint
+from tachyon.scancontext import ScanContext
+
+
+class TestScanContext(TestCase):
+
+    def test_from_url_sets_base_url_and_target_host(self):
+        context = ScanContext.from_url(urlparse("https://example.com:8443/ignored/path"))
+
+        self.assertEqual(context.base_url, "https://example.com:8443")
+        self.assertEqual(context.target_host, "example.com:8443")
+
+    def test_target_host_defaults_to_host_of_base_url(self):
+        self.assertEqual(ScanContext("http://example.com/").target_host, "example.com")
+
+    def test_contexts_do_not_share_state(self):
+        context = ScanContext("http://a.example.com")
+        other = ScanContext("http://b.example.com")
+
+        context.valid_paths.append({"url": "/admin"})
+        context.path_cache.add("/admin")
+        context.plugin_settings["Svn"].append("concurrency=20")
+
+        self.assertEqual(other.valid_paths, [])
+        self.assertNotIn("/admin", other.path_cache)
+        self.assertEqual(other.plugin_settings["Svn"], [])
+        self.assertIsNot(context.checkpoint, other.checkpoint)
+
+    def test_without_checkpoint_nothing_is_recorded(self):
+        context = ScanContext("http://example.com")
+        context.checkpoint.add_done("path", "/admin")
+
+        self.assertIsInstance(context.checkpoint, Checkpoint)
+        self.assertFalse(context.checkpoint.is_done("path", "/admin"))
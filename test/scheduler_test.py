@@ -0,0 +1,58 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from tachyon.scheduler import prioritize, severity_rank
+
+
+class TestScheduler(TestCase):
+
+    def test_severity_rank_treat_missing_and_unknown_severities_as_warning(self):
+        self.assertLess(severity_rank({"severity": "critical"}), severity_rank({"severity": "warning"}))
+        self.assertLess(severity_rank({"severity": "warning"}), severity_rank({"severity": "info"}))
+        self.assertEqual(severity_rank({}), severity_rank({"severity": "warning"}))
+        self.assertEqual(severity_rank({"severity": "unknown"}), severity_rank({"severity": "warning"}))
+
+    def test_prioritize_order_by_severity(self):
+        descriptors = [descriptor("a", "info"), descriptor("b", "critical"), descriptor("c", "warning"),
+                       descriptor("d", "medium"), descriptor("e", "critical")]
+
+        ordered = prioritize(descriptors)
+
+        self.assertEqual(["b", "e", "d", "c", "a"], [d["url"] for d in ordered])
+
+    def test_prioritize_keep_sections_together_in_original_order(self):
+        logs = [descriptor("log1", "critical", "Log file"), descriptor("log2", "info", "Log file"),
+                descriptor("log3", "critical", "Old log file")]
+        keys = [descriptor("key", "critical", "Log file"), descriptor("other", "info")]
+
+        ordered = prioritize(logs + keys)
+
+        self.assertEqual(["log1", "log3", "key", "log2", "other"], [d["url"] for d in ordered])
+
+    def test_prioritize_use_order_of_collections_that_know_it(self):
+        wordlist = MagicMock()
+
+        self.assertIs(prioritize(wordlist), wordlist.in_priority_order.return_value)
+
+
+def descriptor(url, severity, description=None):
+    return {"url": url, "severity": severity, "description": description or "description of %s" % url}
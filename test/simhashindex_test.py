@@ -0,0 +1,82 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+
+import random
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy
+
+from tachyon.simhashindex import SimhashIndex, popcount
+
+
+class TestSimhashIndex(TestCase):
+
+    def test_near_matches_pairwise_hamming_distance(self):
+        generator = random.Random(42)
+        known = [generator.getrandbits(64) for _ in range(200)]
+        # Values a few bits away from known ones, and unrelated ones
+        candidates = [value ^ (1 << generator.randrange(64)) ^ (1 << generator.randrange(64)) for value in known[:50]]
+        candidates += [value ^ 0b11111 for value in known[50:60]]
+        candidates += [generator.getrandbits(64) for _ in range(50)]
+        index = SimhashIndex(known, threshold=5)
+
+        for value in candidates:
+            expected = any(bin(value ^ k).count("1") < 5 for k in known)
+            self.assertEqual(index.near(value), expected)
+
+    def test_empty_index_matches_nothing(self):
+        self.assertFalse(SimhashIndex().near(0))
+
+    def test_sync_only_rebuilds_when_source_grew(self):
+        known = {0b1111 << 60}
+        index = SimhashIndex()
+
+        index.sync(known)
+        values = index.values
+        index.sync(known)
+        self.assertIs(index.values, values)
+
+        known.add(0b1010)
+        index.sync(known)
+        self.assertEqual(len(index), 2)
+        self.assertTrue(index.near(0b1011))
+
+    def test_popcount_without_bitwise_count(self):
+        values = numpy.array([0, 1, 0xffffffffffffffff, 0b1011 << 40], dtype=numpy.uint64)
+
+        with patch("tachyon.simhashindex.numpy", SimpleNamespace(uint8=numpy.uint8, unpackbits=numpy.unpackbits)):
+            self.assertEqual(list(popcount(values)), [0, 1, 64, 3])
+
+    def test_without_numpy(self):
+        known = [0b1111 << 60, 0b1010, 0xffffffffffffffff]
+
+        with patch("tachyon.simhashindex.numpy", None):
+            index = SimhashIndex(known[:2], threshold=5)
+            index.update(known[1:])
+            self.assertEqual(len(index), 3)
+            self.assertTrue(index.near(0b1011))
+            self.assertTrue(index.near(0xfffffffffffffff0))
+            self.assertFalse(index.near(0b1111 << 30))
+
+            index.sync(known + [0, 1 << 40])
+            self.assertEqual(len(index), 5)
+            self.assertTrue(SimhashIndex(known).near(0b1111 << 60))
+            self.assertFalse(SimhashIndex().near(0))
@@ -0,0 +1,185 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+
+import asyncio
+import gzip
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from fixtures import async_test
+from hammertime.ruleset import RejectRequest
+
+from tachyon.plugins.host import SitemapXML
+from tachyon.plugins.host.SitemapXML import iter_chunks, iter_locations, SitemapReader
+from tachyon.scancontext import ScanContext
+
+
+def urlset(*locations):
+    urls = "".join("<url><loc>%s</loc><lastmod>2019-01-01</lastmod></url>" % location for location in locations)
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">%s</urlset>' % urls).encode("utf-8")
+
+
+def sitemapindex(*locations):
+    sitemaps = "".join("<sitemap><loc>%s</loc></sitemap>" % location for location in locations)
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">%s</sitemapindex>' % sitemaps
+            ).encode("utf-8")
+
+
+class FakeHammerTime:
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def request(self, url):
+        self.requested.append(url)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.001)
+            if url not in self.pages:
+                raise RejectRequest()
+            entry = MagicMock()
+            entry.response.raw = self.pages[url]
+            return entry
+        finally:
+            self.in_flight -= 1
+
+
+class TestSitemapXML(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.patcher = patch("tachyon.textutils.output_manager")
+        cls.patcher.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.patcher.stop()
+
+    def setUp(self):
+        self.context = ScanContext("http://example.com/")
+
+    def paths(self):
+        return [path["url"] for path in self.context.paths]
+
+    def test_iter_locations_of_urlset(self):
+        locations = list(iter_locations(iter_chunks(urlset("http://example.com/a/", "http://example.com/b"))))
+
+        self.assertEqual(locations, [("url", "http://example.com/a/"), ("url", "http://example.com/b")])
+
+    def test_iter_locations_reads_large_single_line_sitemap_in_chunks(self):
+        document = urlset(*["http://example.com/page%d" % i for i in range(20000)])
+        self.assertNotIn(b"\n", document)
+
+        locations = list(iter_locations(iter_chunks(document, chunk_size=1024)))
+
+        self.assertEqual(len(locations), 20000)
+        self.assertEqual(locations[-1], ("url", "http://example.com/page19999"))
+
+    def test_iter_chunks_inflates_gzip_documents(self):
+        document = urlset(*["http://example.com/page%d" % i for i in range(1000)])
+
+        chunks = list(iter_chunks(gzip.compress(document), chunk_size=256))
+
+        self.assertEqual(b"".join(chunks), document)
+        self.assertTrue(all(len(chunk) <= 256 for chunk in chunks))
+
+    def test_iter_locations_keeps_locations_read_before_malformed_content(self):
+        document = urlset("http://example.com/a")[:-len("</urlset>")] + b"<url><loc>http://example.com/b"
+
+        self.assertEqual(list(iter_locations(iter_chunks(document))), [("url", "http://example.com/a")])
+
+    def test_iter_locations_ignores_locations_of_extensions(self):
+        document = ('<?xml version="1.0" encoding="UTF-8"?>'
+                    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+                    ' xmlns:image="http://www.google.com/schemas/sitemap-image/1.1"'
+                    ' xmlns:video="http://www.google.com/schemas/sitemap-video/1.1">'
+                    '<url><loc>http://example.com/a</loc>'
+                    '<image:image><image:loc>http://example.com/photo.jpg</image:loc></image:image>'
+                    '<video:video><video:content_loc>http://example.com/v.mp4</video:content_loc></video:video>'
+                    '<image:loc>http://example.com/direct.jpg</image:loc></url>'
+                    '</urlset>').encode("utf-8")
+
+        self.assertEqual(list(iter_locations(iter_chunks(document))), [("url", "http://example.com/a")])
+
+    def test_iter_locations_without_namespace(self):
+        document = b"<urlset><url><loc> http://example.com/a </loc></url></urlset>"
+
+        self.assertEqual(list(iter_locations(iter_chunks(document))), [("url", "http://example.com/a")])
+
+    def test_iter_locations_rejects_documents_declaring_entities(self):
+        document = (b'<?xml version="1.0"?><!DOCTYPE urlset [<!ENTITY a "aaaaaaaaaa">'
+                    b'<!ENTITY b "&a;&a;&a;&a;&a;&a;&a;&a;&a;&a;">]>'
+                    b'<urlset><url><loc>http://example.com/&b;</loc></url></urlset>')
+
+        self.assertEqual(list(iter_locations(iter_chunks(document))), [])
+
+    @async_test()
+    async def test_execute_adds_paths_of_sitemap(self):
+        hammertime = FakeHammerTime({
+            "http://example.com/sitemap.xml": urlset("http://example.com/blog/", "http://example.com/",
+                                                     "http://example.com/blog", "http://example.com/about"),
+        })
+
+        await SitemapXML.execute(hammertime, self.context)
+
+        self.assertEqual(self.paths(), ["/blog", "/about"])
+
+    @async_test()
+    async def test_execute_follows_sitemap_index_children(self):
+        hammertime = FakeHammerTime({
+            "http://example.com/sitemap.xml": sitemapindex("http://example.com/posts.xml.gz",
+                                                           "http://example.com/pages.xml",
+                                                           "http://other.example.com/sitemap.xml"),
+            "http://example.com/posts.xml.gz": gzip.compress(urlset("http://example.com/posts/1")),
+            "http://example.com/pages.xml": urlset("http://example.com/contact"),
+        })
+
+        await SitemapXML.execute(hammertime, self.context)
+
+        self.assertEqual(self.paths(), ["/posts/1", "/contact"])
+        self.assertNotIn("http://other.example.com/sitemap.xml", hammertime.requested)
+
+    @async_test()
+    async def test_reader_bounds_concurrency_and_number_of_sitemaps(self):
+        children = ["http://example.com/sitemap%d.xml" % i for i in range(30)]
+        pages = {child: urlset(child.replace(".xml", "/")) for child in children}
+        hammertime = FakeHammerTime(pages)
+        reader = SitemapReader(self.context, hammertime, concurrency=2, max_sitemaps=11)
+
+        await reader.read("http://example.com/sitemap.xml", sitemapindex(*children))
+
+        self.assertEqual(hammertime.max_in_flight, 2)
+        self.assertEqual(len(hammertime.requested), 10)
+        self.assertEqual(reader.sitemap_count, 11)
+        self.assertEqual(reader.added, 10)
+
+    @async_test()
+    async def test_reader_does_not_read_a_sitemap_twice(self):
+        index = sitemapindex("http://example.com/sitemap.xml", "http://example.com/a.xml", "http://example.com/a.xml")
+        hammertime = FakeHammerTime({"http://example.com/a.xml": index})
+
+        await SitemapReader(self.context, hammertime).read("http://example.com/sitemap.xml", index)
+
+        self.assertEqual(hammertime.requested, ["http://example.com/a.xml"])
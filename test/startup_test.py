@@ -15,20 +15,19 @@
 # You should have received a copy of the GNU General Public License along with
 # this program; if not, write to the Free Software Foundation, Inc., 59 Temple
 # Place, Suite 330, Boston, MA  02111-1307  USA
-#
 
 
-""" Path list is used to hold loaded path from disk """
-paths = list()
+import subprocess
+import sys
+from unittest import TestCase
+
 
-""" File list is used to hold loaded filenames from disk """
-files = list()
+class TestStartup(TestCase):
 
-""" Valid path is used to store the path that were found before merging with filenames """
-valid_paths = list()
+    def test_entry_point_does_not_import_network_or_analysis_stack(self):
+        heavy = ["asyncio", "aiohttp", "hammertime", "numpy", "simhash", "marshmallow_har"]
+        code = "import sys, tachyon.__main__; print(' '.join(m for m in %r if m in sys.modules))" % heavy
 
-""" caches are used across the app to avoid adding duplicates urls """
-path_cache = set()
-file_cache = set()
+        output = subprocess.check_output([sys.executable, "-c", code], universal_newlines=True)
 
-session_cookie = None
+        self.assertEqual(output.strip(), "")
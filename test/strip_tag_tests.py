@@ -29,3 +29,44 @@ class StripTagTest(unittest.TestCase):
         await StripTag("input").after_response(entry)
 
         self.assertEqual('<html><input> test <script name="123" value="abc"/> </html>', entry.response.content)
+
+    @async_test()
+    async def test_strip_multiple_tags_in_one_pass(self, loop):
+        entry = self.entry('<input type="hidden" value="1"><script src="a.js"></script><a href="/">')
+        await StripTag("input", "script").after_response(entry)
+
+        self.assertEqual('<input><script></script><a href="/">', entry.response.content)
+
+    @async_test()
+    async def test_body_is_set_once_for_all_tags(self, loop):
+        response = RecordingResponse(b'<input name="q"><script src="a.js"></script>')
+        entry = Entry.create("http://example.com/", response=response)
+
+        await StripTag("input", "script").after_response(entry)
+
+        self.assertEqual(response.assigned, [b"<input><script></script>"])
+
+    @async_test()
+    async def test_body_without_tags_is_not_rewritten(self, loop):
+        response = RecordingResponse(b"<html><body><inputs>Not found</body></html>")
+        entry = Entry.create("http://example.com/", response=response)
+
+        await StripTag("input", "script").after_response(entry)
+
+        self.assertEqual(response.assigned, [])
+
+
+class RecordingResponse:
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.assigned = []
+
+    @property
+    def raw(self):
+        return self._raw
+
+    @raw.setter
+    def raw(self, value):
+        self.assigned.append(value)
+        self._raw = value
@@ -0,0 +1,149 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+
+import asyncio
+from unittest import TestCase
+from unittest.mock import MagicMock, patch, call
+
+from fixtures import async_test
+from hammertime.ruleset import RejectRequest
+
+from tachyon.plugins.host import Svn
+from tachyon.plugins.host.Svn import SvnCrawler, parse_entries
+
+
+def entries(*children):
+    lines = ["10", "", "dir", "12", "http://svn.example.com/trunk", "\f"]
+    for name, kind in children:
+        lines.extend([name, kind, "\f"])
+    return "\n".join(lines)
+
+
+class FakeHammerTime:
+
+    def __init__(self, pages, delay=0):
+        self.pages = pages
+        self.delay = delay
+        self.requested = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def request(self, url):
+        self.requested.append(url)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if url not in self.pages:
+                raise RejectRequest()
+            entry = MagicMock()
+            entry.response.content = self.pages[url]
+            return entry
+        finally:
+            self.in_flight -= 1
+
+
+class TestSvn(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.patcher = patch("tachyon.textutils.output_manager")
+        cls.patcher.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.patcher.stop()
+
+    def setUp(self):
+        self.pages = {
+            "http://example.com/.svn/entries": entries(("index.php", "file"), ("admin", "dir"), ("lib", "dir")),
+            "http://example.com/admin/.svn/entries": entries(("login.php", "file"), ("tools", "dir")),
+            "http://example.com/lib/.svn/entries": entries(("db.php", "file")),
+            "http://example.com/admin/tools/.svn/entries": entries(("admin", "dir")),
+            "http://example.com/admin/tools/admin/.svn/entries": entries(),
+            "http://example.com/.svn/text-base/index.php.svn-base": "<?php index",
+            "http://example.com/admin/.svn/text-base/login.php.svn-base": "<?php login",
+            "http://example.com/lib/.svn/text-base/db.php.svn-base": "<?php db",
+        }
+
+    def test_parse_entries_skips_the_entry_of_the_directory_itself(self):
+        directories, files = parse_entries(entries(("index.php", "file"), ("admin", "dir")))
+
+        self.assertEqual(directories, ["admin"])
+        self.assertEqual(files, ["index.php"])
+
+    @async_test()
+    async def test_crawl_directories_breadth_first(self):
+        hammertime = FakeHammerTime(self.pages)
+        crawler = SvnCrawler(hammertime)
+
+        await crawler.crawl("http://example.com")
+
+        self.assertEqual([url for url in hammertime.requested if url.endswith("/entries")], [
+            "http://example.com/.svn/entries",
+            "http://example.com/admin/.svn/entries",
+            "http://example.com/lib/.svn/entries",
+            "http://example.com/admin/tools/.svn/entries",
+            "http://example.com/admin/tools/admin/.svn/entries",
+        ])
+        self.assertEqual(crawler.depth, 3)
+        self.assertEqual(crawler.directory_count, 5)
+        self.assertEqual(crawler.file_count, 3)
+
+    @async_test()
+    async def test_crawl_does_not_revisit_directories(self):
+        self.pages["http://example.com/.svn/entries"] = entries(("lib", "dir"), ("lib/", "dir"), ("/lib", "dir"))
+        hammertime = FakeHammerTime(self.pages)
+
+        await SvnCrawler(hammertime).crawl("http://example.com")
+
+        self.assertEqual(hammertime.requested, ["http://example.com/.svn/entries",
+                                                "http://example.com/lib/.svn/entries"])
+
+    @async_test()
+    async def test_crawl_bounds_concurrent_requests(self):
+        self.pages["http://example.com/.svn/entries"] = entries(*[("dir%d" % i, "dir") for i in range(20)])
+        hammertime = FakeHammerTime(self.pages, delay=0.001)
+
+        await SvnCrawler(hammertime, concurrency=3).crawl("http://example.com")
+
+        self.assertEqual(len(hammertime.requested), 21)
+        self.assertEqual(hammertime.max_in_flight, 3)
+
+    @async_test()
+    async def test_crawl_downloads_listed_files_off_the_event_loop(self):
+        hammertime = FakeHammerTime(self.pages)
+        crawler = SvnCrawler(hammertime, allow_download=True, target_host="example.com")
+
+        with patch("tachyon.plugins.host.Svn.save_file") as save_file, \
+                patch("asyncio.to_thread", wraps=asyncio.to_thread) as to_thread:
+            await crawler.crawl("http://example.com")
+
+        save_file.assert_has_calls([
+            call("example.com", "http://example.com/index.php", "<?php index"),
+            call("example.com", "http://example.com/admin/login.php", "<?php login"),
+            call("example.com", "http://example.com/lib/db.php", "<?php db"),
+        ], any_order=True)
+        self.assertEqual(to_thread.call_count, 3)
+        self.assertEqual(crawler.download_count, 3)
+
+    def test_concurrency_from_plugin_settings(self):
+        self.assertEqual(Svn.get_concurrency(["concurrency=25"]), 25)
+        self.assertEqual(Svn.get_concurrency(["concurrency=many"]), Svn.DEFAULT_CONCURRENCY)
+        self.assertEqual(Svn.get_concurrency([]), Svn.DEFAULT_CONCURRENCY)
@@ -18,24 +18,31 @@
 
 
 import asyncio
+from contextlib import asynccontextmanager
 from unittest import TestCase
 from unittest.mock import MagicMock, patch, call, ANY
 
 from aiohttp.test_utils import make_mocked_coro
+from click.testing import CliRunner
 from fixtures import async_test, patch_coroutines, FakeHammerTimeEngine
 from hammertime.core import HammerTime
+from hammertime.http import Entry
+from hammertime.rules.deadhostdetection import OfflineHostException
 
-from tachyon import __main__ as tachyon, database
+from tachyon import __main__ as tachyon, dbutils, textutils
 from tachyon.result import ResultAccumulator
 from tachyon.output import PrettyOutput
+from tachyon.scancontext import ScanContext
+from tachyon.wordlist import Wordlist
 
 
 class TestTachyon(TestCase):
 
     def setUp(self):
         tachyon.load_execute_file_plugins = MagicMock()
-        tachyon.load_execute_host_plugins = make_mocked_coro()
+        tachyon.load_execute_host_plugins = make_mocked_coro([])
         self.accumulator = ResultAccumulator(output_manager=PrettyOutput)
+        self.context = ScanContext("http://example.com")
 
     @classmethod
     def setUpClass(cls):
@@ -48,6 +55,7 @@ class TestTachyon(TestCase):
 
     @async_test()
     async def test_paths_exists_fetch_generated_paths(self, loop):
+        self.context.valid_paths = ["/", "/precrawled"]
         path_generator = MagicMock()
         path_generator.generate_paths.return_value = ["/", "/test", "/path"]
         fake_directory_fetcher = MagicMock()
@@ -55,7 +63,7 @@ class TestTachyon(TestCase):
         tachyon.PathGenerator = MagicMock(return_value=path_generator)
         tachyon.DirectoryFetcher = MagicMock(return_value=fake_directory_fetcher)
 
-        await tachyon.test_paths_exists(HammerTime(loop=loop), accumulator=self.accumulator)
+        await tachyon.test_paths_exists(HammerTime(loop=loop), self.context, accumulator=self.accumulator)
 
         fake_directory_fetcher.fetch_paths.assert_has_calls(
             [
@@ -75,12 +83,13 @@ class TestTachyon(TestCase):
         tachyon.DirectoryFetcher = MagicMock(return_value=fake_directory_fetcher)
 
         with patch("tachyon.textutils.output_info") as output_info:
-            await tachyon.test_paths_exists(HammerTime(loop=loop), accumulator=self.accumulator)
+            await tachyon.test_paths_exists(HammerTime(loop=loop), self.context, accumulator=self.accumulator)
 
             output_info.assert_any_call("Probing %d paths" % len(paths))
 
     @async_test()
     async def test_paths_exists_do_recursive_path_search_if_recursive_is_true(self, loop):
+        self.context.valid_paths = ["/", "/precrawled"]
         path_generator = MagicMock()
         paths = ["/", "/test", "/path"]
         path_generator.generate_paths.return_value = paths
@@ -89,17 +98,19 @@ class TestTachyon(TestCase):
         tachyon.PathGenerator = MagicMock(return_value=path_generator)
         tachyon.DirectoryFetcher = MagicMock(return_value=fake_directory_fetcher)
 
-        await tachyon.test_paths_exists(HammerTime(loop=loop), recursive=True, accumulator=self.accumulator)
+        await tachyon.test_paths_exists(HammerTime(loop=loop), self.context, recursive=True,
+                                        accumulator=self.accumulator)
 
-        path_generator.generate_paths.assert_has_calls([call(use_valid_paths=False), call(use_valid_paths=True),
-                                                        call(use_valid_paths=True)], any_order=False)
+        path_generator.generate_paths.assert_has_calls([call(use_valid_paths=False),
+                                                        call(use_valid_paths=True, depth=1),
+                                                        call(use_valid_paths=True, depth=2)], any_order=False)
 
         fake_directory_fetcher.fetch_paths.assert_has_calls([call(paths)]*3)
 
     @async_test()
     async def test_paths_exists_inject_pre_crawled_paths(self, loop):
         path_generator = MagicMock()
-        database.valid_paths = ["/", "/precrawled1", "/precrawled2"]
+        self.context.valid_paths = ["/", "/precrawled1", "/precrawled2"]
         paths = ["/", "/test", "/path", "/precrawled1", "/precrawled2"]
         path_generator.generate_paths.return_value = paths
         fake_directory_fetcher = MagicMock()
@@ -107,14 +118,15 @@ class TestTachyon(TestCase):
         tachyon.PathGenerator = MagicMock(return_value=path_generator)
         tachyon.DirectoryFetcher = MagicMock(return_value=fake_directory_fetcher)
 
-        await tachyon.test_paths_exists(HammerTime(loop=loop), recursive=True, accumulator=self.accumulator)
+        await tachyon.test_paths_exists(HammerTime(loop=loop), self.context, recursive=True,
+                                        accumulator=self.accumulator)
 
         path_generator.generate_paths.assert_has_calls(
             [
                 call(use_valid_paths=True),
                 call(use_valid_paths=False),
-                call(use_valid_paths=True),
-                call(use_valid_paths=True)
+                call(use_valid_paths=True, depth=1),
+                call(use_valid_paths=True, depth=2)
             ],
             any_order=False
         )
@@ -124,7 +136,7 @@ class TestTachyon(TestCase):
     @async_test()
     async def test_paths_exists_skip_pre_crawled_paths_if_not_provided(self, loop):
         path_generator = MagicMock()
-        database.valid_paths = ["/"]
+        self.context.valid_paths = ["/"]
         paths = ["/"]
         path_generator.generate_paths.return_value = paths
         fake_directory_fetcher = MagicMock()
@@ -132,7 +144,8 @@ class TestTachyon(TestCase):
         tachyon.PathGenerator = MagicMock(return_value=path_generator)
         tachyon.DirectoryFetcher = MagicMock(return_value=fake_directory_fetcher)
 
-        await tachyon.test_paths_exists(HammerTime(loop=loop), recursive=False, accumulator=self.accumulator)
+        await tachyon.test_paths_exists(HammerTime(loop=loop), self.context, recursive=False,
+                                        accumulator=self.accumulator)
 
         path_generator.generate_paths.assert_has_calls(
             [
@@ -153,16 +166,16 @@ class TestTachyon(TestCase):
         tachyon.PathGenerator = MagicMock(return_value=path_generator)
         tachyon.DirectoryFetcher = MagicMock(return_value=fake_directory_fetcher)
         asyncio.set_event_loop(asyncio.new_event_loop())
-        database.valid_paths = paths
+        self.context.valid_paths = paths
 
         with patch("tachyon.textutils.output_info") as output_info:
-            await tachyon.test_paths_exists(HammerTime(loop=loop), accumulator=self.accumulator)
+            await tachyon.test_paths_exists(HammerTime(loop=loop), self.context, accumulator=self.accumulator)
 
             output_info.assert_any_call("Found 2 valid paths")
 
     @async_test()
     async def test_file_exists_fetch_all_generate_files(self, loop):
-        database.valid_paths = ["/path/file%d" % i for i in range(10)]
+        self.context.valid_paths = ["/path/file%d" % i for i in range(10)]
         fake_file_fetcher = MagicMock()
         fake_file_fetcher.fetch_files = make_mocked_coro()
         tachyon.FileFetcher = MagicMock(return_value=fake_file_fetcher)
@@ -170,7 +183,7 @@ class TestTachyon(TestCase):
         fake_file_generator.generate_files.return_value = ["list of files"]
 
         with patch("tachyon.__main__.FileGenerator", MagicMock(return_value=fake_file_generator)):
-            await tachyon.test_file_exists(HammerTime(loop=loop), accumulator=self.accumulator)
+            await tachyon.test_file_exists(HammerTime(loop=loop), self.context, accumulator=self.accumulator)
 
         fake_file_fetcher.fetch_files.assert_called_once_with(["list of files"])
 
@@ -181,9 +194,9 @@ class TestTachyon(TestCase):
         hammertime = HammerTime(request_engine=engine, loop=loop)
         hammertime.collect_successful_requests()
 
-        await tachyon.scan(hammertime, cookies=None, accumulator=self.accumulator)
+        await tachyon.scan(hammertime, self.context, cookies=None, accumulator=self.accumulator)
 
-        tachyon.get_session_cookies.assert_called_once_with(hammertime)
+        tachyon.get_session_cookies.assert_called_once_with(hammertime, self.context)
 
     @patch_coroutines("tachyon.__main__.", "test_file_exists", "test_paths_exists", "get_session_cookies")
     @async_test()
@@ -193,20 +206,19 @@ class TestTachyon(TestCase):
         hammertime.collect_successful_requests()
         cookies = "not none"
 
-        await tachyon.scan(hammertime, cookies=cookies, accumulator=self.accumulator)
+        await tachyon.scan(hammertime, self.context, cookies=cookies, accumulator=self.accumulator)
 
         tachyon.get_session_cookies.assert_not_called()
 
     @async_test()
     async def test_use_user_supplied_cookies_if_available(self, loop):
-        database.session_cookie = "my-cookies=123"
         cookies = "test-cookie=true"
         engine = FakeHammerTimeEngine()
         hammertime = HammerTime(request_engine=engine, loop=loop)
         hammertime.collect_successful_requests()
 
         with patch("tachyon.config.add_http_header") as add_http_header:
-            await tachyon.scan(hammertime, cookies=cookies, accumulator=self.accumulator)
+            await tachyon.scan(hammertime, self.context, cookies=cookies, accumulator=self.accumulator)
 
             add_http_header.assert_any_call(ANY, "Cookie", "test-cookie=true")
 
@@ -217,9 +229,9 @@ class TestTachyon(TestCase):
         hammertime = HammerTime(request_engine=engine, loop=loop)
         hammertime.collect_successful_requests()
 
-        await tachyon.scan(hammertime, directories_only=True, accumulator=self.accumulator)
+        await tachyon.scan(hammertime, self.context, directories_only=True, accumulator=self.accumulator)
 
-        tachyon.test_paths_exists.assert_called_once_with(hammertime, accumulator=self.accumulator)
+        tachyon.test_paths_exists.assert_called_once_with(hammertime, self.context, accumulator=self.accumulator)
         tachyon.test_file_exists.assert_not_called()
 
     @patch_coroutines("tachyon.__main__.", "test_file_exists", "test_paths_exists", "get_session_cookies")
@@ -229,9 +241,9 @@ class TestTachyon(TestCase):
         hammertime = HammerTime(request_engine=engine, loop=loop)
         hammertime.collect_successful_requests()
 
-        await tachyon.scan(hammertime, files_only=True, accumulator=self.accumulator)
+        await tachyon.scan(hammertime, self.context, files_only=True, accumulator=self.accumulator)
 
-        tachyon.test_file_exists.assert_called_with(hammertime, accumulator=self.accumulator)
+        tachyon.test_file_exists.assert_called_with(hammertime, self.context, accumulator=self.accumulator)
         tachyon.test_paths_exists.assert_not_called()
 
     @patch_coroutines("tachyon.__main__.", "test_file_exists", "test_paths_exists", "get_session_cookies")
@@ -241,8 +253,261 @@ class TestTachyon(TestCase):
         hammertime = HammerTime(request_engine=engine, loop=loop)
         hammertime.collect_successful_requests()
 
-        await tachyon.scan(hammertime, plugins_only=True, accumulator=self.accumulator)
+        await tachyon.scan(hammertime, self.context, plugins_only=True, accumulator=self.accumulator)
 
-        tachyon.load_execute_host_plugins.assert_called_once_with(hammertime)
+        tachyon.load_execute_host_plugins.assert_called_once_with(hammertime, self.context)
         tachyon.test_file_exists.assert_not_called()
         tachyon.test_paths_exists.assert_not_called()
+
+
+class TestBatch(TestCase):
+
+    def test_load_target_paths_reuse_loaded_wordlist(self):
+        context = ScanContext("http://example.com")
+        context.paths = [{"url": "/from-plugin"}]
+        wordlist = Wordlist([{"url": "/admin"}], prioritized=False)
+
+        with patch("tachyon.loaders.load_wordlist_resource") as load, patch("tachyon.textutils.output_info"):
+            tachyon.load_target_paths(context, wordlist)
+
+        load.assert_not_called()
+        self.assertEqual([path["url"] for path in context.paths], ["/admin", "/from-plugin"])
+        self.assertEqual(len(wordlist), 1)
+
+    def test_loaded_entries_are_known_to_plugins(self):
+        context = ScanContext("http://example.com")
+
+        with patch("tachyon.textutils.output_info"):
+            tachyon.load_target_paths(context, Wordlist([{"url": "/admin"}], prioritized=False))
+            tachyon.load_target_files(context, Wordlist([{"url": "backup.zip"}], prioritized=False))
+
+        self.assertFalse(dbutils.add_path(context, {"url": "/admin/"}))
+        self.assertFalse(dbutils.add_file(context, {"url": "backup.zip"}))
+        self.assertTrue(dbutils.add_path(context, {"url": "/new"}))
+        self.assertEqual([path["url"] for path in context.paths], ["/admin", "/new"])
+
+    def test_targets_are_scanned_concurrently_each_with_its_own_context(self):
+        scanned = []
+        running = []
+        peak = []
+
+        async def scan(hammertime, context, **kwargs):
+            scanned.append(context)
+            running.append(context)
+            peak.append(len(running))
+            context.valid_paths.append({"url": "/found-on-" + context.target_host})
+            await asyncio.sleep(0.01)
+            running.remove(context)
+
+        @asynccontextmanager
+        async def configure_hammertime(context, **kwargs):
+            yield MagicMock()
+
+        session = MagicMock()
+        session.close = make_mocked_coro()
+        targets = ["http://a.example.com", "http://b.example.com", "http://c.example.com"]
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        asyncio.set_event_loop(loop)
+        with patch("tachyon.__main__.scan", scan), \
+                patch("tachyon.config.configure_hammertime", configure_hammertime), \
+                patch("tachyon.config.create_session", MagicMock(return_value=session)), \
+                patch("tachyon.loaders.load_target_list", MagicMock(return_value=targets)), \
+                patch("tachyon.loaders.load_wordlist_resource", MagicMock(return_value=Wordlist([], False))), \
+                patch("tachyon.__main__.format_stats", MagicMock(return_value="")), \
+                patch.object(Wordlist, "close") as close_wordlist, \
+                patch("tachyon.textutils.init_log"), patch("tachyon.textutils.output_manager"):
+            result = CliRunner().invoke(tachyon.main, ["-T", "targets.txt", "--parallel-hosts", "2"])
+
+        self.assertIsNone(result.exception)
+        self.assertEqual(sorted(context.base_url for context in scanned), targets)
+        self.assertEqual(max(peak), 2)
+        for context in scanned:
+            self.assertEqual([path["url"] for path in context.valid_paths], ["/", "/found-on-" + context.target_host])
+        session.close.assert_called_once_with()
+        self.assertEqual(close_wordlist.call_count, 2)
+
+    def test_messages_of_each_scan_are_prefixed_with_its_target_in_batch(self):
+        for targets, expected in [(["http://a.example.com", "http://b.example.com:8080"],
+                                   {"[a.example.com] Found 1 valid paths", "[b.example.com:8080] Found 1 valid paths"}),
+                                  (["http://a.example.com"], {"Found 1 valid paths"})]:
+            async def scan(hammertime, context, **kwargs):
+                await asyncio.sleep(0.01)
+                textutils.output_info("Found 1 valid paths")
+
+            @asynccontextmanager
+            async def configure_hammertime(context, **kwargs):
+                yield MagicMock()
+
+            session = MagicMock()
+            session.close = make_mocked_coro()
+            loop = asyncio.new_event_loop()
+            self.addCleanup(loop.close)
+            asyncio.set_event_loop(loop)
+            with patch("tachyon.__main__.scan", scan), \
+                    patch("tachyon.config.configure_hammertime", configure_hammertime), \
+                    patch("tachyon.config.create_session", MagicMock(return_value=session)), \
+                    patch("tachyon.loaders.load_target_list", MagicMock(return_value=targets)), \
+                    patch("tachyon.loaders.load_wordlist_resource", MagicMock(return_value=Wordlist([], False))), \
+                    patch("tachyon.__main__.format_stats", MagicMock(return_value="")), \
+                    patch("tachyon.textutils.init_log"), patch("tachyon.textutils.output_manager") as output_manager:
+                result = CliRunner().invoke(tachyon.main, ["-T", "targets.txt"])
+
+            self.assertIsNone(result.exception)
+            messages = {c[0][0] for c in output_manager.output_info.call_args_list}
+            self.assertEqual({message for message in messages if "Found" in message}, expected)
+
+
+class TestExecuteHostPlugins(TestCase):
+
+    def setUp(self):
+        self.context = ScanContext("http://example.com")
+        patcher = patch("tachyon.textutils.output_info")
+        self.output_info = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def plugin(self, execute):
+        plugin = MagicMock(spec=["execute"])
+        plugin.execute = execute
+        return plugin
+
+    @async_test()
+    async def test_plugins_run_concurrently(self, loop):
+        started = asyncio.Event()
+
+        async def waits_for_other(hammertime, context):
+            await asyncio.wait_for(started.wait(), timeout=1)
+
+        async def starts(hammertime, context):
+            started.set()
+
+        await tachyon.execute_host_plugins([self.plugin(waits_for_other), self.plugin(starts)], MagicMock(),
+                                           self.context)
+
+    @async_test()
+    async def test_additions_are_merged_in_plugin_order_regardless_of_completion(self, loop):
+        async def slow(hammertime, context):
+            await asyncio.sleep(0.01)
+            dbutils.add_path(context, {"url": "/slow"})
+            dbutils.add_file(context, {"url": "shared.txt", "description": "slow"})
+
+        async def fast(hammertime, context):
+            dbutils.add_path(context, {"url": "/fast"})
+            dbutils.add_file(context, {"url": "shared.txt", "description": "fast"})
+
+        await tachyon.execute_host_plugins([self.plugin(slow), self.plugin(fast)], MagicMock(), self.context)
+
+        self.assertEqual([path["url"] for path in self.context.paths], ["/slow", "/fast"])
+        self.assertEqual(self.context.files, [{"url": "shared.txt", "description": "slow"}])
+
+    @async_test()
+    async def test_additions_of_each_plugin_are_returned(self, loop):
+        async def adds_path(hammertime, context):
+            dbutils.add_path(context, {"url": "/added"})
+
+        async def adds_file(hammertime, context):
+            dbutils.add_file(context, {"url": "added.txt"})
+
+        additions = await tachyon.execute_host_plugins([self.plugin(adds_path), self.plugin(adds_file)], MagicMock(),
+                                                       self.context)
+
+        self.assertEqual([(added.paths, added.files) for added in additions],
+                         [([{"url": "/added"}], []), ([], [{"url": "added.txt"}])])
+
+    @async_test()
+    async def test_report_what_each_plugin_added_once_merged(self, loop):
+        dbutils.add_path(self.context, {"url": "/known"})
+
+        async def first(hammertime, context):
+            dbutils.add_path(context, {"url": "/known"})
+            dbutils.add_path(context, {"url": "/shared"})
+            dbutils.add_file(context, {"url": "first.txt"})
+
+        async def second(hammertime, context):
+            dbutils.add_path(context, {"url": "/shared"})
+            dbutils.add_path(context, {"url": "/second"})
+
+        plugins = [self.plugin(first), self.plugin(second)]
+        plugins[0].__name__ = "tachyon.plugins.host.Robots"
+        plugins[1].__name__ = "tachyon.plugins.host.SitemapXML"
+        additions = await tachyon.execute_host_plugins(plugins, MagicMock(), self.context)
+
+        self.assertEqual([(len(added.paths), len(added.files)) for added in additions], [(1, 1), (1, 0)])
+        self.output_info.assert_has_calls([call(" - Robots Plugin: added 1 paths and 1 files"),
+                                           call(" - SitemapXML Plugin: added 1 paths and 0 files")])
+
+    @async_test()
+    async def test_plugin_only_counts_urls_missing_from_scan_context(self, loop):
+        dbutils.add_path(self.context, {"url": "/known"})
+        added = []
+
+        async def execute(hammertime, context):
+            added.append(dbutils.add_path(context, {"url": "/known/"}))
+            added.append(dbutils.add_path(context, {"url": "/new"}))
+            added.append(dbutils.add_path(context, {"url": "/new"}))
+
+        await tachyon.execute_host_plugins([self.plugin(execute)], MagicMock(), self.context)
+
+        self.assertEqual(added, [False, True, False])
+        self.assertEqual([path["url"] for path in self.context.paths], ["/known", "/new"])
+
+    @async_test()
+    async def test_plugins_of_concurrent_scans_add_to_their_own_context(self, loop):
+        other = ScanContext("http://other.example.com")
+
+        async def adds_host(hammertime, context):
+            await asyncio.sleep(0)
+            dbutils.add_file(context, {"url": context.target_host})
+
+        await asyncio.gather(tachyon.execute_host_plugins([self.plugin(adds_host)], MagicMock(), self.context),
+                             tachyon.execute_host_plugins([self.plugin(adds_host)], MagicMock(), other))
+
+        self.assertEqual(self.context.files, [{"url": "example.com"}])
+        self.assertEqual(other.files, [{"url": "other.example.com"}])
+
+    @async_test()
+    async def test_failing_plugin_cancels_others_and_raises_original_exception(self, loop):
+        cancelled = asyncio.Event()
+
+        async def never_ends(hammertime, context):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        async def fails(hammertime, context):
+            await asyncio.sleep(0)
+            raise OfflineHostException()
+
+        with self.assertRaises(OfflineHostException):
+            await tachyon.execute_host_plugins([self.plugin(never_ends), self.plugin(fails)], MagicMock(), self.context)
+        self.assertTrue(cancelled.is_set())
+
+
+class TestReFetch(TestCase):
+
+    @async_test()
+    async def test_reject_entries_near_known_bad_behavior_without_requesting(self, loop):
+        hammertime = MagicMock()
+        hammertime.kb.bad_behavior_response = {0b1111 << 32}
+        hammertime.request = make_mocked_coro()
+        entry = Entry.create("http://example.com/admin")
+        entry.result.error_simhash = (0b1111 << 32) | 0b11
+
+        self.assertFalse(await tachyon.ReFetch(hammertime).is_valid(entry))
+        hammertime.request.assert_not_called()
+
+    @async_test()
+    async def test_refetch_entries_far_from_bad_behavior(self, loop):
+        hammertime = MagicMock()
+        hammertime.kb.bad_behavior_response = {0b1111 << 32}
+        hammertime.request = make_mocked_coro()
+        validator = tachyon.ReFetch(hammertime)
+        entry = Entry.create("http://example.com/admin", arguments={"path": {"url": "/admin"}})
+        entry.result.error_simhash = 0b1111
+
+        self.assertTrue(await validator.is_valid(entry))
+        hammertime.kb.bad_behavior_response.add(0b1110)
+        self.assertFalse(await validator.is_valid(entry))
+        hammertime.request.assert_called_once_with("http://example.com/admin", arguments={"path": {"url": "/admin"}})
@@ -0,0 +1,85 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+
+from unittest import TestCase
+
+from tachyon import dbutils
+from tachyon.scancontext import ScanContext
+from tachyon.urlindex import UrlIndex, canonical_path, hash_key
+
+
+class TestUrlIndex(TestCase):
+
+    def test_canonical_path_ignore_leading_trailing_and_repeated_slashes(self):
+        self.assertEqual(canonical_path("/admin/"), "admin")
+        self.assertEqual(canonical_path("admin"), "admin")
+        self.assertEqual(canonical_path("//admin//backup/"), "admin/backup")
+        self.assertEqual(canonical_path("/"), "/")
+        self.assertEqual(canonical_path(""), "/")
+
+    def test_hash_key_is_64_bits(self):
+        self.assertLess(hash_key("/admin"), 2 ** 64)
+        self.assertEqual(hash_key("/admin"), hash_key("admin/"))
+        self.assertNotEqual(hash_key("/admin"), hash_key("/Admin"))
+
+    def test_add_return_false_for_equivalent_urls(self):
+        index = UrlIndex()
+
+        self.assertTrue(index.add("/admin"))
+        self.assertFalse(index.add("/admin/"))
+        self.assertTrue(index.add("/admin/backup"))
+
+        self.assertIn("admin", index)
+        self.assertNotIn("/backup", index)
+        self.assertEqual(len(index), 2)
+
+    def test_count_hits_and_misses(self):
+        index = UrlIndex()
+
+        index.update(["/a", "/b", "/a/", "b", "/c"])
+
+        self.assertEqual(index.misses, 3)
+        self.assertEqual(index.hits, 2)
+
+    def test_clear_reset_keys_and_counters(self):
+        index = UrlIndex()
+        index.update(["/a", "/a"])
+
+        index.clear()
+
+        self.assertNotIn("/a", index)
+        self.assertEqual((len(index), index.hits, index.misses), (0, 0, 0))
+
+
+class TestDbUtils(TestCase):
+
+    def setUp(self):
+        self.context = ScanContext()
+
+    def test_add_path_skip_equivalent_urls(self):
+        self.assertTrue(dbutils.add_path(self.context, {"url": "/admin", "description": "admin"}))
+        self.assertFalse(dbutils.add_path(self.context, {"url": "/admin/", "description": "admin"}))
+
+        self.assertEqual(self.context.paths, [{"url": "/admin", "description": "admin"}])
+
+    def test_add_file_skip_equivalent_urls(self):
+        self.assertTrue(dbutils.add_file(self.context, {"url": "example.com", "description": "host"}))
+        self.assertFalse(dbutils.add_file(self.context, {"url": "example.com", "description": "host"}))
+
+        self.assertEqual(self.context.files, [{"url": "example.com", "description": "host"}])
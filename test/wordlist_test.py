@@ -0,0 +1,197 @@
+# Tachyon - Fast Multi-Threaded Web Discovery Tool
+# Copyright (c) 2011 Gabriel Tremblay - initnull hat gmail.com
+# Copyright (C) 2018-  Delve Labs inc.
+#
+# GNU General Public Licence (GPL)
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 59 Temple
+# Place, Suite 330, Boston, MA  02111-1307  USA
+
+
+import json
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from tachyon import loaders, scheduler
+from tachyon.wordlist import CompiledWordlist, Wordlist, WordlistIndex, compile_wordlist, compiled_path, is_current
+
+
+class TestWordlist(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.dir.name, "files.json")
+        self.target = os.path.join(self.dir.name, "cache", "files.twl")
+        self.entries = [{"url": "readme", "description": "Readme", "severity": "info"},
+                        {"url": "backup.zip", "description": "Backup", "severity": "critical"},
+                        {"url": "config", "description": "Config file", "severity": "medium", "no_suffix": True}]
+        self.write_source(self.entries)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write_source(self, entries):
+        with open(self.source, "w") as fp:
+            json.dump([{"description": "Section", "data": entries}], fp)
+
+    def test_compiled_entries_are_decoded_in_priority_order(self):
+        compile_wordlist(self.source, self.target, self.entries)
+
+        compiled = CompiledWordlist(self.target)
+
+        self.assertEqual(len(compiled), 3)
+        self.assertEqual(["backup.zip", "config", "readme"], [entry["url"] for entry in compiled])
+        self.assertEqual(compiled[1], self.entries[2])
+        self.assertEqual(compiled[-1], self.entries[0])
+        with self.assertRaises(IndexError):
+            compiled[3]
+        compiled.close()
+
+    def test_recently_decoded_entries_are_shared(self):
+        compile_wordlist(self.source, self.target, self.entries)
+        compiled = CompiledWordlist(self.target)
+
+        with patch("tachyon.wordlist.json.loads", wraps=json.loads) as loads:
+            first = list(compiled)
+            self.assertIs(compiled[0], first[0])
+            self.assertEqual([id(entry) for entry in compiled], [id(entry) for entry in first])
+
+        self.assertEqual(loads.call_count, 3)
+        compiled.close()
+
+    def test_urls_are_looked_up_without_decoding_entries(self):
+        compile_wordlist(self.source, self.target, self.entries)
+        index = WordlistIndex(Wordlist(CompiledWordlist(self.target)), ["added"])
+
+        with patch("tachyon.wordlist.json.loads") as loads:
+            self.assertIn("/readme/", index)
+            self.assertIn("added", index)
+            self.assertNotIn("missing", index)
+            self.assertFalse(index.add("backup.zip"))
+            self.assertTrue(index.add("new"))
+
+        loads.assert_not_called()
+        self.assertEqual(len(index), 2)
+        index.wordlist.close()
+
+    def test_decoded_entries_are_bounded(self):
+        compile_wordlist(self.source, self.target, self.entries)
+        compiled = CompiledWordlist(self.target, cache_size=2)
+
+        first = compiled[0]
+        compiled[1]
+        compiled[0]
+        compiled[2]
+
+        self.assertEqual(list(compiled.cache), [0, 2])
+        self.assertIs(compiled[0], first)
+        self.assertEqual(compiled[1], self.entries[2])
+        compiled.close()
+
+    def test_close_releases_the_mapping_of_shared_entries(self):
+        compile_wordlist(self.source, self.target, self.entries)
+        wordlist = Wordlist(CompiledWordlist(self.target))
+        copy = wordlist.copy()
+
+        wordlist.close()
+        wordlist.close()
+
+        self.assertTrue(copy.base.mmap.closed)
+        Wordlist(self.entries, prioritized=False).close()
+
+    def test_compiled_file_is_current_until_source_content_changes(self):
+        self.assertFalse(is_current(self.source, self.target))
+        compile_wordlist(self.source, self.target, self.entries)
+        self.assertTrue(is_current(self.source, self.target))
+
+        stat = os.stat(self.source)
+        os.utime(self.source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertTrue(is_current(self.source, self.target))
+
+        self.entries[0]["url"] = "README"
+        self.write_source(self.entries)
+        self.assertFalse(is_current(self.source, self.target))
+
+    def test_new_mtime_of_same_content_is_recorded(self):
+        compile_wordlist(self.source, self.target, self.entries)
+        stat = os.stat(self.source)
+        os.utime(self.source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        self.assertTrue(is_current(self.source, self.target))
+        with patch("tachyon.wordlist._file_hash") as file_hash:
+            self.assertTrue(is_current(self.source, self.target))
+        file_hash.assert_not_called()
+
+    def test_load_wordlist_compile_once_in_cache_dir(self):
+        cache_dir = os.path.join(self.dir.name, "cache")
+
+        loaded = loaders.load_wordlist(self.source, cache_dir=cache_dir)
+        mtime = os.stat(compiled_path(self.source, cache_dir)).st_mtime_ns
+        reloaded = loaders.load_wordlist(self.source, cache_dir=cache_dir)
+
+        with patch("tachyon.wordlist.compile_wordlist") as compile:
+            loaders.load_wordlist(self.source, cache_dir=cache_dir).close()
+
+        self.assertEqual(list(loaded), list(reloaded))
+        self.assertEqual(mtime, os.stat(compiled_path(self.source, cache_dir)).st_mtime_ns)
+        compile.assert_not_called()
+        loaded.close()
+        reloaded.close()
+
+    def test_added_entries_are_merged_by_severity(self):
+        compile_wordlist(self.source, self.target, self.entries)
+        wordlist = Wordlist(CompiledWordlist(self.target))
+
+        wordlist.append({"url": "generated", "description": "Generated", "severity": "critical"})
+        wordlist.extend([{"url": "host", "description": "Host"}])
+
+        self.assertEqual(len(wordlist), 5)
+        self.assertEqual(["backup.zip", "config", "readme", "generated", "host"], [e["url"] for e in wordlist])
+        self.assertEqual(["backup.zip", "generated", "config", "host", "readme"],
+                         [e["url"] for e in scheduler.prioritize(wordlist)])
+
+    def test_priority_order_is_not_sorted_again(self):
+        wordlist = Wordlist(self.entries, prioritized=False)
+        wordlist.extend([{"url": "host", "severity": "info"}, {"url": "generated", "severity": "critical"}])
+
+        with patch("builtins.sorted") as sort:
+            ordered = [e["url"] for e in scheduler.prioritize(wordlist)]
+
+        sort.assert_not_called()
+        self.assertEqual(["backup.zip", "generated", "config", "readme", "host"], ordered)
+        self.assertEqual(["backup.zip", "config", "readme", "host", "generated"], [e["url"] for e in wordlist])
+
+    def test_wordlist_sort_entries_that_were_not_compiled(self):
+        wordlist = Wordlist(self.entries, prioritized=False)
+
+        self.assertEqual(["backup.zip", "config", "readme"], [e["url"] for e in scheduler.prioritize(wordlist)])
+
+    def test_copy_shares_loaded_entries_but_not_additions(self):
+        compile_wordlist(self.source, self.target, self.entries)
+        wordlist = Wordlist(CompiledWordlist(self.target))
+        wordlist.append({"url": "generated", "description": "Generated"})
+
+        copy = wordlist.copy()
+        copy.append({"url": "other", "description": "Other"})
+
+        self.assertIs(copy.base, wordlist.base)
+        self.assertEqual(["backup.zip", "config", "readme", "other"], [e["url"] for e in copy])
+        self.assertEqual(["backup.zip", "config", "readme", "generated"], [e["url"] for e in wordlist])
+
+    def test_load_target_list_skip_blank_lines_and_comments(self):
+        path = os.path.join(self.dir.name, "targets.txt")
+        with open(path, "w") as fp:
+            fp.write("example.com\n\n# staging\n  https://staging.example.com:8443 \n")
+
+        self.assertEqual(loaders.load_target_list(path), ["example.com", "https://staging.example.com:8443"])